@@ -0,0 +1,113 @@
+# admission.py
+"""
+Admission control + backpressure for the ML service.
+
+Problem: when the Node proxy fans out faster than DistilBERT can keep up, requests
+piled up inside Flask threads until they timed out (backtest uses a 60s timeout),
+and by then the model was busy computing answers nobody was waiting for anymore.
+
+What this does, per model:
+    - max_concurrency: how many requests can be inside the model at the same time
+    - max_queue: how many more can wait for a slot, anything beyond that is shed
+      right away (app.py turns that into 429 + Retry-After)
+    - deadline: every request carries one, if it passes while waiting the request is dropped
+      (504) BEFORE it reaches the model, so no work is wasted on callers that already gave up
+
+So latency stays bounded: a request either gets served within its deadline or fails fast.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Overloaded(Exception):
+    """Queue for this model is full, caller should retry after retry_after seconds."""
+
+    def __init__(self, model_key, retry_after):
+        super().__init__(f"Model '{model_key}' is overloaded, retry in {retry_after}s")
+        self.model_key = model_key
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """The caller's deadline passed before its work reached the model."""
+
+
+def check_deadline(deadline):
+    if deadline is not None and time.monotonic() >= deadline:
+        raise DeadlineExceeded("Request deadline exceeded before inference")
+
+
+class AdmissionController:
+    def __init__(self, model_key, max_concurrency, max_queue):
+        self.model_key = model_key
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_queue = max(0, int(max_queue))
+
+        self._cond = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+
+        # counters for stats / metrics
+        self.admitted = 0
+        self.shed = 0
+        self.expired = 0
+
+        # moving average of how long one admitted request holds a slot (for Retry-After)
+        self._avg_service_s = 0.05
+
+    def retry_after(self):
+        # rough estimate: time until the current queue drains, at least 1 second
+        backlog = (self.waiting + self.active) / self.max_concurrency
+        return max(1, int(round(backlog * self._avg_service_s + 0.5)))
+
+    @contextmanager
+    def admit(self, deadline=None, shed=True):
+        """
+        with controller.admit(deadline):
+            ... run the model ...
+
+        shed=False means "wait even if the queue is full" (used by the streaming endpoint,
+        where blocking the reader IS the backpressure)
+        """
+        with self._cond:
+            if shed and self.active >= self.max_concurrency and self.waiting >= self.max_queue:
+                self.shed += 1
+                raise Overloaded(self.model_key, self.retry_after())
+
+            self.waiting += 1
+            try:
+                while self.active >= self.max_concurrency:
+                    timeout = None if deadline is None else deadline - time.monotonic()
+                    if timeout is not None and timeout <= 0:
+                        self.expired += 1
+                        raise DeadlineExceeded(f"Deadline exceeded while queued for '{self.model_key}'")
+                    self._cond.wait(timeout)
+            finally:
+                self.waiting -= 1
+
+            self.active += 1
+            self.admitted += 1
+
+        t0 = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - t0
+            with self._cond:
+                self.active -= 1
+                self._avg_service_s = 0.9 * self._avg_service_s + 0.1 * elapsed
+                self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "active": self.active,
+                "waiting": self.waiting,
+                "admitted": self.admitted,
+                "shed": self.shed,
+                "expired": self.expired,
+            }
@@ -3,49 +3,89 @@
 Adding this short brief for my own understanding later on,
 Flask microservice for sentiment analysis
 
-Update: now now it serves two models:
-- Logistic Regression("lr")
-- Support Vector Machine("svm")
-
-Both models share the same TF-IDF vectoriser:
-    - vectorizer: model/vectorizer_lr.pkl
-    - LR classifier: model/lr_model.pkl
-    - SVM classifier: model/svm_model.pkl
-
-Endpoint:
-    POST /predict
-    JSON body:
+It serves:
+- Logistic Regression("lr") and Support Vector Machine("svm"), sharing one TF-IDF vectoriser
+  (or hashed features with FEATURE_PIPELINE=hashing, see hashing_features.py)
+- my fine tuned DistilBERT("distilbert"), plus an INT8 copy("distilbert_int8", see distilbert_int8.py)
+- "cascade": LR first, only the uncertain posts go to DistilBERT
+
+Artifacts come from model/versions/<CURRENT>/ when that folder exists (see model_registry.py),
+otherwise straight from model/.
+
+Endpoints:
+    GET  /                 health + loaded models
+    GET  /ready            per model load state (503 until everything is loaded)
+    POST /predict          JSON (or msgpack, see wire_format.py) body:
     {
-        "model": "lr" | "svm",
+        "model": "lr" | "svm" | "distilbert" | "distilbert_int8" | "cascade",
         "posts": [
             { "title": "...", "body": "..." },
             ...
         ]
     }
+    (or "models": [...] for several models in one request)
+    POST /predict/stream   NDJSON posts in, NDJSON predictions out, chunk by chunk
+    POST /admin/reload     load another model version and swap it in
+    GET  /metrics          Prometheus style metrics (see metrics.py)
 
 Example Response:
     {
         "model": "lr",
+        "model_version": "864813b7a748",
         "predictions": [
             { "label": "positive", "score": 0.81 },
             { "label": "neutral",  "score": 0.65 },
             ...
         ]
     }
+
+The rest (micro batching, prediction cache + store, admission control, ...) lives in its own module,
+the settings are the environment variables near the top of this file.
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
+import json
 from flask_cors import CORS
 import joblib
 import os
+import threading
+import time
 import numpy as np  # for sigmoid on SVM decision_function
+from contextlib import ExitStack, contextmanager
+from functools import partial
+
+# Update: micro batching engine so concurrent DistilBERT calls share one forward pass
+from batching import MicroBatcher
+
+# Update: in-process prediction cache (repeated WSB texts skip the models completely)
+from prediction_cache import PredictionCache, artifact_fingerprint, normalize_text
+
+# Update: persistent prediction store on disk (shared with backtest.py and other workers)
+from prediction_store import PredictionStore
+
+# Update: one stacked coefficient matrix for LR + SVM, scored with NumPy over the whole batch
+from linear_scoring import StackedLinearScorer
+
+# Update: optional MessagePack request/response format (JSON stays the default)
+import wire_format
+
+# Update: admission control, bounded queue per model + per request deadlines
+from admission import AdmissionController, DeadlineExceeded, Overloaded, check_deadline
+
+# Update: in-memory Prometheus style metrics, GET /metrics
+import metrics
+
+# Update: versioned model bundles + hot reload
+import model_registry
+
+# Update: stateless hashing + idf feature pipeline (FEATURE_PIPELINE=hashing)
+from hashing_features import HashedTfidf
 
 # -----------------------------
 # Update: DistilBERT imports (updated)
 # -----------------------------
-# using HuggingFace Transformers to load my fine tuned DistilBERT
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-import torch  # DistilBERT runs on PyTorch
+# Update: torch + transformers are NOT imported here anymore, they take seconds to import
+# and LR/SVM don't need them. load_distilbert() imports them on a background thread.
 
 # Flask setup
 app = Flask(__name__)
@@ -59,100 +99,539 @@ CORS(app)  # allow cross-origin requests (Node/frontend can call this)
 
 MODEL_DIR = os.path.join(os.path.dirname(__file__), "model")
 
-LR_VECTORIZER_PATH = os.path.join(MODEL_DIR, "vectorizer_lr.pkl")
-LR_MODEL_PATH      = os.path.join(MODEL_DIR, "lr_model.pkl")
-SVM_MODEL_PATH     = os.path.join(MODEL_DIR, "svm_model.pkl")
+# ---Update: versioned model registry (see model_registry.py)---
+# with a model/versions/ folder the artifacts come from its CURRENT version (MODEL_VERSION=<name> pins one),
+# without it everything loads from the flat model/ folder like before.
+# MODEL_VERIFY_HASHES=0 skips re-hashing the artifacts against the manifest before loading them
+MODEL_VERIFY_HASHES = os.environ.get("MODEL_VERIFY_HASHES", "1") != "0"
+ACTIVE_BUNDLE, ACTIVE_BUNDLE_DIR = model_registry.resolve(MODEL_DIR, os.environ.get("MODEL_VERSION") or None)
+ACTIVE_PATHS = model_registry.bundle_paths(ACTIVE_BUNDLE_DIR)
+ACTIVE_MANIFEST = None   # set by start_model_loading() for registry bundles
+
+# ---Update: which features LR/SVM run on---
+# tfidf (default) = the pickled TfidfVectorizer (vectorizer_lr.pkl, lr_model.pkl, svm_model.pkl)
+# hashing = HashingVectorizer + idf weights from hashing_idf.npy (no vocabulary to unpickle,
+#           the idf array gets memory mapped with LINEAR_MODELS_MMAP=1), lr_model_hashing.pkl, svm_model_hashing.pkl
+FEATURE_PIPELINE = os.environ.get("FEATURE_PIPELINE", "tfidf").lower()
+if FEATURE_PIPELINE not in ("tfidf", "hashing"):
+    raise ValueError(f"FEATURE_PIPELINE must be tfidf or hashing, got {FEATURE_PIPELINE!r}")
+
+# registry artifact names per pipeline: features (all files the transform needs), lr, svm
+LINEAR_ARTIFACTS = {
+    "tfidf": (("vectorizer",), "lr", "svm"),
+    "hashing": (("hashing_idf", "hashing_config"), "lr_hashing", "svm_hashing"),
+}[FEATURE_PIPELINE]
+
+LR_VECTORIZER_PATH = ACTIVE_PATHS[LINEAR_ARTIFACTS[0][0]]
+LR_MODEL_PATH      = ACTIVE_PATHS[LINEAR_ARTIFACTS[1]]
+SVM_MODEL_PATH     = ACTIVE_PATHS[LINEAR_ARTIFACTS[2]]
 
 # ---DistilBERT path---
-DISTILBERT_DIR = os.path.join(MODEL_DIR, "distilbert_fin_sentiment")
+DISTILBERT_DIR = ACTIVE_PATHS["distilbert"]
+
+# ---Update: when/how DistilBERT gets loaded---
+# background (default) = own thread so LR/SVM serve within a fraction of a second of boot
+# sync = block startup until its loaded, off = never load it
+DISTILBERT_LOAD = os.environ.get("DISTILBERT_LOAD", "background").lower()
+
+# Update: LINEAR_MODELS_MMAP=1 memory-maps the numpy arrays inside the .pkl files instead of copying them
+# into every process (serve_prefork.py turns this on so forked workers share the same pages)
+LINEAR_MODELS_MMAP = "r" if os.environ.get("LINEAR_MODELS_MMAP", "0") != "0" else None
+
+# flask debug mode (with the auto reloader), on by default like before
+FLASK_DEBUG = os.environ.get("FLASK_DEBUG", "1") != "0"
+
+# ---Update: INT8 quantized DistilBERT---
+# DISTILBERT_INT8=0        -> off (default)
+# DISTILBERT_INT8=1        -> also serve "distilbert_int8", picked per request with "model": "distilbert_int8"
+# DISTILBERT_INT8=default  -> same, and plain "distilbert" requests get served by the int8 copy too
+DISTILBERT_INT8 = os.environ.get("DISTILBERT_INT8", "0").lower()
+DISTILBERT_INT8_PATH = ACTIVE_PATHS["distilbert_int8"]   # (update: lives next to the weights of its version)
+
+# every model key that runs through the DistilBERT code path
+TRANSFORMER_KEYS = ("distilbert", "distilbert_int8")
+
+# ---Update: DistilBERT micro batching settings---
+# concurrent /predict calls get queued and run together as one forward pass
+# DISTILBERT_BATCHING=0 turns it off (every request runs on its own like before)
+DISTILBERT_BATCHING = os.environ.get("DISTILBERT_BATCHING", "1") != "0"
+DISTILBERT_MAX_BATCH_SIZE = int(os.environ.get("DISTILBERT_MAX_BATCH_SIZE", 32))   # max posts per forward pass
+DISTILBERT_MAX_WAIT_MS = float(os.environ.get("DISTILBERT_MAX_WAIT_MS", 5))         # max time a request waits for company
+
+# ---Update: length bucketing---
+# texts get sorted by token length and run in sub batches of this size (less padding waste)
+DISTILBERT_BUCKET_SIZE = int(os.environ.get("DISTILBERT_BUCKET_SIZE", 16))
+
+# ---Update: streaming endpoint settings---
+# /predict/stream scores NDJSON posts in chunks of this many lines (memory stays flat)
+STREAM_CHUNK_SIZE = int(os.environ.get("STREAM_CHUNK_SIZE", 256))
+# biggest ?chunk_size= a caller can ask for (bigger values get capped to it)
+STREAM_MAX_CHUNK_SIZE = int(os.environ.get("STREAM_MAX_CHUNK_SIZE", 4096))
+
+# ---Update: prediction cache settings---
+# PREDICTION_CACHE=0 turns it off, TTL of 0 means entries never expire
+PREDICTION_CACHE_ENABLED = os.environ.get("PREDICTION_CACHE", "1") != "0"
+PREDICTION_CACHE_MAX_ENTRIES = int(os.environ.get("PREDICTION_CACHE_MAX_ENTRIES", 100_000))
+PREDICTION_CACHE_MAX_MB = float(os.environ.get("PREDICTION_CACHE_MAX_MB", 64))
+PREDICTION_CACHE_TTL_S = float(os.environ.get("PREDICTION_CACHE_TTL_S", 0))
+
+# ---Update: persistent prediction store settings---
+# PREDICTION_STORE=0 turns it off
+PREDICTION_STORE_ENABLED = os.environ.get("PREDICTION_STORE", "1") != "0"
+PREDICTION_STORE_PATH = os.environ.get(
+    "PREDICTION_STORE_PATH",
+    os.path.join(os.path.dirname(__file__), "data", "prediction_store.sqlite"),
+)
+
+# ---Update: admission control settings---
+# ADMISSION_CONTROL=0 turns it off (every request goes straight to the model like before)
+# *_MAX_CONCURRENCY = requests inside the model at the same time, *_MAX_QUEUE = requests allowed to wait,
+# anything beyond that gets 429 right away instead of piling up in flask threads
+ADMISSION_CONTROL = os.environ.get("ADMISSION_CONTROL", "1") != "0"
+LINEAR_MAX_CONCURRENCY = int(os.environ.get("LINEAR_MAX_CONCURRENCY", os.cpu_count() or 4))
+LINEAR_MAX_QUEUE = int(os.environ.get("LINEAR_MAX_QUEUE", 128))
+# default = one full micro batch of single post requests, so admission never starves the batcher
+DISTILBERT_MAX_CONCURRENCY = int(os.environ.get("DISTILBERT_MAX_CONCURRENCY", DISTILBERT_MAX_BATCH_SIZE))
+DISTILBERT_MAX_QUEUE = int(os.environ.get("DISTILBERT_MAX_QUEUE", 64))
+
+# default deadline when the caller doesn't send one, a bit under backtest.py's 60s timeout
+# (0 = no deadline)
+REQUEST_TIMEOUT_MS = float(os.environ.get("REQUEST_TIMEOUT_MS", 55_000))
+
+# ---Update: cascade model settings ("model": "cascade")---
+# every post is scored by CASCADE_FIRST_MODEL (lr or svm, cheap), only posts whose gate value is
+# below CASCADE_THRESHOLD get escalated to DistilBERT
+# CASCADE_GATE=confidence -> gate = top probability, margin -> top probability minus the runner up
+# (cascade_tune.py picks the threshold for a target agreement with full DistilBERT)
+CASCADE_KEY = "cascade"
+CASCADE_FIRST_MODEL = os.environ.get("CASCADE_FIRST_MODEL", "lr").lower()
+CASCADE_GATE = os.environ.get("CASCADE_GATE", "confidence").lower()
+CASCADE_THRESHOLD = float(os.environ.get("CASCADE_THRESHOLD", 0.75))
+
+
+class ModelSet:
+    """
+    Everything one model version serves with. Never changed once it's published:
+    loading / hot reloading builds a new ModelSet next to it and swaps the active_models reference
+    in one assignment. A request reads active_models ONCE when it starts and uses that object until
+    it's done, so it never mixes two versions and never waits for a reload (and a reload never waits
+    for it). The old set is freed when the last request still using it finishes.
+    """
+
+    def __init__(self, vectorizer=None, models=None, linear_scorer=None, versions=None,
+                 distilbert_tokenizer=None, distilbert_model=None, distilbert_int8_model=None):
+        self.vectorizer = vectorizer                  # shared TF IDF vectoriser
+        self.models = dict(models or {})              # all classifiers, e.g. {"lr": ..., "svm": ...}
+        # precomputed stacked coefficients of every linear model
+        self.linear_scorer = linear_scorer
+        # short version string per model key (fingerprint of its artifact files)
+        # the prediction cache is keyed on it, so retrained models never serve stale cached predictions
+        self.versions = dict(versions or {})
+        self.distilbert_tokenizer = distilbert_tokenizer
+        self.distilbert_model = distilbert_model
+        self.distilbert_int8_model = distilbert_int8_model   # quantized copy, shares the tokenizer with fp32
+
+    def replace(self, **changes):
+        # a new set with some fields swapped (the dicts get copied, this one stays as it is)
+        return ModelSet(**dict(vars(self), **changes))
+
+
+active_models = ModelSet()
 
-print("🔁 🔁 Loading sentiment models...")
+# only loaders take this (the initial DistilBERT load and a hot reload must not lose each other's changes),
+# requests never do
+publish_lock = threading.Lock()
 
-vectorizer = None   # shared TF IDF vectoriser
-MODELS = {}         # dict to hold all classifiers, e.g. {"lr": ..., "svm": ...}
+
+def publish_models(versions=None, **changes):
+    """
+    Makes a copy of the active ModelSet with changes applied the new active one.
+    versions get merged into the current ones (a None version drops that key).
+    """
+    global active_models
+
+    with publish_lock:
+        merged = {k: v for k, v in dict(active_models.versions, **(versions or {})).items() if v is not None}
+        active_models = active_models.replace(versions=merged, **changes)
+        return active_models
 
 # -----------------------------
-# Update: DistilBERT objects 
+# Update: per model load state (reported by /ready)
 # -----------------------------
-distilbert_tokenizer = None
-distilbert_model = None
+# state: "pending" -> "loading" -> "loaded" | "failed"   ("disabled" = turned off in settings)
+MODEL_STATUS = {
+    key: {"state": "pending", "load_seconds": None, "error": None}
+    for key in ["lr", "svm", "distilbert", "distilbert_int8"]
+}
+if DISTILBERT_INT8 == "0":
+    MODEL_STATUS["distilbert_int8"]["state"] = "disabled"
+if DISTILBERT_LOAD == "off":
+    MODEL_STATUS["distilbert"]["state"] = "disabled"
+    MODEL_STATUS["distilbert_int8"]["state"] = "disabled"
 
-try:
-    # loading up the shared TF IDF vectoriser trained on my large combined dataset
-    vectorizer = joblib.load(LR_VECTORIZER_PATH)
-    print(f"✅ ✅ Loaded TF-IDF vectoriser from {LR_VECTORIZER_PATH}")
+
+# -----------------------------
+# Update: metrics (rendered by GET /metrics)
+# -----------------------------
+metrics_registry = metrics.Registry()
+
+REQUEST_LATENCY = metrics_registry.histogram(
+    "ml_request_duration_seconds", "Request latency per endpoint and model",
+    metrics.LATENCY_BUCKETS, ("endpoint", "model"))
+REQUESTS_TOTAL = metrics_registry.counter(
+    "ml_requests_total", "Requests per endpoint, model and status code", ("endpoint", "model", "status"))
+STAGE_SECONDS = metrics_registry.histogram(
+    "ml_stage_duration_seconds", "Time per stage: text, vectorize, tokenize, forward, serialize",
+    metrics.LATENCY_BUCKETS, ("model", "stage"))
+BATCH_SIZE = metrics_registry.histogram(
+    "ml_model_batch_size", "Posts per model call (per forward pass for DistilBERT)",
+    metrics.BATCH_SIZE_BUCKETS, ("model",))
+TOKEN_COUNT = metrics_registry.histogram(
+    "ml_distilbert_tokens_per_text", "DistilBERT tokens per text (after truncation)",
+    metrics.TOKEN_BUCKETS, ("model",))
+PREDICTION_SOURCES = metrics_registry.counter(
+    "ml_prediction_texts_total",
+    "Texts by where the prediction came from (cache = in-process cache, store = sqlite, model = scored)",
+    ("model", "source"))
+CASCADE_DECISIONS = metrics_registry.counter(
+    "ml_cascade_decisions_total", "Cascade posts by the model that decided them", ("decided_by",))
+
+
+def set_status(keys, state, load_seconds=None, error=None):
+    for key in keys:
+        MODEL_STATUS[key] = {"state": state, "load_seconds": load_seconds, "error": error}
+
+
+def read_linear_models(paths):
+    """
+    Loads vectoriser + LR + SVM from one bundle WITHOUT touching the globals
+    (update: so a hot reload can load the next version while the current one keeps serving)
+    """
+    feature_keys, lr_key, svm_key = LINEAR_ARTIFACTS
+
+    if FEATURE_PIPELINE == "hashing":
+        # update: only a flat idf array + a tiny json, nothing to unpickle
+        vec = HashedTfidf.load(paths["hashing_idf"], paths["hashing_config"], mmap_mode=LINEAR_MODELS_MMAP)
+        print(f"✅ ✅ Loaded hashing idf weights from {paths['hashing_idf']} ({vec.n_features} buckets)")
+    else:
+        # loading up the shared TF IDF vectoriser trained on my large combined dataset
+        vec = joblib.load(paths["vectorizer"], mmap_mode=LINEAR_MODELS_MMAP)
+        print(f"✅ ✅ Loaded TF-IDF vectoriser from {paths['vectorizer']}")
 
     # loding the Logistic Regression model
-    lr_model = joblib.load(LR_MODEL_PATH)
-    MODELS["lr"] = lr_model
-    print(f"✅ ✅ Loaded LR model from {LR_MODEL_PATH}")
+    lr_model = joblib.load(paths[lr_key], mmap_mode=LINEAR_MODELS_MMAP)
+    print(f"✅ ✅ Loaded LR model from {paths[lr_key]}")
     print("➡️ ➡️ LR classes:", lr_model.classes_)
 
     # loading up SVM model
-    svm_model = joblib.load(SVM_MODEL_PATH)
-    MODELS["svm"] = svm_model
-    print(f"✅ ✅ Loaded SVM model from {SVM_MODEL_PATH}")
+    svm_model = joblib.load(paths[svm_key], mmap_mode=LINEAR_MODELS_MMAP)
+    print(f"✅ ✅ Loaded SVM model from {paths[svm_key]}")
     print("➡️ ➡️ SVM classes:", svm_model.classes_)
 
-    # ---Update: Loading DistilBERT model--- 
-    # Note to self: Im loading my fine tuned DistilBERT model from the local folder
-    # If this fails, LR/SVM should still work, so i do not crash the whole service.
+    return vec, {"lr": lr_model, "svm": svm_model}
+
+
+def linear_model_versions(paths, manifest=None):
+    # registry bundles: from the manifest hashes, flat layout: from the files on disk (like before)
+    # (update: over the files of the active FEATURE_PIPELINE, so tfidf and hashing never share cache entries)
+    feature_keys, lr_key, svm_key = LINEAR_ARTIFACTS
+    versions = {}
+    for model_key, artifact in (("lr", lr_key), ("svm", svm_key)):
+        keys = feature_keys + (artifact,)
+        if manifest is not None:
+            versions[model_key] = model_registry.content_version(
+                manifest, *(model_registry.ARTIFACTS[k] for k in keys))
+        else:
+            versions[model_key] = artifact_fingerprint(*(paths[k] for k in keys))
+    return versions
+
+
+def load_linear_models():
+    """
+    TF-IDF vectoriser + LR + SVM. No torch needed, so this is quick and runs before Flask binds the port.
+    """
+    set_status(["lr", "svm"], "loading")
+    t0 = time.perf_counter()
+
+    try:
+        vec, models = read_linear_models(ACTIVE_PATHS)
+        versions = linear_model_versions(ACTIVE_PATHS, ACTIVE_MANIFEST)
+        scorer = StackedLinearScorer(models)
+        print("➡️ ➡️ Vectorised scoring for:", list(scorer.slices.keys()))
+
+        publish_models(versions=versions, vectorizer=vec, models=models, linear_scorer=scorer)
+
+        set_status(["lr", "svm"], "loaded", load_seconds=time.perf_counter() - t0)
+
+    except Exception as e:
+        # If something fails here, I want a loud error in the logs, its just easier to spot among all the mess.
+        print("❌ ❌ ❌ Failed to load one or more models/vectoriser:", e)
+        publish_models(versions={"lr": None, "svm": None}, vectorizer=None, models={}, linear_scorer=None)
+        set_status(["lr", "svm"], "failed", load_seconds=time.perf_counter() - t0, error=str(e))
+
+
+def read_distilbert(paths):
+    """
+    ---Update: Loading DistilBERT model---
+    Note to self: Im loading my fine tuned DistilBERT model from the local folder
+    (update: returns (tokenizer, model) without touching the globals, see read_linear_models)
+    """
+    # the heavy imports happen here, not at module import
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    tokenizer = AutoTokenizer.from_pretrained(paths["distilbert"])
+    model = AutoModelForSequenceClassification.from_pretrained(paths["distilbert"])
+
+    # testing: set to evaluation mode (important: disables dropout etc.)
+    model.eval()
+    return tokenizer, model
+
+
+def distilbert_version(paths, manifest=None):
+    if manifest is not None:
+        return model_registry.content_version(manifest, "distilbert_fin_sentiment")
+    return artifact_fingerprint(paths["distilbert"])
+
+
+def load_distilbert():
+    """
+    If this fails, LR/SVM should still work, so i do not crash the whole service.
+    (update: runs on a background thread by default, see DISTILBERT_LOAD)
+    """
+    set_status(["distilbert"], "loading")
+    t0 = time.perf_counter()
+
     try:
-        distilbert_tokenizer = AutoTokenizer.from_pretrained(DISTILBERT_DIR)
-        distilbert_model = AutoModelForSequenceClassification.from_pretrained(DISTILBERT_DIR)
+        tokenizer, model = read_distilbert(ACTIVE_PATHS)
 
-        # testing: set to evaluation mode (important: disables dropout etc.)
-        distilbert_model.eval()
+        # version and model are published together: a request must never see the model without its version
+        version = distilbert_version(ACTIVE_PATHS, ACTIVE_MANIFEST)
+        publish_models(versions={"distilbert": version}, distilbert_tokenizer=tokenizer, distilbert_model=model)
 
-        print(f"✅ ✅ Loaded DistilBERT from {DISTILBERT_DIR}")
-        print("➡️ ➡️ DistilBERT id2label:", distilbert_model.config.id2label)
+        print(f"✅ ✅ Loaded DistilBERT from {ACTIVE_PATHS['distilbert']}")
+        print("➡️ ➡️ DistilBERT id2label:", model.config.id2label)
+        set_status(["distilbert"], "loaded", load_seconds=time.perf_counter() - t0)
 
     except Exception as bert_err:
         print("⚠️ ⚠️ DistilBERT not loaded (LR/SVM still available):", bert_err)
-        distilbert_tokenizer = None
-        distilbert_model = None
+        publish_models(distilbert_tokenizer=None, distilbert_model=None)
+        set_status(["distilbert"], "failed", load_seconds=time.perf_counter() - t0, error=str(bert_err))
+        if DISTILBERT_INT8 != "0":
+            set_status(["distilbert_int8"], "failed", error="fp32 DistilBERT did not load")
+        return
+
+    # ---Update: INT8 copy, built once and then loaded from DISTILBERT_INT8_PATH---
+    # if quantization fails, fp32 DistilBERT keeps working
+    if DISTILBERT_INT8 != "0":
+        set_status(["distilbert_int8"], "loading")
+        t0 = time.perf_counter()
+        try:
+            qmodel = read_distilbert_int8(model, ACTIVE_PATHS)
+
+            publish_models(versions={"distilbert_int8": version + "-int8"}, distilbert_int8_model=qmodel)
+
+            print(f"✅ ✅ Loaded INT8 DistilBERT ({ACTIVE_PATHS['distilbert_int8']})")
+            set_status(["distilbert_int8"], "loaded", load_seconds=time.perf_counter() - t0)
+        except Exception as q_err:
+            print("⚠️ ⚠️ INT8 DistilBERT not available (fp32 still works):", q_err)
+            publish_models(distilbert_int8_model=None)
+            set_status(["distilbert_int8"], "failed", load_seconds=time.perf_counter() - t0, error=str(q_err))
+
+
+def read_distilbert_int8(fp32_model, paths):
+    from distilbert_int8 import build_or_load_int8
+    return build_or_load_int8(fp32_model, paths["distilbert"], paths["distilbert_int8"])
+
+
+def start_model_loading():
+    """
+    LR/SVM load right away (fast), DistilBERT depends on DISTILBERT_LOAD:
+        background -> own thread, LR/SVM can serve while it loads (default)
+        sync       -> blocks until DistilBERT is loaded (old behaviour)
+        off        -> never loaded
+    """
+    global ACTIVE_MANIFEST
 
-except Exception as e:
-    # If something fails here, I want a loud error in the logs, its just easier to spot among all the mess.
-    print("❌ ❌ ❌ Failed to load one or more models/vectoriser:", e)
-    vectorizer = None
-    MODELS = {}
-    distilbert_tokenizer = None
-    distilbert_model = None
+    print("🔁 🔁 Loading sentiment models...")
+
+    # Update: registry bundle -> check the artifacts against their manifest first
+    if ACTIVE_BUNDLE is not None:
+        try:
+            ACTIVE_MANIFEST = read_bundle_manifest(ACTIVE_BUNDLE_DIR)
+            print(f"✅ ✅ Model version {ACTIVE_BUNDLE} ({ACTIVE_BUNDLE_DIR})")
+        except model_registry.RegistryError as e:
+            print(f"❌ ❌ ❌ Model version {ACTIVE_BUNDLE} failed its manifest check:", e)
+            set_status([k for k, st in MODEL_STATUS.items() if st["state"] != "disabled"], "failed", error=str(e))
+            return
+
+    load_linear_models()
+
+    if DISTILBERT_LOAD == "sync":
+        load_distilbert()
+    elif DISTILBERT_LOAD != "off":
+        threading.Thread(target=load_distilbert, name="distilbert-loader", daemon=True).start()
+
+
+def read_bundle_manifest(bundle_dir):
+    # re-hashing DistilBERT takes about a second, MODEL_VERIFY_HASHES=0 skips it
+    if MODEL_VERIFY_HASHES:
+        return model_registry.verify(bundle_dir)
+    return model_registry.read_manifest(bundle_dir)
 
 
 # --------------------------------------------------
-# Helper: generic prediction for any model in MODELS
+# Update: zero downtime hot reload of a registry version
 # --------------------------------------------------
+# the next version is loaded completely on a background thread while the current one keeps serving,
+# then published as one new ModelSet (requests already running finish on the old one)
+RELOAD_STATUS = {"state": "idle", "version": None, "error": None, "seconds": None}
+reload_lock = threading.Lock()
+
+
+def reload_models(version=None):
+    """
+    version=None -> whatever CURRENT points at (e.g. after `python model_registry.py activate v2`)
+    A version without a distilbert_fin_sentiment folder only replaces LR/SVM, DistilBERT stays as it is.
+    """
+    global ACTIVE_BUNDLE, ACTIVE_BUNDLE_DIR, ACTIVE_PATHS, ACTIVE_MANIFEST
+
+    t0 = time.perf_counter()
+    try:
+        bundle, bundle_dir = model_registry.resolve(MODEL_DIR, version)
+        if bundle is None:
+            raise model_registry.RegistryError("No model/versions folder yet, publish one with model_registry.py")
+        RELOAD_STATUS["version"] = bundle
+        print(f"🔁 🔁 Hot reload: loading model version {bundle} in the background...")
+
+        manifest = read_bundle_manifest(bundle_dir)
+        paths = model_registry.bundle_paths(bundle_dir)
+
+        vec, models = read_linear_models(paths)
+        versions = linear_model_versions(paths, manifest)
+        scorer = StackedLinearScorer(models)
+
+        bert = None
+        qmodel = None
+        if DISTILBERT_LOAD != "off" and os.path.isdir(paths["distilbert"]):
+            bert = read_distilbert(paths)
+            versions["distilbert"] = distilbert_version(paths, manifest)
+            if DISTILBERT_INT8 != "0":
+                qmodel = read_distilbert_int8(bert[1], paths)
+                versions["distilbert_int8"] = versions["distilbert"] + "-int8"
+
+        # the swap: one reference assignment, nobody waits for it and it waits for nobody
+        changes = {"vectorizer": vec, "models": models, "linear_scorer": scorer}
+        if bert is not None:
+            changes["distilbert_tokenizer"], changes["distilbert_model"] = bert
+            if qmodel is not None:
+                changes["distilbert_int8_model"] = qmodel
+        publish_models(versions=versions, **changes)
+        ACTIVE_BUNDLE, ACTIVE_BUNDLE_DIR, ACTIVE_PATHS, ACTIVE_MANIFEST = bundle, bundle_dir, paths, manifest
+
+        # next boot starts on this version too
+        model_registry.set_current(MODEL_DIR, bundle)
+
+        seconds = time.perf_counter() - t0
+        set_status([k for k in versions if k in MODEL_STATUS], "loaded", load_seconds=seconds)
+        RELOAD_STATUS.update(state="done", error=None, seconds=seconds)
+        print(f"✅ ✅ Now serving model version {bundle} ({seconds:.1f}s to load)")
+
+    except Exception as e:
+        # the old version just keeps serving
+        print("❌ ❌ ❌ Hot reload failed, still serving the previous version:", e)
+        RELOAD_STATUS.update(state="failed", error=str(e), seconds=time.perf_counter() - t0)
+    finally:
+        reload_lock.release()
 
-def predict_with_model(model_key, posts):
+
+def start_reload(version=None):
+    """
+    Starts reload_models on a background thread.
+    Returns False if a reload (or the initial DistilBERT load) is still running.
+    """
+    if loading_models(MODEL_STATUS.keys()) or not reload_lock.acquire(blocking=False):
+        return False
+
+    RELOAD_STATUS.update(state="loading", version=version, error=None, seconds=None)
+    threading.Thread(target=reload_models, args=(version,), name="model-reload", daemon=True).start()
+    return True
+
+
+# the flask debug reloader runs this file twice, the watcher parent process doesn't need any models
+if not (__name__ == "__main__" and FLASK_DEBUG and os.environ.get("WERKZEUG_RUN_MAIN") != "true"):
+    start_model_loading()
+
+
+# --------------------------------------------------
+# Helper: building the raw text for one post
+# --------------------------------------------------
+
+def build_post_text(p):
+    # title + body, avoiding completely empty strings (its rare edge case)
+    title = p.get("title", "") or ""
+    body = p.get("body", "") or ""
+    text = (str(title) + " " + str(body)).strip()
+    return text if text else " "
+
+
+# --------------------------------------------------
+# Helper: generic prediction for any linear model (lr, svm)
+# --------------------------------------------------
+
+def predict_with_model(model_key, posts, model_set=None):
     """
     posts: list of dicts like:
         { "title": "...", "body": "..." }
+    model_set: the ModelSet the request started on (update, default = the active one)
 
     Returns: list of dicts:
         { "label": str, "score": float }
     """
+    model_set = model_set or active_models
 
-    if vectorizer is None or not MODELS:
+    if model_set.vectorizer is None or not model_set.models:
         raise RuntimeError("Models/vectoriser not loaded")
 
-    if model_key not in MODELS:
+    if model_key not in model_set.models:
         raise RuntimeError(f"Unknown model key: {model_key}")
 
-    model = MODELS[model_key]
-
     # Building raw text for each post: title + body
-    texts = []
-    for p in posts:
-        title = p.get("title", "") or ""
-        body = p.get("body", "") or ""
-        text = (str(title) + " " + str(body)).strip()
-        # avoid completely empty strings (its rare edge case)
-        texts.append(text if text else " ")
+    t0 = time.perf_counter()
+    texts = [build_post_text(p) for p in posts]
+    t1 = time.perf_counter()
 
     # Text -> TF-IDF vectors
-    X_vec = vectorizer.transform(texts)
+    X_vec = model_set.vectorizer.transform(texts)
+    t2 = time.perf_counter()
+
+    predictions = score_with_model(model_key, X_vec, model_set)
+
+    STAGE_SECONDS.observe(t1 - t0, model_key, "text")
+    STAGE_SECONDS.observe(t2 - t1, model_key, "vectorize")
+    STAGE_SECONDS.observe(time.perf_counter() - t2, model_key, "forward")
+    BATCH_SIZE.observe(len(posts), model_key)
+    return predictions
+
+
+# Update: split out of predict_with_model so LR and SVM can share one TF-IDF matrix
+# (see predict_with_models, the vectoriser only runs once for both)
+def score_with_model(model_key, X_vec, model_set=None):
+    """
+    X_vec: TF-IDF matrix (one row per post)
+    Returns: list of dicts { "label": str, "score": float }
+    """
+    model_set = model_set or active_models
+    scorer = model_set.linear_scorer
+
+    # Update: fast path, one matrix product + NumPy argmax for the whole batch
+    if scorer is not None and scorer.supports(model_key):
+        # (only this model's columns of W, the full stacked product is for predict_with_models)
+        margins = scorer.margins(X_vec, model_key)
+        labels, scores = scorer.label_score_columns(model_key, margins)
+        return scorer.to_predictions(labels, scores)
+
+    # old generic path (still used for any model the stacked scorer can't handle)
+    model = model_set.models[model_key]
 
     #update: using sigmoid formula to convert svm margins into 0-1 probability style 
     # Both LR and (optionally) SVM may expose predict_proba
@@ -199,80 +678,629 @@ def predict_with_model(model_key, posts):
     DistilBERT path.
     posts: list of dicts like:
         { "title": "...", "body": "..." }
+    model_key: "distilbert" (fp32) or "distilbert_int8" (update: quantized copy)
 
     Returns: list of dicts:
         { "label": str, "score": float }
     """
-def predict_with_distilbert(posts):
+def get_distilbert(model_key, model_set=None):
+    # which loaded DistilBERT object serves this key (None if not loaded)
+    model_set = model_set or active_models
+    if model_key == "distilbert_int8":
+        return model_set.distilbert_int8_model
+    if model_key == "distilbert":
+        return model_set.distilbert_model
+    return None
+
+
+def predict_with_distilbert(posts, model_key="distilbert", model_set=None):
+    model_set = model_set or active_models
+    distilbert_tokenizer = model_set.distilbert_tokenizer
 
-    if distilbert_model is None or distilbert_tokenizer is None:
-        raise RuntimeError("DistilBERT model not loaded")
+    bert_model = get_distilbert(model_key, model_set)
+    if bert_model is None or distilbert_tokenizer is None:
+        raise RuntimeError(f"DistilBERT model not loaded ({model_key})")
+
+    import torch  # DistilBERT runs on PyTorch (already imported by load_distilbert, so this is just a lookup)
 
     # Building raw text for each post: title + body (same style as LR/SVM)
-    texts = []
-    for p in posts:
-        title = p.get("title", "") or ""
-        body = p.get("body", "") or ""
-        text = (str(title) + " " + str(body)).strip()
-        texts.append(text if text else " ")
+    t0 = time.perf_counter()
+    texts = [build_post_text(p) for p in posts]
+    t1 = time.perf_counter()
 
     # Again adding this to avoid confusion
     # Tokenising = converting text into numbers the model understands
-    # padding = True makes all sequences same length in batch
     # truncation = True cuts very long texts safely
+    # Update: no padding here anymore, I only tokenise once to find out how long every text is
     encodings = distilbert_tokenizer(
         texts,
-        padding=True,
         truncation=True,
         max_length=128,        # keeping this consistent with training
-        return_tensors="pt"    # return PyTorch tensors
     )
 
-    # running on CPU (Flask is running locally)
-    distilbert_model.to("cpu")
-    encodings = {k: v.to("cpu") for k, v in encodings.items()}
+    # Update: length bucketing
+    # padding=True on the whole request meant one 128 token WSB rant forced every
+    # short title to be padded (and computed) up to 128 tokens.
+    # so now I sort the texts by token length and run them in small sub batches,
+    # every sub batch only gets padded up to its own longest text
+    lengths = [len(ids) for ids in encodings["input_ids"]]
+    order = sorted(range(len(texts)), key=lambda i: lengths[i])
 
-    # inference mode: no gradients, faster + less memory (note: still testing)
-    with torch.no_grad():
-        outputs = distilbert_model(**encodings)
-        logits = outputs.logits                 # raw outputs (not probabilities yet)
-        probs = torch.softmax(logits, dim=-1)   # convert logits -> probabilities
+    tokenize_s = time.perf_counter() - t1
+    forward_s = 0.0
+
+    # running on CPU (Flask is running locally)
+    bert_model.to("cpu")
 
     # id2label is how the model maps class ids back to readable labels
-    id2label = distilbert_model.config.id2label
+    id2label = bert_model.config.id2label
+
+    predictions = [None] * len(texts)
+
+    for start in range(0, len(order), DISTILBERT_BUCKET_SIZE):
+        bucket = order[start:start + DISTILBERT_BUCKET_SIZE]
+
+        # padding = True makes all sequences in this bucket the same length
+        features = [{k: encodings[k][i] for k in encodings.keys()} for i in bucket]
+        t_pad = time.perf_counter()
+        batch = distilbert_tokenizer.pad(features, padding=True, return_tensors="pt")
+        batch = {k: v.to("cpu") for k, v in batch.items()}
+        t_fwd = time.perf_counter()
+        tokenize_s += t_fwd - t_pad
+
+        # inference mode: no gradients, faster + less memory (note: still testing)
+        with torch.no_grad():
+            outputs = bert_model(**batch)
+            logits = outputs.logits                 # raw outputs (not probabilities yet)
+            probs = torch.softmax(logits, dim=-1)   # convert logits -> probabilities
+        forward_s += time.perf_counter() - t_fwd
+
+        # putting every result back in the original position of its text
+        for row, i in zip(probs, bucket):
+            max_idx = int(torch.argmax(row).item())
+            score = float(row[max_idx].item())
+            label = str(id2label[max_idx]).lower()  # keeping labels consistent with LR/SVM style
+
+            predictions[i] = {
+                "label": label,
+                "score": score
+            }
+
+    STAGE_SECONDS.observe(t1 - t0, model_key, "text")
+    STAGE_SECONDS.observe(tokenize_s, model_key, "tokenize")
+    STAGE_SECONDS.observe(forward_s, model_key, "forward")
+    BATCH_SIZE.observe(len(posts), model_key)
+    TOKEN_COUNT.observe_many(lengths, model_key)
 
-    predictions = []
-    for i in range(len(texts)):
-        row = probs[i]
-        max_idx = int(torch.argmax(row).item())
-        score = float(row[max_idx].item())
-        label = str(id2label[max_idx]).lower()  # keeping labels consistent with LR/SVM style
+    return predictions
 
-        predictions.append({
-            "label": label,
-            "score": score
-        })
 
-    return predictions
+# --------------------------------------------------
+# Update: DistilBERT micro batcher
+# --------------------------------------------------
+# the worker thread only starts on the first submit(), so this is cheap to create here
+# (update: one batcher per DistilBERT variant, fp32 and int8 posts never share a forward pass)
+# (update: the request's ModelSet goes in as the batch context, posts of two versions never share one either)
+def distilbert_batch_fn(model_key):
+    return lambda posts, model_set=None: predict_with_distilbert(posts, model_key, model_set)
+
+
+distilbert_batchers = {
+    key: MicroBatcher(
+        distilbert_batch_fn(key),
+        max_batch_size=DISTILBERT_MAX_BATCH_SIZE,
+        max_wait_ms=DISTILBERT_MAX_WAIT_MS,
+        name=f"{key}-batcher",
+    )
+    for key in TRANSFORMER_KEYS
+}
+
+
+def run_distilbert(posts, model_key="distilbert", deadline=None, shed=True, model_set=None):
+    # update: waits for a DistilBERT slot first (admission control), expired requests never get one
+    model_set = model_set or active_models
+    with admitted([model_key], deadline, shed=shed):
+        # concurrent distilbert requests go through the micro batcher (unless its turned off)
+        if DISTILBERT_BATCHING:
+            return distilbert_batchers[model_key].submit(posts, deadline=deadline, context=model_set)
+        return predict_with_distilbert(posts, model_key, model_set)
+
+
+def run_linear(posts, model_key, deadline=None, shed=True, model_set=None):
+    # same as run_distilbert, for lr/svm
+    with admitted([model_key], deadline, shed=shed):
+        return predict_with_model(model_key, posts, model_set)
+
+
+# --------------------------------------------------
+# Update: admission control
+# --------------------------------------------------
+# one controller per model key, LR and SVM share the linear limits, fp32 and int8 DistilBERT the transformer ones
+admission_controllers = {
+    key: AdmissionController(key, LINEAR_MAX_CONCURRENCY, LINEAR_MAX_QUEUE) for key in ["lr", "svm"]
+}
+admission_controllers.update({
+    key: AdmissionController(key, DISTILBERT_MAX_CONCURRENCY, DISTILBERT_MAX_QUEUE) for key in TRANSFORMER_KEYS
+})
+
+
+@contextmanager
+def admitted(model_keys, deadline=None, shed=True):
+    """
+    Holds a slot of every model in model_keys while the block runs.
+    Raises Overloaded (queue full) or DeadlineExceeded (caller already timed out).
+    Keys are always taken in sorted order so two multi model requests can't block each other.
+    """
+    with ExitStack() as stack:
+        if ADMISSION_CONTROL:
+            for key in sorted(set(model_keys)):
+                controller = admission_controllers.get(key)
+                if controller is not None:
+                    stack.enter_context(controller.admit(deadline, shed=shed))
+        check_deadline(deadline)
+        yield
+
+
+def request_deadline(data=None):
+    """
+    time.monotonic() deadline of the current request (None = no deadline)
+    X-Request-Timeout-Ms header first, then "timeout_ms" in the body, then REQUEST_TIMEOUT_MS
+    """
+    return parse_deadline(request.headers.get("X-Request-Timeout-Ms"), data)
+
+
+def parse_deadline(timeout_ms, data=None):
+    # split out of request_deadline so asgi_app.py can use it without a flask request
+    if timeout_ms is None and isinstance(data, dict):
+        timeout_ms = data.get("timeout_ms")
+    if timeout_ms is None:
+        timeout_ms = REQUEST_TIMEOUT_MS
+
+    timeout_ms = float(timeout_ms)   # ValueError -> 400 in the route
+    if timeout_ms <= 0:
+        return None
+    return time.monotonic() + timeout_ms / 1000.0
+
+
+def overloaded_response(err):
+    # 429 + Retry-After, the Node proxy / backtest can back off instead of timing out
+    resp = jsonify({"error": "Model overloaded, retry later", "model": err.model_key})
+    resp.status_code = 429
+    resp.headers["Retry-After"] = str(err.retry_after)
+    return resp
+
+
+def deadline_response():
+    return jsonify({"error": "Request deadline exceeded before inference"}), 504
+
+
+def resolve_model_key(model_key, model_set=None):
+    # Update: with DISTILBERT_INT8=default, plain "distilbert" is served by the int8 copy
+    model_set = model_set or active_models
+    if model_key == "distilbert" and DISTILBERT_INT8 == "default" and model_set.distilbert_int8_model is not None:
+        return "distilbert_int8"
+    return model_key
+
+
+# --------------------------------------------------
+# Update: prediction cache in front of every model
+# --------------------------------------------------
+prediction_cache = PredictionCache(
+    max_entries=PREDICTION_CACHE_MAX_ENTRIES,
+    max_bytes=int(PREDICTION_CACHE_MAX_MB * 1024 * 1024),
+    ttl_seconds=PREDICTION_CACHE_TTL_S,
+)
+
+
+# the store is optional, if the file can't be opened LR/SVM/DistilBERT still work without it
+prediction_store = None
+if PREDICTION_STORE_ENABLED:
+    try:
+        prediction_store = PredictionStore(PREDICTION_STORE_PATH)
+        print(f"✅ ✅ Prediction store at {PREDICTION_STORE_PATH}")
+    except Exception as store_err:
+        print("⚠️ ⚠️ Prediction store not available:", store_err)
+        prediction_store = None
+
+
+def lookup_predictions(model_key, texts, model_set):
+    """
+    Lookup order: in-process cache -> on-disk store
+    texts: already normalised texts
+    model_set: ModelSet of the request (its version of model_key is part of the key)
+
+    Returns (predictions, missing, found)
+        predictions: list with a cached prediction or None per text
+        missing: unique texts that nobody has scored yet (these need a real model call)
+        found: text -> prediction for everything that came from the store
+    """
+    version = model_set.versions.get(model_key)
+
+    if PREDICTION_CACHE_ENABLED:
+        predictions = prediction_cache.get_many(model_key, version, texts)
+    else:
+        predictions = [None] * len(texts)
+
+    # unique texts that still need a prediction
+    missing = list(dict.fromkeys(t for t, pred in zip(texts, predictions) if pred is None))
+    found = {}
+
+    if missing and prediction_store is not None and version is not None:
+        stored = prediction_store.get_many(model_key, version, missing)
+        from_store = [(t, pred) for t, pred in zip(missing, stored) if pred is not None]
+        found.update(from_store)
+
+        if PREDICTION_CACHE_ENABLED and from_store:
+            prediction_cache.put_many(model_key, version, [t for t, _ in from_store], [p for _, p in from_store])
+
+        missing = [t for t in missing if t not in found]
+
+    PREDICTION_SOURCES.inc(model_key, "cache", amount=sum(pred is not None for pred in predictions))
+    PREDICTION_SOURCES.inc(model_key, "store", amount=len(found))
+    PREDICTION_SOURCES.inc(model_key, "model", amount=len(missing))
+
+    return predictions, missing, found
+
+
+def save_predictions(model_key, texts, predictions, model_set):
+    # fresh model predictions go into both the cache and the store
+    version = model_set.versions.get(model_key)
+
+    if PREDICTION_CACHE_ENABLED:
+        prediction_cache.put_many(model_key, version, texts, predictions)
+    if prediction_store is not None and version is not None:
+        prediction_store.put_many(model_key, version, texts, predictions)
+
+
+def merge_predictions(texts, predictions, found):
+    # filling every None slot from text -> prediction (copies, so callers can't mutate shared dicts)
+    return [pred if pred is not None else dict(found[t]) for t, pred in zip(texts, predictions)]
+
+
+def predict_cached(model_key, posts, predict_fn, model_set):
+    """
+    Only texts nobody has scored before ever reach predict_fn (vectoriser / DistilBERT).
+    Duplicate texts inside one request are only scored once too.
+    """
+    if not PREDICTION_CACHE_ENABLED and prediction_store is None:
+        PREDICTION_SOURCES.inc(model_key, "model", amount=len(posts))
+        return predict_fn(posts)
+
+    # (update: not timed as the "text" stage here, the predictor times its own text building
+    # for every model call, observing it here too counted the same request twice)
+    texts = [normalize_text(build_post_text(p)) for p in posts]
+    predictions, missing, found = lookup_predictions(model_key, texts, model_set)
+
+    if missing:
+        fresh = predict_fn([{"title": t, "body": ""} for t in missing])
+        found.update(zip(missing, fresh))
+        save_predictions(model_key, missing, fresh, model_set)
+
+    return merge_predictions(texts, predictions, found)
+
+
+# --------------------------------------------------
+# Update: several models in one request
+# --------------------------------------------------
+# LR and SVM share vectorizer_lr.pkl, so when both are requested I build the texts once,
+# run vectorizer.transform once and score both classifiers on the same TF-IDF matrix.
+# (update) DistilBERT runs after that on the SAME request thread, no side thread pool:
+# a fixed size pool capped how many DistilBERT calls could run at once (2, whatever the load)
+# and its queue was invisible to admission control. The micro batcher already merges
+# concurrent requests, and the DistilBERT admission slot is what decides who waits / gets shed.
+
+
+def predict_with_models(model_keys, posts, deadline=None, model_set=None):
+    """
+    model_keys: e.g. ["lr", "svm", "distilbert"]
+    Returns: dict model_key -> list of { "label": str, "score": float }
+    (update: deadline = time.monotonic() value, see request_deadline)
+    """
+    model_set = model_set or active_models
+
+    t0 = time.perf_counter()
+    texts = [normalize_text(build_post_text(p)) for p in posts]
+    STAGE_SECONDS.observe(time.perf_counter() - t0, ",".join(model_keys), "text")
+
+    lookups = {key: lookup_predictions(key, texts, model_set) for key in model_keys}
+
+    # union of all texts any linear model still needs -> ONE vectorizer.transform call
+    linear_keys = [key for key in model_keys if key not in TRANSFORMER_KEYS and lookups[key][1]]
+    if linear_keys:
+        if model_set.vectorizer is None:
+            raise RuntimeError("Models/vectoriser not loaded")
+
+        # update: one slot of every linear model for the shared transform + matrix product
+        with admitted(linear_keys, deadline):
+            fresh_by_key = score_linear_union(linear_keys, lookups, model_set)
+
+        for key, fresh in fresh_by_key.items():
+            lookups[key][2].update(zip(lookups[key][1], fresh))
+            save_predictions(key, lookups[key][1], fresh, model_set)
+
+    # then DistilBERT (fp32 and/or int8) inline, concurrent requests still get batched together
+    for key in model_keys:
+        bert_missing = lookups[key][1]
+        if key not in TRANSFORMER_KEYS or not bert_missing:
+            continue
+        fresh = run_distilbert([{"title": t, "body": ""} for t in bert_missing], key, deadline, model_set=model_set)
+        lookups[key][2].update(zip(bert_missing, fresh))
+        save_predictions(key, bert_missing, fresh, model_set)
+
+    return {key: merge_predictions(texts, lookups[key][0], lookups[key][2]) for key in model_keys}
+
+
+def score_linear_union(linear_keys, lookups, model_set):
+    """
+    Scores the missing texts of every linear model with ONE vectorizer.transform call.
+    Returns: dict model_key -> fresh predictions (same order as that model's missing texts)
+    """
+    union = list(dict.fromkeys(t for key in linear_keys for t in lookups[key][1]))
+    row_of = {t: i for i, t in enumerate(union)}
+    t0 = time.perf_counter()
+    X_vec = model_set.vectorizer.transform(union)
+    t1 = time.perf_counter()
+    fresh_by_key = {}
+
+    # (update) and ONE matrix product for every stacked linear model
+    scorer = model_set.linear_scorer
+    margins = None
+    if scorer is not None and any(scorer.supports(k) for k in linear_keys):
+        margins = scorer.margins(X_vec)
+
+    for key in linear_keys:
+        missing = lookups[key][1]
+        rows = None if missing == union else [row_of[t] for t in missing]
+
+        if margins is not None and scorer.supports(key):
+            labels, scores = scorer.label_score_columns(key, margins, rows)
+            fresh = scorer.to_predictions(labels, scores)
+        else:
+            fresh = score_with_model(key, X_vec if rows is None else X_vec[rows], model_set)
+        fresh_by_key[key] = fresh
+
+    # the transform + product are shared, so they are recorded once under e.g. model="lr,svm"
+    shared = ",".join(linear_keys)
+    STAGE_SECONDS.observe(t1 - t0, shared, "vectorize")
+    STAGE_SECONDS.observe(time.perf_counter() - t1, shared, "forward")
+    BATCH_SIZE.observe(len(union), shared)
+
+    return fresh_by_key
 
 
 # -----------------
 # Routes
 # -----------------
 
+# Update: request latency + status per endpoint/model, the routes put the model key in g.metrics_model
+@app.before_request
+def start_request_timer():
+    g.request_t0 = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    t0 = g.get("request_t0")
+    if t0 is not None and request.endpoint not in (None, "metrics_endpoint", "static"):
+        model = g.get("metrics_model", "none")
+        # note: for /predict/stream this is time to first byte, the chunks are timed as stages
+        REQUEST_LATENCY.observe(time.perf_counter() - t0, request.path, model)
+        REQUESTS_TOTAL.inc(request.path, model, str(response.status_code))
+    return response
+
 @app.route("/", methods=["GET"])
 def health_check():
     # simple health check endpoint
+    return jsonify(health_payload())
+
+
+def served_model_versions(model_set=None):
+    """
+    model name -> version of the model that ACTUALLY answers a request for that name.
+    Update: with DISTILBERT_INT8=default "distilbert" is served by the int8 copy, so it reports the int8
+    version (callers like backtest.py key their prediction stores on this, fp32 would be wrong there)
+    """
+    model_set = model_set or active_models
+    return {name: model_set.versions.get(resolve_model_key(name, model_set)) for name in model_set.versions}
+
+
+def served_model_keys(model_set=None):
+    # model name -> key its predictions are cached/stored under (the same aliasing as above)
+    model_set = model_set or active_models
+    return {name: resolve_model_key(name, model_set) for name in model_set.versions}
+
+
+def health_payload():
+    # (update: shared with asgi_app.py)
+    model_set = active_models
+
     # adding distilbert to the list only if its actually loaded
-    available = list(MODELS.keys())
-    if distilbert_model is not None:
+    available = list(model_set.models.keys())
+    if model_set.distilbert_model is not None:
         available.append("distilbert")
+    if model_set.distilbert_int8_model is not None:
+        available.append("distilbert_int8")
 
-    return jsonify({
+    return {
         "status": "ok",
         "message": "🔥 🔥 🔥 Flask ML service is running",
-        "available_models": available
-    })
+        "available_models": available,
+        "model_versions": served_model_versions(model_set),
+        "served_models": served_model_keys(model_set),
+        "model_bundle": ACTIVE_BUNDLE,
+        "feature_pipeline": FEATURE_PIPELINE,
+        "reload": RELOAD_STATUS,
+        "distilbert_int8": DISTILBERT_INT8,
+        "cascade": {"first_model": CASCADE_FIRST_MODEL, "gate": CASCADE_GATE, "threshold": CASCADE_THRESHOLD},
+        "distilbert_batching": {
+            "enabled": DISTILBERT_BATCHING,
+            "max_batch_size": DISTILBERT_MAX_BATCH_SIZE,
+            "max_wait_ms": DISTILBERT_MAX_WAIT_MS,
+        },
+        "prediction_cache": dict(prediction_cache.stats(), enabled=PREDICTION_CACHE_ENABLED),
+        "prediction_store": PREDICTION_STORE_PATH if prediction_store is not None else None,
+        "admission": {
+            "enabled": ADMISSION_CONTROL,
+            "default_timeout_ms": REQUEST_TIMEOUT_MS,
+            "models": {key: c.stats() for key, c in admission_controllers.items()},
+        },
+    }
+
+
+@app.route("/ready", methods=["GET"])
+def ready():
+    """
+    Update: readiness endpoint, per model load state + load time
+        GET /ready            -> 200 once every enabled model finished loading, else 503
+        GET /ready?model=lr   -> 200 once that one model is loaded, else 503
+    """
+    payload = readiness_payload((request.args.get("model") or "").lower())
+    return jsonify(payload), (200 if payload["ready"] else 503)
+
+
+def readiness_payload(model=""):
+    # (update: shared with asgi_app.py)
+    if model:
+        status = MODEL_STATUS.get(model)
+        is_ready = status is not None and status["state"] == "loaded"
+    else:
+        enabled = [st for st in MODEL_STATUS.values() if st["state"] != "disabled"]
+        is_ready = all(st["state"] == "loaded" for st in enabled)
+
+    return {"ready": is_ready, "models": MODEL_STATUS}
+
+
+def loading_models(model_keys):
+    # (update: the cascade is loading while any of its two models is)
+    keys = [part for k in model_keys for part in (cascade_parts() if k == CASCADE_KEY else [k])]
+    return [k for k in keys if MODEL_STATUS.get(k, {}).get("state") in ("pending", "loading")]
+
+
+def still_loading(model_keys):
+    """
+    503 + Retry-After if any of these models is still loading in the background
+    (instead of a confusing 500 "not loaded" while DistilBERT is on its way)
+    """
+    loading = loading_models(model_keys)
+    if not loading:
+        return None
+
+    resp = jsonify({"error": "Model still loading, retry shortly", "models": loading})
+    resp.status_code = 503
+    resp.headers["Retry-After"] = "5"
+    return resp
+
+
+def pick_model_key(requested_model, model_set=None):
+    # Fallback to LR if someone passes a wrong model name
+    # (update: allow distilbert as well, and its int8 copy, and the cascade)
+    model_set = model_set or active_models
+    if requested_model == CASCADE_KEY:
+        return CASCADE_KEY
+    if requested_model not in model_set.models and requested_model not in TRANSFORMER_KEYS:
+        requested_model = "lr"
+    return resolve_model_key(requested_model, model_set)
+
+
+def predict_single(model_key, posts, deadline=None, shed=True, model_set=None):
+    # update: distilbert has its own path, lr/svm goes to the old function
+    # (update: both go through the prediction cache first, only misses reach the models)
+    # (update: and only misses need an admission slot, cached answers are never shed)
+    model_set = model_set or active_models
+
+    if model_key == CASCADE_KEY:
+        return predict_cascade(posts, deadline, shed, model_set)
+
+    run = run_distilbert if model_key in TRANSFORMER_KEYS else run_linear
+    return predict_cached(model_key, posts, partial(run, model_key=model_key, deadline=deadline,
+                                                    shed=shed, model_set=model_set), model_set)
+
+
+# Update: the whole request runs on ONE model version (the ModelSet it started with, a hot reload
+# never waits for it), and the version goes back in the response so callers can key their own caches on it
+def predict_versioned(model_key, posts, deadline=None, shed=True, model_set=None):
+    model_set = model_set or active_models
+    return predict_single(model_key, posts, deadline, shed, model_set), model_version_of(model_key, model_set)
+
+
+def model_version_of(model_key, model_set=None):
+    model_set = model_set or active_models
+    if model_key == CASCADE_KEY:
+        # both models + the gate, a different threshold gives different answers
+        first, escalate = cascade_parts(model_set)
+        return (f"{first}:{model_set.versions.get(first)}+{escalate}:{model_set.versions.get(escalate)}"
+                f"@{CASCADE_GATE}<{CASCADE_THRESHOLD:g}")
+    return model_set.versions.get(model_key)
+
+
+# --------------------------------------------------
+# Update: cascade, cheap linear model first, DistilBERT only for the uncertain posts
+# --------------------------------------------------
+
+def cascade_parts(model_set=None):
+    # (first model, model that uncertain posts get escalated to)
+    return CASCADE_FIRST_MODEL, resolve_model_key("distilbert", model_set)
+
+
+def first_stage_columns(model_key, posts, model_set=None):
+    """
+    Scores posts with a linear model.
+    Returns three arrays: labels, scores (top probability) and gaps (top probability - runner up)
+    """
+    model_set = model_set or active_models
+    if model_set.vectorizer is None or model_key not in model_set.models:
+        raise RuntimeError(f"Cascade first model '{model_key}' is not a loaded linear model")
+
+    X_vec = model_set.vectorizer.transform([build_post_text(p) for p in posts])
+
+    scorer = model_set.linear_scorer
+    if scorer is not None and scorer.supports(model_key):
+        probas = scorer.probabilities(model_key, scorer.margins(X_vec))
+        labels, scores = scorer.label_score_columns(model_key, None, probas=probas)
+        return labels, scores, scorer.top_two_gap(probas)
+
+    # old generic path only knows the top score, so the margin gate falls back to it
+    predictions = score_with_model(model_key, X_vec, model_set)
+    labels = np.array([p["label"] for p in predictions], dtype=object)
+    scores = np.array([p["score"] for p in predictions], dtype=np.float64)
+    return labels, scores, scores
+
+
+def predict_cascade(posts, deadline=None, shed=True, model_set=None):
+    """
+    Returns: list of dicts { "label": str, "score": float, "decided_by": "lr" | "distilbert" | ... }
+    """
+    model_set = model_set or active_models
+    first, escalate_key = cascade_parts(model_set)
+
+    t0 = time.perf_counter()
+    with admitted([first], deadline, shed=shed):
+        labels, scores, gaps = first_stage_columns(first, posts, model_set)
+    STAGE_SECONDS.observe(time.perf_counter() - t0, CASCADE_KEY, "first_stage")
+
+    gate = gaps if CASCADE_GATE == "margin" else scores
+    escalate = np.flatnonzero(gate < CASCADE_THRESHOLD).tolist()
+
+    predictions = [
+        {"label": label, "score": score, "decided_by": first}
+        for label, score in zip(labels.tolist(), scores.tolist())
+    ]
+
+    # uncertain posts go through the normal DistilBERT path (cache, store, micro batcher, admission)
+    if escalate:
+        bert_predictions = predict_single(escalate_key, [posts[i] for i in escalate], deadline, shed, model_set)
+        for i, pred in zip(escalate, bert_predictions):
+            predictions[i] = dict(pred, decided_by=escalate_key)
+
+    CASCADE_DECISIONS.inc(first, amount=len(posts) - len(escalate))
+    CASCADE_DECISIONS.inc(escalate_key, amount=len(escalate))
+    return predictions
+
+
+def predict_multi_versioned(model_keys, posts, deadline=None, model_set=None):
+    model_set = model_set or active_models
+    predictions = predict_with_models(model_keys, posts, deadline, model_set)
+    return predictions, {key: model_set.versions.get(key) for key in model_keys}
 
 
 @app.route("/predict", methods=["POST"])
@@ -280,18 +1308,33 @@ def predict():
     """
     Main prediction endpoint
     Expects JSON:
-        { "model": "lr" | "svm", "posts": [...] }
+        { "model": "lr" | "svm" | "distilbert" | "distilbert_int8" | "cascade", "posts": [...] }
 
     If an unknown model is requested, i fall back to "lr"
     to keep the API forgiving and not to break anything.
+
+    Update: also accepts/returns MessagePack (see wire_format.py), JSON stays the default
     """
+    # (update: every model this request touches comes from this one ModelSet)
+    model_set = active_models
+    binary_request = wire_format.is_msgpack(request.content_type)
+
     try:
-        data = request.get_json(force=True)
+        if binary_request:
+            if not wire_format.msgpack_available():
+                return jsonify({"error": "MessagePack not supported (pip install msgpack)"}), 415
+            data = wire_format.decode_request(request.get_data())
+        else:
+            data = request.get_json(force=True)
     except Exception:
-        return jsonify({"error": "Invalid JSON body"}), 400
+        return jsonify({"error": "Invalid JSON body" if not binary_request else "Invalid msgpack body"}), 400
+
+    binary = wants_msgpack(binary_request)
 
     if not data:
         return jsonify({"error": "Missing JSON body"}), 400
+    if not isinstance(data, dict):
+        return jsonify({"error": "JSON body must be an object"}), 400
 
     # default to LR if nothing is provided
     requested_model = (data.get("model") or "lr").lower()
@@ -300,29 +1343,300 @@ def predict():
     if not posts or not isinstance(posts, list):
         return jsonify({"error": "Field 'posts' must be a non-empty list"}), 400
 
-    # Fallback to LR if someone passes a wrong model name
-    # (update: allow distilbert as well)
-    if requested_model not in MODELS and requested_model != "distilbert":
-        requested_model = "lr"
+    try:
+        deadline = request_deadline(data)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Timeout must be a number of milliseconds"}), 400
+
+    # Update: "models": [...] scores the same posts with several models in one pass
+    if data.get("models") is not None:
+        return predict_multi(data.get("models"), posts, binary, deadline, model_set)
+
+    requested_model = pick_model_key(requested_model, model_set)
+    g.metrics_model = requested_model
+
+    loading = still_loading([requested_model])
+    if loading is not None:
+        return loading
 
     try:
-        # update: distilbert has its own path, lr/svm goes to the old function
-        if requested_model == "distilbert":
-            predictions = predict_with_distilbert(posts)
-        else:
-            predictions = predict_with_model(requested_model, posts)
+        predictions, model_version = predict_versioned(requested_model, posts, deadline, model_set=model_set)
 
+    except Overloaded as e:
+        return overloaded_response(e)
+    except DeadlineExceeded:
+        return deadline_response()
     except Exception as e:
         print("❌ ❌ ❌ Error during prediction:", e)
         return jsonify({"error": "Prediction failed", "details": str(e)}), 500
 
-    return jsonify({
-        "model": requested_model,
-        "predictions": predictions
-    })
+    t0 = time.perf_counter()
+    if binary:
+        resp = msgpack_response(dict(wire_format.encode_predictions(predictions), model=requested_model,
+                                     model_version=model_version))
+    else:
+        resp = jsonify({
+            "model": requested_model,
+            "model_version": model_version,
+            "predictions": predictions
+        })
+    STAGE_SECONDS.observe(time.perf_counter() - t0, requested_model, "serialize")
+    return resp
+
+
+def wants_msgpack(binary_request):
+    """
+    Response format negotiation:
+        - Accept: application/msgpack -> msgpack
+        - Accept: application/json    -> json
+        - no preference -> same format as the request
+    """
+    if not wire_format.msgpack_available():
+        return False
+
+    accept = request.headers.get("Accept", "").lower()
+    if any(t in accept for t in wire_format.MSGPACK_CONTENT_TYPES):
+        return True
+    if "application/json" in accept:
+        return False
+
+    # no preference -> mirror the request
+    return binary_request
+
+
+def msgpack_response(payload):
+    return Response(wire_format.pack(payload), mimetype=wire_format.MSGPACK_CONTENT_TYPE)
+
+
+@app.route("/predict/stream", methods=["POST"])
+def predict_stream():
+    """
+    Update: streaming endpoint for very large batches (e.g. a 200k post backfill)
+
+    Request body = NDJSON, one post per line:
+        {"title": "...", "body": "..."}
+        {"title": "...", "body": "..."}
+    Model comes from the query string: /predict/stream?model=distilbert (same fallback to lr)
+    (update: &chunk_size=N overrides STREAM_CHUNK_SIZE, capped at STREAM_MAX_CHUNK_SIZE)
+
+    Response = NDJSON, one prediction per input line, in the same order:
+        {"label": "positive", "score": 0.81}
+
+    I read the body line by line, score it in chunks of STREAM_CHUNK_SIZE and send every
+    chunk back as soon as its done, so inputs/tensors/outputs never pile up in memory
+    and the client starts getting results straight away.
+    A line that isn't a valid post gets {"error": "..."} in its place (the stream keeps going).
+
+    Update: chunks wait for a model slot instead of being shed (no 429 mid stream),
+    blocking the body reader is the backpressure here.
+    """
+    model_set = active_models
+    requested_model = pick_model_key((request.args.get("model") or "lr").lower(), model_set)
+    g.metrics_model = requested_model
+
+    loading = still_loading([requested_model])
+    if loading is not None:
+        return loading
+
+    try:
+        chunk_size = parse_chunk_size(request.args.get("chunk_size"))
+    except ValueError:
+        return jsonify({"error": "chunk_size must be a positive integer"}), 400
+
+    stream = request.stream
+
+    def score_chunk(chunk):
+        # chunk = list of (post or None, error or None) in input order
+        posts = [post for post, _ in chunk if post is not None]
+        # (update: the whole stream runs on the ModelSet it started with, a hot reload doesn't change it midway)
+        predictions = iter(predict_single(requested_model, posts, shed=False, model_set=model_set)) if posts else iter(())
+
+        t0 = time.perf_counter()
+        lines = []
+        for post, err in chunk:
+            out = next(predictions) if post is not None else {"error": err}
+            lines.append(json.dumps(out))
+        STAGE_SECONDS.observe(time.perf_counter() - t0, requested_model, "serialize")
+        return "\n".join(lines) + "\n"
+
+    def generate():
+        chunk = []
+        for raw in stream:
+            raw = raw.strip()
+            if not raw:
+                continue
+
+            try:
+                post = json.loads(raw)
+                if not isinstance(post, dict):
+                    raise ValueError("each line must be a JSON object")
+                chunk.append((post, None))
+            except ValueError as e:
+                chunk.append((None, f"Invalid line: {e}"))
+
+            if len(chunk) >= chunk_size:
+                yield score_chunk(chunk)
+                chunk = []
+
+        if chunk:
+            yield score_chunk(chunk)
+
+    def safe_generate():
+        # once streaming started I can't change the status code anymore, so errors become a last NDJSON line
+        try:
+            yield from generate()
+        except Exception as e:
+            print("❌ ❌ ❌ Error during streaming prediction:", e)
+            yield json.dumps({"error": "Prediction failed", "details": str(e)}) + "\n"
+
+    return Response(
+        stream_with_context(safe_generate()),
+        mimetype="application/x-ndjson",
+        headers={"X-Model": requested_model},
+    )
+
+
+def parse_chunk_size(chunk_size):
+    # ?chunk_size= of /predict/stream, default STREAM_CHUNK_SIZE, capped at STREAM_MAX_CHUNK_SIZE
+    # (ValueError -> 400 in the route, same as parse_deadline)
+    if chunk_size is None:
+        return STREAM_CHUNK_SIZE
+    chunk_size = int(chunk_size)
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    return min(chunk_size, STREAM_MAX_CHUNK_SIZE)
+
+
+def predict_multi(requested_models, posts, binary=False, deadline=None, model_set=None):
+    """
+    Expects JSON:
+        { "models": ["lr", "svm", "distilbert"], "posts": [...] }
+    Returns:
+        { "models": [...], "predictions": { "lr": [...], "svm": [...], "distilbert": [...] } }
+
+    Here I do NOT fall back to lr for unknown names, with a list that would silently return duplicates.
+    """
+    if not isinstance(requested_models, list) or not requested_models:
+        return jsonify({"error": "Field 'models' must be a non-empty list"}), 400
+
+    # lowercase + drop duplicates, keeping the order the caller asked for
+    model_set = model_set or active_models
+    model_keys = list(dict.fromkeys(resolve_model_key(str(m).lower(), model_set) for m in requested_models))
+    g.metrics_model = ",".join(model_keys)
+
+    unknown = [m for m in model_keys if m not in model_set.models and m not in TRANSFORMER_KEYS]
+    if unknown:
+        return jsonify({"error": f"Unknown model(s): {unknown}"}), 400
+
+    loading = still_loading(model_keys)
+    if loading is not None:
+        return loading
+
+    try:
+        predictions, model_versions = predict_multi_versioned(model_keys, posts, deadline, model_set)
+    except Overloaded as e:
+        return overloaded_response(e)
+    except DeadlineExceeded:
+        return deadline_response()
+    except Exception as e:
+        print("❌ ❌ ❌ Error during multi-model prediction:", e)
+        return jsonify({"error": "Prediction failed", "details": str(e)}), 500
+
+    t0 = time.perf_counter()
+    if binary:
+        resp = msgpack_response({
+            "models": model_keys,
+            "model_versions": model_versions,
+            "predictions": {key: wire_format.encode_predictions(p) for key, p in predictions.items()},
+        })
+    else:
+        resp = jsonify({
+            "models": model_keys,
+            "model_versions": model_versions,
+            "predictions": predictions
+        })
+    STAGE_SECONDS.observe(time.perf_counter() - t0, g.metrics_model, "serialize")
+    return resp
+
+
+# -----------------
+# Update: admin endpoint for hot reloads
+# -----------------
+# ADMIN_TOKEN set -> callers need the X-Admin-Token header, not set -> only localhost may reload
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+
+def admin_allowed(token, remote_addr):
+    if ADMIN_TOKEN:
+        return token == ADMIN_TOKEN
+    return remote_addr in ("127.0.0.1", "::1")
+
+
+@app.route("/admin/reload", methods=["GET", "POST"])
+def admin_reload():
+    """
+    POST /admin/reload  { "version": "20260214-093000" }   (no version = reload CURRENT)
+        -> 202, loads in the background, the old version serves until the swap
+    GET /admin/reload -> status of the last reload
+
+    Note: with serve_prefork.py only the worker that gets this request reloads,
+    for all workers: `model_registry.py activate <version>` + restart serve_prefork.py
+    """
+    if not admin_allowed(request.headers.get("X-Admin-Token", ""), request.remote_addr):
+        return jsonify({"error": "Forbidden"}), 403
+
+    if request.method == "GET":
+        return jsonify(dict(RELOAD_STATUS, model_bundle=ACTIVE_BUNDLE, available=model_registry.list_versions(MODEL_DIR)))
+
+    data = request.get_json(silent=True) or {}
+    version = data.get("version")
+
+    if version is not None and version not in model_registry.list_versions(MODEL_DIR):
+        return jsonify({"error": f"Unknown model version: {version}"}), 404
+
+    if not start_reload(version):
+        return jsonify({"error": "A model load is already running", "reload": RELOAD_STATUS}), 409
+
+    return jsonify({"status": "reloading", "version": version, "model_bundle": ACTIVE_BUNDLE}), 202
+
+
+# -----------------
+# Update: GET /metrics
+# -----------------
+# these are read at scrape time, so they cost nothing per request
+metrics_registry.gauge_callback(
+    "ml_model_load_seconds", "Time it took to load each model", ("model",),
+    lambda: {(key, ): st["load_seconds"] for key, st in MODEL_STATUS.items()})
+metrics_registry.gauge_callback(
+    "ml_model_loaded", "1 if the model is loaded and serving", ("model",),
+    lambda: {(key, ): int(st["state"] == "loaded") for key, st in MODEL_STATUS.items()})
+metrics_registry.gauge_callback(
+    "ml_prediction_cache_events_total", "In-process prediction cache hits/misses/evictions/expirations",
+    ("event",),
+    lambda: {(k, ): v for k, v in prediction_cache.stats().items() if k in ("hits", "misses", "evictions", "expirations")},
+    kind="counter")
+metrics_registry.gauge_callback(
+    "ml_prediction_cache_entries", "Entries in the in-process prediction cache", (),
+    lambda: {(): prediction_cache.stats()["entries"]})
+metrics_registry.gauge_callback(
+    "ml_admission_requests", "Admission control: requests inside the model (active) or queued (waiting)",
+    ("model", "state"),
+    lambda: {(key, state): st[state] for key, c in admission_controllers.items()
+             for st in [c.stats()] for state in ("active", "waiting")})
+metrics_registry.gauge_callback(
+    "ml_admission_rejected_total", "Requests shed (429) or expired (504) by admission control",
+    ("model", "reason"),
+    lambda: {(key, reason): st[reason] for key, c in admission_controllers.items()
+             for st in [c.stats()] for reason in ("shed", "expired")},
+    kind="counter")
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return Response(metrics_registry.render(), content_type=metrics.CONTENT_TYPE)
 
 
 if __name__ == "__main__":
     # Running on port 5051 to match FLASK_API_URL
     port = int(os.environ.get("FLASK_PORT", 5051))
-    app.run(host="0.0.0.0", port=port, debug=True)
\ No newline at end of file
+    app.run(host="0.0.0.0", port=port, debug=FLASK_DEBUG)
\ No newline at end of file
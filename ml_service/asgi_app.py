@@ -0,0 +1,447 @@
+# asgi_app.py
+"""
+Async (ASGI) serving variant of the ML service, same "/", "/ready", "/predict", "/metrics" and "/admin/reload" as app.py.
+
+NOT here (yet): POST /predict/stream. Every response of this server is sent as one body,
+so NDJSON streaming would just buffer the whole result, big backfills have to use app.py for now.
+
+Why: app.py is synchronous, every slow DistilBERT call holds a whole request thread,
+and the dev server (app.run(debug=True)) is what actually gets launched.
+Here every connection is a cheap asyncio task, and the model work runs on ONE dedicated
+thread pool (ASGI_MODEL_WORKERS threads), so thousands of connections can wait for
+their predictions while the pool keeps the CPU busy with inference.
+
+Everything model related (loading, cache, store, micro batching, admission control, metrics)
+is reused from app.py, this file only replaces the HTTP layer.
+
+Run (from ml_service/):
+    uvicorn asgi_app:app --port 5052            # if uvicorn is installed (pip install uvicorn)
+    python asgi_app.py --port 5052              # built-in minimal asyncio server otherwise
+
+Load test vs the Flask version: see loadtest.py
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+import app as ml
+import metrics
+import wire_format
+from admission import DeadlineExceeded, Overloaded
+
+# threads that run model code (the event loop itself never runs a model)
+# default: enough for every admission slot, so admission control (not the pool) decides who waits
+ASGI_MODEL_WORKERS = int(os.environ.get(
+    "ASGI_MODEL_WORKERS",
+    ml.LINEAR_MAX_CONCURRENCY * 2 + ml.DISTILBERT_MAX_CONCURRENCY * len(ml.TRANSFORMER_KEYS),
+))
+# requests allowed to wait for the pool at once, anything beyond gets 429 straight from the event loop
+ASGI_MAX_PENDING = int(os.environ.get("ASGI_MAX_PENDING", 4096))
+# biggest request body I accept (the built-in server reads the whole body before calling the app)
+ASGI_MAX_BODY_MB = float(os.environ.get("ASGI_MAX_BODY_MB", 64))
+
+model_executor = ThreadPoolExecutor(max_workers=ASGI_MODEL_WORKERS, thread_name_prefix="asgi-model")
+pending = 0   # only touched from the event loop thread, so no lock needed
+
+
+# -----------------
+# Small response helpers
+# -----------------
+
+def json_response(payload, status=200, headers=None):
+    return status, "application/json", json.dumps(payload).encode("utf-8"), headers or {}
+
+
+def error_response(message, status, headers=None, **extra):
+    return json_response(dict({"error": message}, **extra), status, headers)
+
+
+async def run_model(fn, *args):
+    # model code goes to the dedicated pool, the event loop just awaits it
+    global pending
+    if pending >= ASGI_MAX_PENDING:
+        raise Overloaded("asgi", 1)
+
+    pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(model_executor, fn, *args)
+    finally:
+        pending -= 1
+
+
+# -----------------
+# Routes (same request / response shapes as app.py)
+# -----------------
+
+async def health_check(headers, body, ctx):
+    payload = ml.health_payload()
+    payload["message"] = "🔥 🔥 🔥 ASGI ML service is running"
+    payload["asgi"] = {"model_workers": ASGI_MODEL_WORKERS, "max_pending": ASGI_MAX_PENDING, "pending": pending}
+    return json_response(payload)
+
+
+async def ready(headers, body, ctx):
+    # same as app.ready: GET /ready or /ready?model=lr
+    payload = ml.readiness_payload((ctx["query"].get("model", [""])[0] or "").lower())
+    return json_response(payload, 200 if payload["ready"] else 503)
+
+
+async def predict(headers, body, ctx):
+    # same as app.predict: every model of this request comes from the ModelSet active when it came in
+    model_set = ml.active_models
+    binary_request = wire_format.is_msgpack(headers.get("content-type"))
+
+    try:
+        if binary_request:
+            if not wire_format.msgpack_available():
+                return error_response("MessagePack not supported (pip install msgpack)", 415)
+            data = wire_format.decode_request(body)
+        else:
+            data = json.loads(body or b"null")
+    except Exception:
+        return error_response("Invalid JSON body" if not binary_request else "Invalid msgpack body", 400)
+
+    binary = wants_msgpack(headers.get("accept", ""), binary_request)
+
+    if not data:
+        return error_response("Missing JSON body", 400)
+    if not isinstance(data, dict):
+        return error_response("JSON body must be an object", 400)
+
+    requested_model = (data.get("model") or "lr").lower()
+    posts = data.get("posts")
+
+    if not posts or not isinstance(posts, list):
+        return error_response("Field 'posts' must be a non-empty list", 400)
+
+    try:
+        deadline = ml.parse_deadline(headers.get("x-request-timeout-ms"), data)
+    except (TypeError, ValueError):
+        return error_response("Timeout must be a number of milliseconds", 400)
+
+    if data.get("models") is not None:
+        return await predict_multi(data.get("models"), posts, binary, deadline, ctx, model_set)
+
+    requested_model = ml.pick_model_key(requested_model, model_set)
+    ctx["model"] = requested_model
+
+    loading = ml.loading_models([requested_model])
+    if loading:
+        return error_response("Model still loading, retry shortly", 503, {"Retry-After": "5"}, models=loading)
+
+    try:
+        predictions, model_version = await run_model(ml.predict_versioned, requested_model, posts, deadline,
+                                                     True, model_set)
+    except Overloaded as e:
+        return error_response("Model overloaded, retry later", 429, {"Retry-After": str(e.retry_after)},
+                              model=e.model_key)
+    except DeadlineExceeded:
+        return error_response("Request deadline exceeded before inference", 504)
+    except Exception as e:
+        print("❌ ❌ ❌ Error during prediction:", e)
+        return error_response("Prediction failed", 500, details=str(e))
+
+    if binary:
+        payload = dict(wire_format.encode_predictions(predictions), model=requested_model,
+                       model_version=model_version)
+        return 200, wire_format.MSGPACK_CONTENT_TYPE, wire_format.pack(payload), {}
+
+    return json_response({"model": requested_model, "model_version": model_version, "predictions": predictions})
+
+
+async def predict_multi(requested_models, posts, binary, deadline, ctx, model_set):
+    if not isinstance(requested_models, list) or not requested_models:
+        return error_response("Field 'models' must be a non-empty list", 400)
+
+    model_keys = list(dict.fromkeys(ml.resolve_model_key(str(m).lower(), model_set) for m in requested_models))
+    ctx["model"] = ",".join(model_keys)
+
+    unknown = [m for m in model_keys if m not in model_set.models and m not in ml.TRANSFORMER_KEYS]
+    if unknown:
+        return error_response(f"Unknown model(s): {unknown}", 400)
+
+    loading = ml.loading_models(model_keys)
+    if loading:
+        return error_response("Model still loading, retry shortly", 503, {"Retry-After": "5"}, models=loading)
+
+    try:
+        predictions, model_versions = await run_model(ml.predict_multi_versioned, model_keys, posts, deadline,
+                                                      model_set)
+    except Overloaded as e:
+        return error_response("Model overloaded, retry later", 429, {"Retry-After": str(e.retry_after)},
+                              model=e.model_key)
+    except DeadlineExceeded:
+        return error_response("Request deadline exceeded before inference", 504)
+    except Exception as e:
+        print("❌ ❌ ❌ Error during multi-model prediction:", e)
+        return error_response("Prediction failed", 500, details=str(e))
+
+    if binary:
+        payload = {
+            "models": model_keys,
+            "model_versions": model_versions,
+            "predictions": {key: wire_format.encode_predictions(p) for key, p in predictions.items()},
+        }
+        return 200, wire_format.MSGPACK_CONTENT_TYPE, wire_format.pack(payload), {}
+
+    return json_response({"models": model_keys, "model_versions": model_versions, "predictions": predictions})
+
+
+def wants_msgpack(accept, binary_request):
+    # same negotiation as app.wants_msgpack
+    if not wire_format.msgpack_available():
+        return False
+    accept = accept.lower()
+    if any(t in accept for t in wire_format.MSGPACK_CONTENT_TYPES):
+        return True
+    if "application/json" in accept:
+        return False
+    return binary_request
+
+
+async def metrics_endpoint(headers, body, ctx):
+    return 200, metrics.CONTENT_TYPE, ml.metrics_registry.render().encode("utf-8"), {}
+
+
+async def admin_reload(headers, body, ctx):
+    # same as app.admin_reload
+    client = ctx.get("client") or ("", 0)
+    if not ml.admin_allowed(headers.get("x-admin-token", ""), client[0]):
+        return error_response("Forbidden", 403)
+
+    if ctx["method"] == "GET":
+        return json_response(dict(ml.RELOAD_STATUS, model_bundle=ml.ACTIVE_BUNDLE,
+                                  available=ml.model_registry.list_versions(ml.MODEL_DIR)))
+
+    try:
+        data = json.loads(body) if body else {}
+    except ValueError:
+        data = {}
+    version = data.get("version") if isinstance(data, dict) else None
+
+    if version is not None and version not in ml.model_registry.list_versions(ml.MODEL_DIR):
+        return error_response(f"Unknown model version: {version}", 404)
+
+    if not ml.start_reload(version):
+        return error_response("A model load is already running", 409, reload=ml.RELOAD_STATUS)
+
+    return json_response({"status": "reloading", "version": version, "model_bundle": ml.ACTIVE_BUNDLE}, 202)
+
+
+ROUTES = {
+    ("GET", "/"): health_check,
+    ("GET", "/ready"): ready,
+    ("POST", "/predict"): predict,
+    ("GET", "/metrics"): metrics_endpoint,
+    ("GET", "/admin/reload"): admin_reload,
+    ("POST", "/admin/reload"): admin_reload,
+}
+
+
+# -----------------
+# The ASGI app
+# -----------------
+
+async def read_body(receive):
+    chunks = []
+    more = True
+    while more:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunks.append(message.get("body", b""))
+        more = message.get("more_body", False)
+    return b"".join(chunks)
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        # nothing to start/stop, app.py already loaded the models at import
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    if scope["type"] != "http":
+        return
+
+    t0 = time.perf_counter()
+    path = scope["path"]
+    handler = ROUTES.get((scope["method"], path))
+
+    body = await read_body(receive)
+    if body is None:
+        return
+
+    ctx = {"model": "none", "method": scope["method"], "client": scope.get("client"),
+           "query": parse_qs(scope.get("query_string", b"").decode("latin-1"))}
+    if handler is None:
+        status, content_type, out, extra_headers = error_response("Not found", 404)
+    else:
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        try:
+            status, content_type, out, extra_headers = await handler(headers, body, ctx)
+        except Exception as e:
+            # a handler bug must still answer (the built-in server would just drop the connection),
+            # same shape as flask's "Prediction failed" errors
+            print(f"❌ ❌ ❌ Error in {scope['method']} {path}:", e)
+            status, content_type, out, extra_headers = error_response("Internal server error", 500, details=str(e))
+
+    response_headers = [(b"content-type", content_type.encode()), (b"content-length", str(len(out)).encode())]
+    response_headers += [(k.lower().encode(), str(v).encode()) for k, v in extra_headers.items()]
+
+    await send({"type": "http.response.start", "status": status, "headers": response_headers})
+    await send({"type": "http.response.body", "body": out})
+
+    # same metrics as the flask routes, endpoint is prefixed so both servers can be told apart
+    if handler is not None and path != "/metrics":
+        ml.REQUEST_LATENCY.observe(time.perf_counter() - t0, "asgi:" + path, ctx["model"])
+        ml.REQUESTS_TOTAL.inc("asgi:" + path, ctx["model"], str(status))
+
+
+# ------------------------------------------
+# Built-in minimal HTTP/1.1 server (only used when uvicorn isn't installed)
+# ------------------------------------------
+# keep-alive + Content-Length bodies only, good enough for the Node proxy / backtest / loadtest.py
+
+REASONS = {
+    200: "OK",
+    202: "Accepted",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    409: "Conflict",
+    411: "Length Required",
+    413: "Payload Too Large",
+    415: "Unsupported Media Type",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+    504: "Gateway Timeout",
+}
+
+
+async def handle_connection(reader, writer):
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                return
+
+            lines = head.decode("latin-1").split("\r\n")
+            try:
+                method, target, version = lines[0].split(" ", 2)
+            except ValueError:
+                return
+
+            raw_headers = []
+            for line in lines[1:]:
+                if ":" in line:
+                    name, value = line.split(":", 1)
+                    raw_headers.append((name.strip().lower().encode("latin-1"), value.strip().encode("latin-1")))
+            header_map = dict(raw_headers)
+
+            if b"chunked" in header_map.get(b"transfer-encoding", b"").lower():
+                await write_simple(writer, 411, b"chunked bodies not supported", keep_alive=False)
+                return
+
+            # a broken Content-Length gets a 400 (the body can't be framed, so the connection closes after it)
+            try:
+                length = int(header_map.get(b"content-length", b"0") or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                await write_simple(writer, 400, b"invalid content-length", keep_alive=False)
+                return
+            if length > ASGI_MAX_BODY_MB * 1024 * 1024:
+                await write_simple(writer, 413, b"body too large", keep_alive=False)
+                return
+            body = await reader.readexactly(length) if length else b""
+
+            path, _, query = target.partition("?")
+            scope = {
+                "type": "http", "asgi": {"version": "3.0"}, "http_version": version.split("/")[-1],
+                "method": method.upper(), "path": path, "raw_path": path.encode(),
+                "query_string": query.encode(), "headers": raw_headers,
+                "client": writer.get_extra_info("peername"), "server": writer.get_extra_info("sockname"),
+            }
+
+            body_sent = False
+
+            async def receive():
+                nonlocal body_sent
+                if body_sent:
+                    return {"type": "http.disconnect"}
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+
+            keep_alive = header_map.get(b"connection", b"").lower() != b"close" and version != "HTTP/1.0"
+            response = {}
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    response["status"] = message["status"]
+                    response["headers"] = message.get("headers", [])
+                elif message["type"] == "http.response.body":
+                    status = response["status"]
+                    out = [f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n".encode()]
+                    out += [k + b": " + v + b"\r\n" for k, v in response["headers"]]
+                    out.append(b"connection: keep-alive\r\n\r\n" if keep_alive else b"connection: close\r\n\r\n")
+                    out.append(message.get("body", b""))
+                    writer.write(b"".join(out))
+                    await writer.drain()
+
+            await app(scope, receive, send)
+
+            if not keep_alive:
+                return
+    finally:
+        writer.close()
+
+
+async def write_simple(writer, status, body, keep_alive=True):
+    writer.write(
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\ncontent-length: {len(body)}\r\n"
+        f"connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+
+
+async def serve(host, port):
+    server = await asyncio.start_server(handle_connection, host, port, backlog=4096, limit=1024 * 1024)
+    print(f"🚀 ASGI ML service on {host}:{port} (built-in server, {ASGI_MODEL_WORKERS} model threads)")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="async ML service")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("ASGI_PORT", 5052)))
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        uvicorn = None
+
+    if uvicorn is not None:
+        uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+    else:
+        try:
+            asyncio.run(serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -13,13 +13,28 @@ High level idea (in simplified):
 6) Pull real stock prices and compare sentiment direction vs next day return direction
 """
 
+import atexit
 import os
-import re
 import time
-import requests
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 import yfinance as yf #using yahooFinance api to pull actual real world stock prices on given date
 
+# update: sharing the on-disk prediction store with app.py, so already scored texts are never rescored
+from prediction_cache import normalize_text
+from prediction_store import PredictionStore
+
+# update: pooled, concurrent client for the /predict calls (keep-alive, retries, several batches in flight)
+# (the optional MessagePack wire format lives in there now too)
+from ml_client import InProcessClient, MLClient
+
+# (update) single pass ticker/alias matching
+from ticker_index import TickerIndex
+
+# (update) multi process CSV ingestion
+from parallel_ingest import csv_byte_ranges, join_text, read_csv_range
+
 
 # -----------------------------
 # Config (testing)(easy to tweak later)
@@ -35,7 +50,14 @@ END_DATE   = "2022-12-31"
 TICKERS = ["TSLA", "AAPL", "MSFT", "NVDA", "AMD", "GME"]
 
 # where my Flask ML service is running
-ML_URL = "http://localhost:5051/predict"
+ML_BASE_URL = "http://localhost:5051"
+ML_URL = f"{ML_BASE_URL}/predict"
+
+# (update) "json" or "msgpack", msgpack sends a plain text column and gets label codes + float32 scores back
+ML_WIRE_FORMAT = os.environ.get("ML_WIRE_FORMAT", "json")
+
+# (update) same sqlite prediction store the Flask service writes to
+PREDICTION_STORE_PATH = os.path.join("data", "prediction_store.sqlite")
 
 # which ML models i want to compare, 
 # (running all 3 models at once would be resource intensive so im running only LR to if everything is good)
@@ -44,47 +66,62 @@ MODELS = ["distilbert"]
 # (update) to keep memory stable, I read CSV in chunks
 CHUNK_SIZE = 100_000
 
+# (update) the read + filter stage runs in a process pool: the CSV gets cut into byte ranges
+# of ~INGEST_RANGE_MB (on record boundaries, see parallel_ingest.py), every worker parses + filters
+# one range at a time (so memory per worker stays ~ one range), results come back in file order.
+# INGEST_WORKERS=1 -> the old single process chunked read
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", os.cpu_count() or 1))
+INGEST_RANGE_MB = float(os.environ.get("INGEST_RANGE_MB", 64))
+
+# title/body always read as text, so a chunk (or range) full of numeric looking titles
+# gives the same strings no matter where the chunk boundaries fall
+READ_CSV_DTYPES = {"title": str, "body": str}
+
+# (update) if data/wsb_parquet was built from the CURRENT DATA_PATH (python wsb_cache.py build),
+# only the days inside START_DATE..END_DATE get read from it instead of parsing the whole CSV.
+# DATASET_CACHE=0 always reads the CSV
+# (the cache needs pyarrow, wsb_cache.py is only imported when its used, without pyarrow -> CSV)
+DATASET_CACHE = os.environ.get("DATASET_CACHE", "1") != "0"
+DATASET_CACHE_DIR = os.environ.get("DATASET_CACHE_DIR", os.path.join("data", "wsb_parquet"))
+
 # how many texts to send per API call (safe + fast) (will tweak if any issues occur)
 BATCH_SIZE = 64
 
+# (update) how many of those batches are in flight at once, and retries on 429 / 503 / connection errors
+ML_MAX_IN_FLIGHT = int(os.environ.get("ML_MAX_IN_FLIGHT", 4))
+ML_RETRIES = int(os.environ.get("ML_RETRIES", 4))
+ML_RETRY_BACKOFF_S = float(os.environ.get("ML_RETRY_BACKOFF_S", 0.5))
+
+# (update) "http" -> the Flask service at ML_BASE_URL (default)
+#          "inprocess" -> app.py's models get loaded right here and called directly (no service needed,
+#                         no JSON / HTTP per batch), best for big offline runs. The ML_* http settings above are ignored
+ML_MODE = os.environ.get("ML_MODE", "http").lower()
+if ML_MODE not in ("http", "inprocess"):
+    raise ValueError(f"ML_MODE must be 'http' or 'inprocess', got {ML_MODE!r}")
+
+# (update) new predictions go into the prediction store every CHECKPOINT_EVERY texts (not only at the very end),
+# so a run that dies halfway (timeout, OOM, Ctrl-C) keeps everything scored so far.
+# Re-running just picks up from the store: only texts without a prediction (new days, new tickers,
+# edited posts -> different text hash) get scored again
+CHECKPOINT_EVERY = int(os.environ.get("CHECKPOINT_EVERY", 8192))
+
 # ---------------------------------------
-# 1: building ticker regex patterns
+# 1: building the ticker index
 # ---------------------------------------
 # I want to catch all variations of a certain ticker like:
 # "TSLA", "$TSLA", "Tesla", "TESLA"
 # and same for other tickers 
 
-    #it basically returns a dict like:{"TSLA": compiled_regex_for_tsla,}
-
-def build_ticker_patterns():
-
-    patterns = {}
+# Update: the aliases moved from hard coded if/elif lists into ticker_aliases.txt, and instead of
+# one regex per ticker (cost grows with every ticker) they all go into ONE automaton
+# that finds every ticker in a single pass over the text (see ticker_index.py)
+TICKER_ALIASES_PATH = "ticker_aliases.txt"
 
-    for t in TICKERS:
-        if t == "TSLA":
-            words = ["TSLA", "$TSLA", "TESLA", "Tesla", "tesla"]
-        elif t == "AAPL":
-            words = ["AAPL", "$AAPL", "APPLE", "Apple", "apple"]
-        elif t == "MSFT":
-            words = ["MSFT", "$MSFT", "MICROSOFT", "Microsoft", "microsoft"]
-        elif t == "NVDA":
-            words = ["NVDA", "$NVDA", "NVIDIA", "Nvidia", "nvidia"]
-        elif t == "AMD":
-            words = ["AMD", "$AMD", "Advanced Micro Devices", "advanced micro devices"]
-        elif t == "GME":
-            words = ["GME", "$GME", "GAMESTOP", "GameStop", "Gamestop", "gamestop"]
-        else:
-            words = [t, f"${t}"]
+def build_ticker_index():
+    # only the tickers I backtest, in TICKERS order (tickers missing from the file match TICKER / $TICKER)
+    return TickerIndex.from_file(TICKER_ALIASES_PATH, TICKERS)
 
-        # joining them in one single regex entry: (TSLA|\$TSLA|TESLA|Tesla|tesla)
-        joined = "|".join([re.escape(w) for w in words])
-        regex = re.compile(rf"(\b{joined}\b)", flags=re.IGNORECASE)     # \b makes it act like "word boundary" to reduce false matches
-
-        patterns[t] = regex
-
-    return patterns
-
-TICKER_PATTERNS = build_ticker_patterns()
+TICKER_INDEX = build_ticker_index()
 
 
 # ---------------------------------------------------
@@ -96,16 +133,167 @@ TICKER_PATTERNS = build_ticker_patterns()
     # "TSLA and NVDA are great" -> ["TSLA", "NVDA"]
 
 def detect_tickers_in_text(text: str):
- 
-    if not isinstance(text, str):
-        return []
+    # same word boundary + case insensitive rules as the old regexes, order = TICKERS order
+    return TICKER_INDEX.find(text)
 
-    found = []
-    for ticker, rgx in TICKER_PATTERNS.items():
-        if rgx.search(text):
-            found.append(ticker)
 
-    return found
+# ---------------------------------------------------
+# 2B: filtering one CSV chunk
+# ---------------------------------------------------
+# Update: this used to be a chunk.iterrows() loop (detect tickers, dt.date().isoformat(), append a dict per row),
+# which was most of the runtime on the full WSB dump. Now its column wise:
+# ticker column in one go, a mask for the exactly-one-ticker rows, dates formatted only for the kept rows.
+
+KEPT_COLUMNS = ["date", "ticker", "text"]
+
+def filter_chunk(chunk, start_dt, end_dt):
+    """
+    One raw CSV chunk -> DataFrame(date, ticker, text) of the rows inside the window
+    that mention exactly one ticker (same rows + order as the old loop)
+    """
+    if "timestamp" not in chunk.columns: # using this for basic safety even tho my Kaggle file already has a the column "timestamp" 
+        raise ValueError("Expected a 'timestamp' column in the CSV")
+
+    # making sure title and body are always strings (no empty values)
+    # some WSB rows store text in "title", others in "body", so im considering both
+    title = chunk.get("title", pd.Series("", index=chunk.index)).fillna("")
+    body = chunk.get("body", pd.Series("", index=chunk.index)).fillna("")
+
+    # Parse timestamp -> datetime
+    dt = pd.to_datetime(chunk["timestamp"], errors="coerce")
+
+    # Filter by date range (before building texts, no point joining strings of rows I drop anyway)
+    in_window = ((dt >= start_dt) & (dt <= end_dt)).to_numpy()
+    if not in_window.any():
+        return pd.DataFrame(columns=KEPT_COLUMNS)
+
+    # combining into one text field
+    text = join_text(title[in_window], body[in_window])
+
+    return single_ticker_rows(text, dt[in_window]).reset_index(drop=True)
+
+
+def single_ticker_rows(text, dt):
+    """
+    text, dt: Series (same index) -> DataFrame(date, ticker, text) of the rows that mention exactly one ticker,
+    keeping their index
+    """
+    # which ticker is mentioned? None = zero or multiple tickers
+    # IMPORTANT NOTE: skip if 0 tickers, skip if multiple tickers, maintains clean attribution
+    tickers = TICKER_INDEX.single_tickers(text.tolist())
+    one_ticker = pd.notna(tickers)
+
+    # Convert datetime to -> just a date string "YYYY-MM-DD"
+    return pd.DataFrame({
+        "date": dt[one_ticker].dt.strftime("%Y-%m-%d").to_numpy(),
+        "ticker": tickers[one_ticker],
+        "text": text[one_ticker].to_numpy(),
+    }, index=text.index[one_ticker])
+
+
+# ---------------------------------------------------
+# 2C: reading + filtering the whole CSV (single process or process pool)
+# ---------------------------------------------------
+
+def init_ingest_worker(index):
+    # the ticker index gets sent once per worker (works with spawn too, not only fork)
+    global TICKER_INDEX
+    TICKER_INDEX = index
+
+
+def filter_byte_range(path, header, start, end, start_dt, end_dt):
+    # runs inside a worker process: parse one byte range chunk by chunk, keep only the filtered rows
+    kept = [
+        filter_chunk(chunk, start_dt, end_dt)
+        for chunk in read_csv_range(path, header, start, end, CHUNK_SIZE, dtype=READ_CSV_DTYPES)
+    ]
+    kept = [k for k in kept if not k.empty]
+    return pd.concat(kept, ignore_index=True) if kept else pd.DataFrame(columns=KEPT_COLUMNS)
+
+
+def load_wsb_cache():
+    """the wsb_cache module if DATASET_CACHE is on and pyarrow is installed, else None"""
+    if not DATASET_CACHE:
+        return None
+    try:
+        import wsb_cache
+    except ImportError as e:
+        print(f"⚠️ ⚠️ Parquet cache not available ({e}), reading the CSV. pip install pyarrow to use it")
+        return None
+    return wsb_cache
+
+
+def filter_cached_days(cache_dir, files, start_dt, end_dt):
+    # (worker side too) Parquet days -> DataFrame(date, ticker, text, row)
+    import wsb_cache
+
+    kept = []
+    for part in wsb_cache.iter_window(cache_dir, start_dt, end_dt, files=files):
+        rows = single_ticker_rows(part["text"], part["dt"])
+        rows["row"] = part["row"][rows.index].to_numpy()
+        kept.append(rows)
+    return pd.concat(kept, ignore_index=True) if kept else pd.DataFrame(columns=KEPT_COLUMNS + ["row"])
+
+
+def iter_cached_chunks(cache_dir, start_dt, end_dt, workers):
+    import wsb_cache
+
+    files = wsb_cache.window_files(cache_dir, start_dt, end_dt)
+    if not files:
+        return
+
+    # a few days per task, spread over the pool like the CSV byte ranges
+    n_tasks = min(len(files), max(1, workers) * 4)
+    groups = [files[i::n_tasks] for i in range(n_tasks)]
+
+    if workers <= 1 or n_tasks == 1:
+        pieces = [filter_cached_days(cache_dir, g, start_dt, end_dt) for g in groups]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, n_tasks), initializer=init_ingest_worker,
+                                 initargs=(TICKER_INDEX,)) as pool:
+            pieces = list(pool.map(filter_cached_days, [cache_dir] * n_tasks, groups,
+                                   [start_dt] * n_tasks, [end_dt] * n_tasks))
+
+    # back to the exact CSV row order (the cache is stored by day)
+    kept = pd.concat(pieces, ignore_index=True).sort_values("row", kind="stable")
+    yield kept.drop(columns="row").reset_index(drop=True)
+
+
+def iter_filtered_chunks(path, start_dt, end_dt, workers=None):
+    """
+    Yields DataFrame(date, ticker, text) pieces in file order, same rows as the old single process loop
+    """
+    workers = workers or INGEST_WORKERS
+
+    wsb_cache = load_wsb_cache() if os.path.isdir(DATASET_CACHE_DIR) else None
+    if wsb_cache is not None and wsb_cache.is_fresh(DATASET_CACHE_DIR, path):
+        yield from iter_cached_chunks(DATASET_CACHE_DIR, start_dt, end_dt, workers)
+        return
+    if wsb_cache is not None:
+        print(f"⚠️ ⚠️ {DATASET_CACHE_DIR} is stale ({path} changed), reading the CSV. "
+              "Rebuild it with: python wsb_cache.py build")
+
+    if workers <= 1:
+        for chunk in pd.read_csv(path, chunksize=CHUNK_SIZE, dtype=READ_CSV_DTYPES):
+            yield filter_chunk(chunk, start_dt, end_dt)
+        return
+
+    header, ranges = csv_byte_ranges(path, int(INGEST_RANGE_MB * 1024 * 1024))
+    print(f"➡️ ➡️ Ingesting {len(ranges)} byte ranges with {min(workers, len(ranges))} worker processes")
+
+    if len(ranges) == 1:
+        yield filter_byte_range(path, header, *ranges[0], start_dt, end_dt)
+        return
+
+    # map() returns results in submission order -> deterministic output order
+    n = len(ranges)
+    with ProcessPoolExecutor(max_workers=min(workers, n), initializer=init_ingest_worker,
+                             initargs=(TICKER_INDEX,)) as pool:
+        yield from pool.map(
+            filter_byte_range,
+            [path] * n, [header] * n, [r[0] for r in ranges], [r[1] for r in ranges],
+            [start_dt] * n, [end_dt] * n,
+        )
 
 
 # ----------------------------------
@@ -117,18 +305,86 @@ def detect_tickers_in_text(text: str):
       [{"label":"positive","score":0.8}, ...]
     """
 
-def predict_sentiment_batch(model_name: str, texts):
+def make_ml_client():
+    if ML_MODE == "inprocess":
+        return InProcessClient(models=MODELS)
+    return MLClient(ML_BASE_URL, wire=ML_WIRE_FORMAT, max_in_flight=ML_MAX_IN_FLIGHT,
+                    retries=ML_RETRIES, backoff_s=ML_RETRY_BACKOFF_S, timeout=60)
+
 
-    # converting each text into the same format that api expects: {title, body}
-    posts = [{"title": t, "body": ""} for t in texts]
+# (update) callers that don't pass their own client share this one, so its keep-alive connections
+# are reused across calls instead of a new pool per call (closed when the process exits)
+_default_client = None
 
-    payload = {"model": model_name, "posts": posts}
 
-    resp = requests.post(ML_URL, json=payload, timeout=60)
-    resp.raise_for_status()
+def default_ml_client():
+    global _default_client
+    if _default_client is None:
+        _default_client = make_ml_client()
+        atexit.register(_default_client.close)
+    return _default_client
 
-    data = resp.json()
-    return data["predictions"]
+
+def predict_sentiment_batch(model_name: str, texts, client=None):
+    # (update: one batch through the pooled client, main() uses client.predict() for all batches at once)
+    return (client or default_ml_client()).predict_batch(model_name, texts)
+
+
+def score_with_checkpoints(client, store, model_name, version, texts, store_key=None):
+    """
+    Scores texts in slices of CHECKPOINT_EVERY (each slice still runs ML_MAX_IN_FLIGHT batches at once)
+    and writes every finished slice to the store straight away (under store_key, default model_name).
+    store=None -> the model side already saves every fresh prediction into the same store, nothing to write here.
+    Returns the predictions in text order.
+    """
+    store_key = store_key or model_name
+    if store is not None and version is None:
+        print("⚠️ No model version for the prediction store, this run can't be checkpointed")
+
+    step = max(1, CHECKPOINT_EVERY)
+    preds = []
+    try:
+        for i in range(0, len(texts), step):
+            part = texts[i:i + step]
+            part_preds = client.predict(model_name, part, batch_size=BATCH_SIZE)
+            # stored under the version the responses came with (the model that really scored them),
+            # the looked up one is only a fallback for a service that doesn't send one
+            served = client.served_version(model_name) or version
+            if store is not None and served is not None:
+                store.put_many(store_key, served, part, part_preds)
+            preds.extend(part_preds)
+            if len(texts) > step:
+                print(f"💾 Checkpoint: {len(preds)}/{len(texts)} new texts scored + saved")
+    except BaseException:
+        # KeyboardInterrupt included, the slices above are already in the store
+        if version is not None and preds:
+            print(f"⚠️ ⚠️ Stopped after {len(preds)}/{len(texts)} texts for {model_name}, "
+                  f"they're saved, re-run to continue from there")
+        raise
+    return preds
+
+
+# update: asking the service which model versions it serves,
+# the prediction store is keyed on them so I never reuse predictions from an older model
+# (update: + which key each name is stored under and which store the service itself writes to)
+def fetch_serving_info(client=None):
+    try:
+        return (client or default_ml_client()).serving_info()
+    except Exception as e:
+        print("⚠️ Could not fetch model versions (prediction store lookups disabled):", e)
+        return {"model_versions": {}, "served_models": {}, "prediction_store": None}
+
+
+def fetch_model_versions(client=None):
+    return fetch_serving_info(client)["model_versions"]
+
+
+def writes_same_store(model_store_path):
+    # the service / in-process app saves fresh predictions itself -> writing them here again is just a second copy
+    # (only if its the SAME file, a service with its store somewhere else still needs the local write)
+    if not model_store_path:
+        return False
+    return os.path.realpath(model_store_path) == os.path.realpath(PREDICTION_STORE_PATH)
 
 
 # --------------------------------------------
@@ -150,6 +406,129 @@ def label_to_direction(label: str):
     return 0
 
 
+# ---------------------------------------------------------
+# 4B: (update) daily signals + T+1 join, column wise
+# ---------------------------------------------------------
+# these used to be two python loops (one dict per (day, ticker) group, then iterrows() with
+# get_loc + two .loc lookups per row), now its one groupby and one merge, same output
+
+def group_means(columns, codes, counts):
+    """
+    Mean of every column per group (columns = list of arrays, codes = group number per row,
+    counts = rows per group). Returns a (columns x groups) array.
+
+    Not groupby().mean(): pandas sums groups with compensated (Kahan) summation, Series.mean()
+    (what the old loop called on every group) goes through numpy's pairwise sum,
+    and the two differ in the last bit, which shows up in the CSV.
+    So groups of the same length get stacked into a (groups x length) block and summed along
+    the contiguous last axis, numpy runs exactly the same pairwise sum on every row as on
+    a single group -> same bits, one numpy call per distinct group size instead of one python
+    iteration per group.
+    """
+    order = np.argsort(codes, kind="stable")
+    values = np.stack([np.asarray(c, dtype=np.float64)[order] for c in columns])
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+    sums = np.empty((len(columns), len(counts)), dtype=np.float64)
+    for length in np.unique(counts):
+        groups = np.flatnonzero(counts == length)
+        # (C contiguous copy, fancy indexing after a ":" doesn't give one, and the
+        # row wise pairwise sum only happens along a contiguous last axis)
+        block = np.ascontiguousarray(values[:, starts[groups][:, None] + np.arange(length)])
+        sums[:, groups] = block.sum(axis=-1)
+    return sums / counts
+
+
+def daily_signals(df, models):
+    """
+    df: one row per post (date, ticker, <model>_dir, <model>_score)
+    Returns one row per (date, ticker) sorted by date then ticker:
+        date (datetime), ticker, n_posts, <model>_daily_signal, <model>_mean_score
+    """
+    grouped = df.groupby(["date", "ticker"], sort=True)
+    sizes = grouped.size()
+    counts = sizes.to_numpy()
+
+    columns = [df[f"{m}_{kind}"] for m in models for kind in ("dir", "score")]
+    means = group_means(columns, grouped.ngroup().to_numpy(), counts)
+
+    daily_df = sizes.rename("n_posts").reset_index()
+    for i, model_name in enumerate(models):
+        # daily signal = sign of the mean direction, > 0 -> 1, < 0 -> -1, else 0
+        daily_df[f"{model_name}_daily_signal"] = np.sign(means[2 * i]).astype(int)
+        daily_df[f"{model_name}_mean_score"] = means[2 * i + 1]
+
+    daily_df["date"] = pd.to_datetime(daily_df["date"])
+    return daily_df
+
+
+def next_day_closes(close):
+    """
+    Wide close frame (trading days x tickers) -> long frame, one row per (trading day, ticker):
+        date, ticker, next_trading_day, close_t, close_t1
+    T+1 = the next row of the price index (next trading day, not day+1),
+    the last trading day has no T+1 and is left out. A missing close stays NaN.
+    """
+    days = pd.DatetimeIndex(close.index).astype("datetime64[ns]")
+    values = close.to_numpy(dtype=float)
+    n_tickers = values.shape[1]
+
+    # row i of the wide frame next to row i + 1 -> every (day, ticker) with its T+1 close, row major
+    return pd.DataFrame({
+        "date": np.repeat(days[:-1], n_tickers),
+        "ticker": np.tile(close.columns.to_numpy(), max(len(days) - 1, 0)),
+        "next_trading_day": np.repeat(days[1:], n_tickers),
+        "close_t": values[:-1].ravel(),
+        "close_t1": values[1:].ravel(),
+    })
+
+
+def iso_dates(dates):
+    # "YYYY-MM-DD" strings, formatted once per distinct day (a few hundred) instead of once per row
+    codes, days = pd.factorize(dates)
+    return pd.Series(days.strftime("%Y-%m-%d").to_numpy()[codes], index=dates.index)
+
+
+def join_next_day(daily_df, close, models):
+    """
+    daily signals + T+1 closes in one merge -> the backtest result rows
+    (days without a close (weekends, holidays) and tickers without prices drop out, like before)
+    """
+    daily = daily_df.copy()
+    daily["date"] = daily["date"].astype("datetime64[ns]")
+
+    # left merge keeps the daily_df row order, the inner part is the notna() filter after
+    res = daily.merge(next_day_closes(close), on=["date", "ticker"], how="left")
+    res = res[res["next_trading_day"].notna()].reset_index(drop=True)
+
+    # Real next day movement direction
+    # up = +1, down = -1, flat = 0 (NaN close -> 0, same as the old > / < comparisons)
+    c0 = res["close_t"].to_numpy(dtype=float)
+    c1 = res["close_t1"].to_numpy(dtype=float)
+    real_dir = np.where(c1 > c0, 1, np.where(c1 < c0, -1, 0))
+
+    out = pd.DataFrame({
+        "date": iso_dates(res["date"]),
+        "next_trading_day": iso_dates(res["next_trading_day"]),
+        "ticker": res["ticker"],
+        "close_t": c0,
+        "close_t1": c1,
+        "real_dir": real_dir,
+        "n_posts": res["n_posts"].astype(int),
+    })
+
+    # Compare each model
+    # Correct if both directions match exactly
+    # Note: (I can loosen this rule later, keeping this for testing right now)
+    for model_name in models:
+        pred_dir = res[f"{model_name}_daily_signal"].astype(int)
+        out[f"{model_name}_pred_dir"] = pred_dir
+        out[f"{model_name}_correct"] = (pred_dir.to_numpy() == real_dir).astype(int)
+        out[f"{model_name}_mean_score"] = res[f"{model_name}_mean_score"].astype(float)
+
+    return out
+
+
 # ---------------------------------------------------------
 # 5: main function that runs the backtest from start to finish
 # ---------------------------------------------------------
@@ -161,58 +540,25 @@ def main():
     print("1️⃣ 👍 ✅ Loading WSB dataset in chunks...")
     print(f"2️⃣ 👍 ✅ Backtest window: {START_DATE} -> {END_DATE}")
     print(f"3️⃣ 👍 ✅ Tickers: {TICKERS}")
-    print(f"4️⃣ 👍 ✅ Models: {MODELS}")
+    print(f"4️⃣ 👍 ✅ Models: {MODELS} ({ML_MODE})")
 
     # This will store all rows that survive filtering
-    # columns: date, ticker, text
-    rows_kept = []
+    # (update: one DataFrame per chunk, columns: date, ticker, text)
+    kept_chunks = []
 
     # Converting date strings (so we can compare properly)
     start_dt = pd.to_datetime(START_DATE)
     end_dt = pd.to_datetime(END_DATE)
 
     # Read big ahh CSV in chunks without nuking my RAM
-    for chunk in pd.read_csv(DATA_PATH, chunksize=CHUNK_SIZE):
-        
-        if "timestamp" not in chunk.columns: # using this for basic safety even tho my Kaggle file already has a the column "timestamp" 
-            raise ValueError("Expected a 'timestamp' column in the CSV")
-
-        # making sure title and body are always strings (no empty values)
-        # some WSB rows store text in "title", others in "body", so im considering both
-        chunk["title"] = chunk.get("title", "").fillna("")
-        chunk["body"] = chunk.get("body", "").fillna("")
-
-        # combining into one text field
-        chunk["text"] = (chunk["title"].astype(str) + " " + chunk["body"].astype(str)).str.strip()
-
-        # Parse timestamp -> datetime
-        chunk["dt"] = pd.to_datetime(chunk["timestamp"], errors="coerce")
-
-        # Filter by date range
-        chunk = chunk[(chunk["dt"] >= start_dt) & (chunk["dt"] <= end_dt)]
-
-        if chunk.empty:
-            continue
-
-        # (testing)reduce to only what we need (keeps things fast)
-        for _, r in chunk.iterrows():
-            text = r["text"]
-            dt = r["dt"]
-
-            # detect which tickers are mentioned?
-            tickers_found = detect_tickers_in_text(text)
-
-            # IMPORTANT NOTE: skip if 0 tickers, skip if multiple tickers, maintains clean attribution
-            if len(tickers_found) != 1:
-                continue
-
-            ticker = tickers_found[0]
-
-            # Convert datetime to -> just a date string "YYYY-MM-DD"
-            day = dt.date().isoformat()
-            rows_kept.append({"date": day, "ticker": ticker, "text": text})
-
-    df = pd.DataFrame(rows_kept)
+    # (update: on all cores, see iter_filtered_chunks)
+    t0 = time.perf_counter()
+    for kept in iter_filtered_chunks(DATA_PATH, start_dt, end_dt):
+        if not kept.empty:
+            kept_chunks.append(kept)
+    print(f"⏱️ Ingestion + filtering took {time.perf_counter() - t0:.1f}s")
+
+    df = pd.concat(kept_chunks, ignore_index=True) if kept_chunks else pd.DataFrame(columns=KEPT_COLUMNS)
     print("\n✅ Rows kept after filtering:", len(df))
     if df.empty:
         print("❌ No rows found in the selected date range. Check the CSV timestamp format.")
@@ -229,6 +575,16 @@ def main():
     # storing latency so i can show it in evaluation
     latency_summary = []
 
+    # update: predictions already in the store (from earlier runs or the service) are reused
+    store = PredictionStore(PREDICTION_STORE_PATH)
+    client = make_ml_client()
+    serving = fetch_serving_info(client)
+    model_versions = serving["model_versions"]
+    # update: the service already persists what it scores (save_predictions), then the backtest doesn't write again
+    local_store = None if writes_same_store(serving["prediction_store"]) else store
+    if local_store is None:
+        print(f"💾 The ML service saves its predictions into {PREDICTION_STORE_PATH} itself, no second copy from here")
+
     # for each model, we create sentiment predictions for each text row
     for model_name in MODELS:
         print(f"\n🔁 Running predictions for model: {model_name}")
@@ -238,15 +594,34 @@ def main():
 
         t0 = time.perf_counter()
 
-        # sending texts in batches so API calls are not huge af 
         texts_list = df["text"].tolist()
-        for i in range(0, len(texts_list), BATCH_SIZE):
-            batch = texts_list[i:i + BATCH_SIZE]
-            preds = predict_sentiment_batch(model_name, batch)
 
-            for p in preds:
-                preds_label.append(p["label"])
-                preds_score.append(float(p["score"]))
+        # update: only unique texts that are not in the prediction store get sent to the service
+        # (update: under the key + version that really serves the name, e.g. distilbert_int8)
+        version = model_versions.get(model_name)
+        store_key = serving["served_models"].get(model_name, model_name)
+        keys = [normalize_text(t) for t in texts_list]
+        unique_keys = list(dict.fromkeys(keys))
+        known = {}
+        if version is not None:
+            stored = store.get_many(store_key, version, unique_keys)
+            known = {k: p for k, p in zip(unique_keys, stored) if p is not None}
+
+        todo = [k for k in unique_keys if k not in known]
+        print(f"💾 Reusing {len(known)} stored predictions, scoring {len(todo)} new texts")
+
+        # sending texts in batches so API calls are not huge af 
+        # (update: ML_MAX_IN_FLIGHT batches at once over keep-alive connections, results come back in order)
+        # (update: saved to the store every CHECKPOINT_EVERY texts, so a crash doesn't lose them)
+        client.reset_stats()
+        new_preds = score_with_checkpoints(client, local_store, model_name, version, todo, store_key)
+        calls = client.stats()
+
+        known.update(zip(todo, new_preds))
+
+        for k in keys:
+            preds_label.append(known[k]["label"])
+            preds_score.append(float(known[k]["score"]))
 
         t1 = time.perf_counter()
 
@@ -257,10 +632,22 @@ def main():
 
         # update: adding this simple latency metric - seconds per item
         sec_per_item = (t1 - t0) / len(texts_list)
-        latency_summary.append({"model": model_name, "sec_per_text": sec_per_item})
+        # update: + wall clock throughput, with several batches in flight the per text average alone hides the real speed
+        latency_summary.append({
+            "model": model_name,
+            "sec_per_text": sec_per_item,
+            "wall_s": t1 - t0,
+            "rows_per_s": len(texts_list) / (t1 - t0),
+            "scored": calls["texts"],
+            "scored_per_s": calls["texts"] / calls["seconds"] if calls["seconds"] else 0.0,
+            "batches": calls["batches"],
+            "retries": calls["retries"],
+        })
 
         print(f"✅ Done. Avg seconds per text: {sec_per_item:.6f}")
 
+    client.close()
+
     # ----------------------------------------------------
     # Step 6B: aggregate daily sentiment per ticker per model
     # ----------------------------------------------------
@@ -270,31 +657,8 @@ def main():
     # Example:
     # +1, +1, 0, -1 -> mean = 0.25 -> daily signal = +1 (positive leaning)
 
-    daily_rows = []
-
-    grouped = df.groupby(["date", "ticker"])
-    for (day, ticker), g in grouped:
-        row = {"date": day, "ticker": ticker, "n_posts": len(g)}
-
-        for model_name in MODELS:
-            mean_dir = g[f"{model_name}_dir"].mean()
-
-            # Convert mean_dir into final daily signal
-            # greater than 0 -> positive, less than 0 -> negative, else neutral
-            if mean_dir > 0:
-                daily_signal = 1
-            elif mean_dir < 0:
-                daily_signal = -1
-            else:
-                daily_signal = 0
-
-            row[f"{model_name}_daily_signal"] = daily_signal
-            row[f"{model_name}_mean_score"] = g[f"{model_name}_score"].mean()
-
-        daily_rows.append(row)
-
-    daily_df = pd.DataFrame(daily_rows)
-    daily_df["date"] = pd.to_datetime(daily_df["date"])
+    # (update: one grouped aggregation instead of a loop over the groups, see daily_signals)
+    daily_df = daily_signals(df, MODELS)
 
     print("\n✅ Daily aggregated rows:", len(daily_df))
 
@@ -329,68 +693,10 @@ def main():
     # Step 6D: comparing the daily signal vs next-day return
     # ---------------------------------------------
 
-    results = []
-
-    for _, r in daily_df.iterrows():
-        day = r["date"]
-        ticker = r["ticker"]
-
-        if ticker not in close.columns:
-            continue
-
-        # We need close price for day and day+1
-        # update: If market closed, day might not exist so -> skip
-        if day not in close.index:
-            continue
-
-        # this will give the next trading day (not necessarily day+1 calendar day)
-        try:
-            idx = close.index.get_loc(day)
-        except KeyError:
-            continue
-
-        if idx + 1 >= len(close.index):
-            continue
-
-        next_day = close.index[idx + 1]
-
-        c0 = float(close.loc[day, ticker])
-        c1 = float(close.loc[next_day, ticker])
-
-        # Real next day movement direction
-        # up = +1, down = -1, flat = 0
-        if c1 > c0:
-            real_dir = 1
-        elif c1 < c0:
-            real_dir = -1
-        else:
-            real_dir = 0
-
-        out = {
-            "date": day.date().isoformat(),
-            "next_trading_day": next_day.date().isoformat(),
-            "ticker": ticker,
-            "close_t": c0,
-            "close_t1": c1,
-            "real_dir": real_dir,
-            "n_posts": int(r["n_posts"]),
-        }
-
-        # Compare each model
-        for model_name in MODELS:
-            pred_dir = int(r[f"{model_name}_daily_signal"])
-
-            # Correct if both directions match exactly
-            # Note: (I can loosen this rule later, keeping this for testing right now)
-            correct = 1 if pred_dir == real_dir else 0
-
-            out[f"{model_name}_pred_dir"] = pred_dir
-            out[f"{model_name}_correct"] = correct
-            out[f"{model_name}_mean_score"] = float(r[f"{model_name}_mean_score"])
-
-        results.append(out)
-
-    res_df = pd.DataFrame(results)
+    # We need close price for day and day+1 (the next trading day, not necessarily day+1 calendar day)
+    # update: If market closed, day doesn't exist in the prices so -> skipped
+    # (update: a shifted long price frame + one merge instead of get_loc/.loc per row, see join_next_day)
+    res_df = join_next_day(daily_df, close, MODELS)
     if res_df.empty:
         print("❌ No backtest rows matched trading days. Check timestamps vs market dates.")
         return
@@ -410,6 +716,9 @@ def main():
     print("\n================⌛️ LATENCY SUMMARY ⌛️================")
     for item in latency_summary:
         print(f"✅ {item['model']} sec_per_text = {item['sec_per_text']:.6f}")
+        print(f"   wall {item['wall_s']:.1f}s | {item['rows_per_s']:.1f} rows/s | "
+              f"scored {item['scored']} texts at {item['scored_per_s']:.1f} texts/s "
+              f"({item['batches']} batches, {client.max_in_flight} in flight, {item['retries']} retries)")
 
     # ---------------------------------------------
     # Update: Step 6F: saving outputs so I can screenshot for report 
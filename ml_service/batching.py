@@ -0,0 +1,158 @@
+# batching.py
+"""
+Small micro batching engine for the ML service (mainly for DistilBERT).
+
+Why I added this:
+the Node proxy (routes/sentiment.js) fires lots of small /predict calls at the same time,
+and without batching every one of them runs its own tiny DistilBERT forward pass.
+A forward pass over 20 posts costs way less than 20 forward passes over 1 post,
+so here I queue posts from concurrent requests and run them together.
+
+How it works (simplified):
+1) a request calls submit(posts) and blocks until its predictions are ready
+2) a background thread collects queued requests until either
+      - the batch has max_batch_size posts, or
+      - the oldest request has waited max_wait_ms
+3) it runs predict_fn ONCE on all the collected posts
+4) every caller gets back only its own slice of the predictions
+
+Update: submit() can take a deadline (time.monotonic() based, see admission.py). Requests whose
+deadline already passed while they sat in the queue are failed with DeadlineExceeded and never
+reach predict_fn, so the forward pass is only spent on callers that are still waiting.
+
+Update: submit() can take a context too (app.py passes the ModelSet the request started on).
+Only requests with the same context share a batch, and predict_fn gets it as its second argument,
+so a hot reload never mixes posts for two model versions in one forward pass.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from admission import DeadlineExceeded
+
+
+class MicroBatcher:
+    """
+    predict_fn: function that takes a list of posts and returns a list of predictions
+                (same length + same order), e.g. predict_with_distilbert
+                (update: called as predict_fn(posts, context) for requests submitted with a context)
+    max_batch_size: max number of posts in one forward pass
+    max_wait_ms: how long the first request in a batch is allowed to wait for company
+    """
+
+    def __init__(self, predict_fn, max_batch_size=32, max_wait_ms=5.0, name="micro-batcher"):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_s = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        # a request that did not fit in the previous batch waits here for the next one
+        self._carry_over = None
+
+    def submit(self, posts, deadline=None, context=None):
+        """
+        Queue posts for the next batch and wait for this request's predictions.
+        Raises whatever predict_fn raised for the batch.
+        deadline: time.monotonic() value, if it passes before the batch runs -> DeadlineExceeded
+        context: only batched with requests that passed the same object, handed to predict_fn
+        """
+        if not posts:
+            return []
+
+        self._ensure_started()
+
+        fut = Future()
+        self._queue.put((posts, fut, deadline, context))
+        return fut.result()
+
+    def _ensure_started(self):
+        # starting the worker lazily, so the flask debug reloader parent never spawns one
+        if self._thread is not None:
+            return
+
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _next_item(self, timeout=None):
+        if self._carry_over is not None:
+            item = self._carry_over
+            self._carry_over = None
+            return item
+        return self._queue.get(timeout=timeout)
+
+    def _collect_batch(self):
+        # block until the first request arrives
+        first = self._next_item()
+        batch = [first]
+        n_posts = len(first[0])
+
+        deadline = time.perf_counter() + self.max_wait_s
+
+        while n_posts < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._next_item(timeout=remaining)
+            except queue.Empty:
+                break
+
+            # I never split a single request across batches, if it does not fit it goes first next time
+            # (same for a request with another context, it starts the next batch)
+            if n_posts + len(item[0]) > self.max_batch_size or item[3] is not first[3]:
+                self._carry_over = item
+                break
+
+            batch.append(item)
+            n_posts += len(item[0])
+
+        return batch
+
+    def _drop_expired(self, batch):
+        # callers that already gave up don't get a slot in the forward pass
+        now = time.monotonic()
+        alive = []
+        for item in batch:
+            deadline = item[2]
+            if deadline is not None and now >= deadline:
+                item[1].set_exception(DeadlineExceeded("Request deadline exceeded while waiting for a batch"))
+            else:
+                alive.append(item)
+        return alive
+
+    def _run(self):
+        while True:
+            batch = self._drop_expired(self._collect_batch())
+            if not batch:
+                continue
+
+            all_posts = []
+            for posts, _, _, _ in batch:
+                all_posts.extend(posts)
+
+            context = batch[0][3]
+            try:
+                if context is None:
+                    predictions = self.predict_fn(all_posts)
+                else:
+                    predictions = self.predict_fn(all_posts, context)
+            except Exception as e:
+                # one bad batch should fail its callers, not kill the worker thread
+                for _, fut, _, _ in batch:
+                    fut.set_exception(e)
+                continue
+
+            # handing every caller back its own slice
+            start = 0
+            for posts, fut, _, _ in batch:
+                end = start + len(posts)
+                fut.set_result(predictions[start:end])
+                start = end
@@ -0,0 +1,99 @@
+# benchmark_distilbert_buckets.py
+"""
+Quick benchmark: old "pad the whole request" DistilBERT path vs the new length bucketed one.
+
+I'm using real WSB texts (title + body) from the backtest CSV so the length distribution
+is realistic (lots of short titles + the occasional giant rant).
+
+Run from ml_service/:
+    python benchmark_distilbert_buckets.py
+
+It prints time per text for both paths at a few request sizes,
+plus a sanity check that labels are identical and scores match.
+"""
+
+import os
+import time
+
+import pandas as pd
+import torch
+
+# DistilBERT loads on a background thread by default, the benchmark needs it before the first timing
+os.environ.setdefault("DISTILBERT_LOAD", "sync")
+
+import app  # noqa: E402  (loads the models exactly like the Flask service does)
+
+DATA_PATH = os.path.join("data", "wallstreetbets_2022.csv")
+
+N_TEXTS = 2048                   # how many WSB posts to benchmark on
+REQUEST_SIZES = [16, 32, 64, 128]  # posts per /predict call
+
+
+def load_wsb_texts(n):
+    # only reading what I need, the full CSV is huge
+    df = pd.read_csv(DATA_PATH, usecols=["title", "body"], nrows=n * 5)
+    df = df.sample(n=min(n, len(df)), random_state=42)
+
+    texts = (df["title"].fillna("").astype(str) + " " + df["body"].fillna("").astype(str)).str.strip()
+    return [t if t else " " for t in texts]
+
+
+def predict_padded_old(texts):
+    # the exact old path: one tokenizer call with padding=True for the whole request
+    encodings = app.active_models.distilbert_tokenizer(
+        texts, padding=True, truncation=True, max_length=128, return_tensors="pt"
+    )
+    with torch.no_grad():
+        probs = torch.softmax(app.active_models.distilbert_model(**encodings).logits, dim=-1)
+
+    id2label = app.active_models.distilbert_model.config.id2label
+    out = []
+    for row in probs:
+        max_idx = int(torch.argmax(row).item())
+        out.append({"label": str(id2label[max_idx]).lower(), "score": float(row[max_idx].item())})
+    return out
+
+
+def run(fn, texts, request_size):
+    preds = []
+    t0 = time.perf_counter()
+    for i in range(0, len(texts), request_size):
+        preds.extend(fn(texts[i:i + request_size]))
+    t1 = time.perf_counter()
+    return preds, (t1 - t0) / len(texts)
+
+
+def main():
+    if app.active_models.distilbert_model is None:
+        raise RuntimeError("DistilBERT is not loaded, nothing to benchmark")
+
+    texts = load_wsb_texts(N_TEXTS)
+
+    tokenizer = app.active_models.distilbert_tokenizer
+    lengths = [len(ids) for ids in tokenizer(texts, truncation=True, max_length=128)["input_ids"]]
+    lengths = pd.Series(lengths)
+    print(f"Texts: {len(texts)}  |  token length p50={lengths.median():.0f} "
+          f"p90={lengths.quantile(0.9):.0f} max={lengths.max()}")
+    print(f"Bucket size: {app.DISTILBERT_BUCKET_SIZE}\n")
+
+    def bucketed(batch):
+        return app.predict_with_distilbert([{"title": t, "body": ""} for t in batch])
+
+    # warm up so the first timing is not paying for lazy init
+    predict_padded_old(texts[:8])
+    bucketed(texts[:8])
+
+    print(f"{'request':>8} | {'old s/text':>11} | {'new s/text':>11} | {'speedup':>7} | labels same | max score diff")
+    for size in REQUEST_SIZES:
+        old_preds, old_spt = run(predict_padded_old, texts, size)
+        new_preds, new_spt = run(bucketed, texts, size)
+
+        same = all(a["label"] == b["label"] for a, b in zip(old_preds, new_preds))
+        max_diff = max(abs(a["score"] - b["score"]) for a, b in zip(old_preds, new_preds))
+
+        print(f"{size:>8} | {old_spt:>11.6f} | {new_spt:>11.6f} | {old_spt / new_spt:>6.2f}x | "
+              f"{str(same):>11} | {max_diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# benchmark_feature_pipelines.py
+"""
+Benchmark: pickled TfidfVectorizer (vectorizer_lr.pkl) vs hashing + flat idf array (hashing_features.py).
+
+Both pipelines get fitted here on the SAME train split as train_lr.py / train_svm.py (80/20, random_state=42),
+with the same LR + LinearSVC settings, and I compare:
+    - load time + python heap after loading (what every serving process pays at boot)
+    - size on disk of the feature artifacts and of the LR model
+    - transform throughput on WSB posts (posts/s, best of a few runs)
+    - test accuracy of LR + SVM, and how often the two LR models agree
+
+Nothing in model/ gets touched, the artifacts go to a temp folder.
+
+Run from ml_service/:
+    python benchmark_feature_pipelines.py
+    python benchmark_feature_pipelines.py --n-features 1048576
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+from sklearn.svm import LinearSVC
+
+from hashing_features import DEFAULT_N_FEATURES, HashedTfidf, hashing_paths
+
+TRAIN_PATH = os.path.join("data", "all_train.csv")
+WSB_PATH = os.path.join("data", "wallstreetbets_2022.csv")
+
+BATCH_SIZES = [1, 64, 1_000, 10_000]
+REPEATS = 5
+
+
+def load_train_split():
+    # same cleaning + split as train_lr.py
+    df = pd.read_csv(TRAIN_PATH).dropna(subset=["text", "label"])
+    df["text"] = df["text"].astype(str).str.strip()
+    df["label"] = df["label"].astype(str).str.lower().str.strip()
+    df = df[df["label"].isin(["positive", "negative", "neutral"])]
+    df = df[df["text"] != ""]
+    return train_test_split(df["text"], df["label"], test_size=0.2, random_state=42, stratify=df["label"])
+
+
+def load_wsb_texts(n):
+    try:
+        df = pd.read_csv(WSB_PATH, usecols=["title", "body"], nrows=n)
+        texts = (df["title"].fillna("").astype(str) + " " + df["body"].fillna("").astype(str)).str.strip().tolist()
+    except (OSError, ValueError):
+        print(f"⚠️ ⚠️ {WSB_PATH} not found, using synthetic posts")
+        texts = []
+    texts = [t if t else " " for t in texts]
+    while len(texts) < n:
+        texts.extend(texts or ["TSLA to the moon, buying calls tomorrow"])
+    return texts[:n]
+
+
+def timed_load(load_fn, repeats=REPEATS):
+    """best load time + python heap allocated by one load"""
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        obj = load_fn()
+        best = min(best, time.perf_counter() - t0)
+        del obj
+
+    tracemalloc.start()
+    obj = load_fn()
+    heap, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del obj
+    return best, heap
+
+
+def best_transform_time(vec, texts, repeats=REPEATS):
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        vec.transform(texts)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TF-IDF vocabulary vs hashing + idf array")
+    parser.add_argument("--n-features", type=int, default=DEFAULT_N_FEATURES)
+    args = parser.parse_args()
+
+    X_train, X_test, y_train, y_test = load_train_split()
+    print(f"train: {len(X_train)} | test: {len(X_test)} | hashing buckets: {args.n_features}")
+
+    pipelines = {
+        "tfidf": TfidfVectorizer(max_features=20000, ngram_range=(1, 2), stop_words="english"),
+        "hashing": HashedTfidf(n_features=args.n_features, ngram_range=(1, 2), stop_words="english"),
+    }
+
+    results = {}
+    lr_preds = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, vec in pipelines.items():
+            t0 = time.perf_counter()
+            X_train_vec = vec.fit_transform(X_train)
+            fit_s = time.perf_counter() - t0
+            X_test_vec = vec.transform(X_test)
+
+            lr = LogisticRegression(max_iter=400).fit(X_train_vec, y_train)
+            svm = LinearSVC().fit(X_train_vec, y_train)
+            lr_preds[name] = lr.predict(X_test_vec)
+
+            # saving exactly like train_lr.py does, then timing the loads app.py would do
+            lr_path = os.path.join(tmp, f"lr_{name}.pkl")
+            joblib.dump(lr, lr_path)
+            if name == "hashing":
+                idf_path, config_path = hashing_paths(tmp)
+                vec.save(idf_path, config_path)
+                feature_bytes = os.path.getsize(idf_path) + os.path.getsize(config_path)
+                load_s, heap = timed_load(lambda: HashedTfidf.load(idf_path, config_path))
+                mmap_s, mmap_heap = timed_load(lambda: HashedTfidf.load(idf_path, config_path, mmap_mode="r"))
+            else:
+                vec_path = os.path.join(tmp, "vectorizer_lr.pkl")
+                joblib.dump(vec, vec_path)
+                feature_bytes = os.path.getsize(vec_path)
+                load_s, heap = timed_load(lambda: joblib.load(vec_path))
+                mmap_s, mmap_heap = timed_load(lambda: joblib.load(vec_path, mmap_mode="r"))
+
+            results[name] = {
+                "vec": vec,
+                "fit_s": fit_s,
+                "feature_kb": feature_bytes / 1024,
+                "lr_kb": os.path.getsize(lr_path) / 1024,
+                "load_ms": load_s * 1000,
+                "heap_kb": heap / 1024,
+                "mmap_load_ms": mmap_s * 1000,
+                "mmap_heap_kb": mmap_heap / 1024,
+                "lr_acc": accuracy_score(y_test, lr_preds[name]),
+                "svm_acc": accuracy_score(y_test, svm.predict(X_test_vec)),
+            }
+
+    print("\n=== Load + size ===")
+    print(f"{'pipeline':<10}{'features KB':>13}{'LR model KB':>13}{'load ms':>10}{'heap KB':>10}"
+          f"{'mmap load ms':>14}{'mmap heap KB':>14}")
+    for name, r in results.items():
+        print(f"{name:<10}{r['feature_kb']:>13.1f}{r['lr_kb']:>13.1f}{r['load_ms']:>10.2f}{r['heap_kb']:>10.1f}"
+              f"{r['mmap_load_ms']:>14.2f}{r['mmap_heap_kb']:>14.1f}")
+
+    print("\n=== Accuracy (same test split) ===")
+    for name, r in results.items():
+        print(f"{name:<10} LR {r['lr_acc']:.4f} | SVM {r['svm_acc']:.4f} | fit {r['fit_s']:.2f}s")
+    agreement = np.mean(lr_preds["tfidf"] == lr_preds["hashing"])
+    print(f"LR label agreement tfidf vs hashing: {agreement:.4f}")
+
+    print("\n=== Transform throughput (WSB posts, best of", REPEATS, "runs) ===")
+    texts = load_wsb_texts(max(BATCH_SIZES))
+    print(f"{'batch':>8}" + "".join(f"{name + ' posts/s':>18}" for name in results) + f"{'speedup':>10}")
+    for n in BATCH_SIZES:
+        batch = texts[:n]
+        rates = {name: n / best_transform_time(r["vec"], batch) for name, r in results.items()}
+        print(f"{n:>8}" + "".join(f"{rate:>18.0f}" for rate in rates.values())
+              + f"{rates['hashing'] / rates['tfidf']:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
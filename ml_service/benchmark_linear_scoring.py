@@ -0,0 +1,100 @@
+# benchmark_linear_scoring.py
+"""
+Benchmark: old per-row LR/SVM scoring loop vs the stacked, vectorised scorer (linear_scoring.py).
+
+The TF-IDF transform is done once up front and is NOT part of the timing,
+I only want to see the scoring + response building cost per post.
+
+Run from ml_service/:
+    python benchmark_linear_scoring.py
+"""
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import app  # loads the vectoriser + LR + SVM exactly like the Flask service
+
+DATA_PATH = os.path.join("data", "wallstreetbets_2022.csv")
+
+BATCH_SIZES = [1, 64, 1_000, 10_000]
+REPEATS = 5   # taking the best of a few runs so noise doesn't dominate the small batches
+
+
+def load_wsb_texts(n):
+    df = pd.read_csv(DATA_PATH, usecols=["title", "body"], nrows=n)
+    texts = (df["title"].fillna("").astype(str) + " " + df["body"].fillna("").astype(str)).str.strip()
+    texts = [t if t else " " for t in texts]
+
+    # repeating the sample if the CSV is smaller than the biggest batch
+    while len(texts) < n:
+        texts = texts + texts
+    return texts[:n]
+
+
+def score_old(model_key, X_vec):
+    # the exact old loop from predict_with_model
+    model = app.active_models.models[model_key]
+    if hasattr(model, "predict_proba"):
+        probas = model.predict_proba(X_vec)
+    else:
+        probas = 1.0 / (1.0 + np.exp(-np.atleast_2d(model.decision_function(X_vec))))
+    class_labels = list(model.classes_)
+
+    predictions = []
+    for i in range(probas.shape[0]):
+        row_probs = probas[i]
+        max_idx = row_probs.argmax()
+        predictions.append({"label": class_labels[max_idx], "score": float(row_probs[max_idx])})
+    return predictions
+
+
+def score_new(model_keys, X_vec):
+    scorer = app.active_models.linear_scorer
+    margins = scorer.margins(X_vec)
+    return {key: scorer.to_predictions(*scorer.label_score_columns(key, margins)) for key in model_keys}
+
+
+def best_time(fn):
+    best = None
+    result = None
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    if app.active_models.linear_scorer is None:
+        raise RuntimeError("Linear models are not loaded, nothing to benchmark")
+
+    keys = [k for k in ["lr", "svm"] if app.active_models.linear_scorer.supports(k)]
+    texts = load_wsb_texts(max(BATCH_SIZES))
+    X_all = app.active_models.vectorizer.transform(texts)
+
+    print(f"Models: {keys}  (old = one loop per model, new = one stacked product for all)\n")
+    print(f"{'batch':>6} | {'old us/post':>11} | {'new us/post':>11} | {'speedup':>7} | identical labels | max score diff")
+
+    for n in BATCH_SIZES:
+        X_vec = X_all[:n]
+
+        old_t, old_preds = best_time(lambda: {k: score_old(k, X_vec) for k in keys})
+        new_t, new_preds = best_time(lambda: score_new(keys, X_vec))
+
+        same = all(
+            a["label"] == b["label"] for k in keys for a, b in zip(old_preds[k], new_preds[k])
+        )
+        max_diff = max(
+            abs(a["score"] - b["score"]) for k in keys for a, b in zip(old_preds[k], new_preds[k])
+        )
+
+        print(f"{n:>6} | {old_t / n * 1e6:>11.2f} | {new_t / n * 1e6:>11.2f} | "
+              f"{old_t / new_t:>6.2f}x | {str(same):>16} | {max_diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# benchmark_ticker_index.py
+"""
+Benchmark: one regex per ticker (old backtest.py) vs the single Aho-Corasick pass (ticker_index.py),
+for universes of 6, 500 and 10,000 symbols.
+
+The 6 real tickers come from ticker_aliases.txt, the rest of the universe is made up symbols
+(random 3-5 letter tickers + a company name alias each), which is enough to see how the cost scales.
+Both matchers must return exactly the same tickers for every post, the script checks that too.
+
+Run from ml_service/:
+    python benchmark_ticker_index.py
+    python benchmark_ticker_index.py --posts 5000
+"""
+
+import argparse
+import random
+import re
+import string
+import time
+
+import pandas as pd
+
+import ticker_index
+from ticker_index import TickerIndex, load_aliases
+
+DATA_PATH = "data/wallstreetbets_2022.csv"
+REAL_TICKERS = ["TSLA", "AAPL", "MSFT", "NVDA", "AMD", "GME"]
+UNIVERSE_SIZES = [6, 500, 10_000]
+
+# the regex side gets slow fast, so it only scores this many posts per universe (rate is per post anyway)
+MAX_REGEX_SECONDS = 20
+
+
+def load_posts(n):
+    try:
+        df = pd.read_csv(DATA_PATH, usecols=["title", "body"], nrows=n)
+        return (df["title"].fillna("").astype(str) + " " + df["body"].fillna("").astype(str)).str.strip().tolist()
+    except (OSError, ValueError):
+        print(f"⚠️ ⚠️ {DATA_PATH} not found, using synthetic posts")
+        return [f"TSLA and Tesla to the moon {i}, $GME too" for i in range(n)]
+
+
+def build_universe(size, seed=42):
+    aliases = load_aliases(ticker_index.DEFAULT_ALIASES_PATH, REAL_TICKERS)
+    rng = random.Random(seed)
+    while len(aliases) < size:
+        symbol = "".join(rng.choices(string.ascii_uppercase, k=rng.randint(3, 5)))
+        if symbol in aliases:
+            continue
+        name = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 9))).capitalize()
+        aliases[symbol] = [symbol, f"${symbol}", f"{name} Inc"]
+    return dict(list(aliases.items())[:size])
+
+
+def build_regexes(aliases):
+    # the old approach: one case insensitive, word bounded alternation per ticker
+    return {
+        t: re.compile(r"\b(?:" + "|".join(re.escape(w) for w in words) + r")\b", flags=re.IGNORECASE)
+        for t, words in aliases.items()
+    }
+
+
+def regex_find(patterns, text):
+    return [t for t, rgx in patterns.items() if rgx.search(text)]
+
+
+def rate(fn, posts, max_seconds=None):
+    """posts/s, stops early after max_seconds (returns the results it got so far)"""
+    results = []
+    t0 = time.perf_counter()
+    for text in posts:
+        results.append(fn(text))
+        if max_seconds is not None and time.perf_counter() - t0 > max_seconds:
+            break
+    return len(results) / (time.perf_counter() - t0), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="per ticker regex vs single pass ticker index")
+    parser.add_argument("--posts", type=int, default=20_000)
+    args = parser.parse_args()
+
+    posts = load_posts(args.posts)
+    backend = "pyahocorasick" if ticker_index.ahocorasick is not None else "pure python"
+    print(f"posts: {len(posts)} | automaton: {backend}\n")
+
+    print(f"{'symbols':>8}{'aliases':>9}{'build ms':>10}{'regex posts/s':>15}"
+          f"{'index posts/s':>15}{'py index posts/s':>18}{'speedup':>9}  same result")
+    for size in UNIVERSE_SIZES:
+        aliases = build_universe(size)
+
+        t0 = time.perf_counter()
+        index = TickerIndex(aliases)
+        build_ms = (time.perf_counter() - t0) * 1000
+        patterns = build_regexes(aliases)
+
+        # pure python fallback (what runs without pyahocorasick installed)
+        saved, ticker_index.ahocorasick = ticker_index.ahocorasick, None
+        try:
+            py_index = TickerIndex(aliases)
+        finally:
+            ticker_index.ahocorasick = saved
+
+        regex_rate, regex_results = rate(lambda t: regex_find(patterns, t), posts, MAX_REGEX_SECONDS)
+        index_rate, index_results = rate(index.find, posts)
+        py_rate, py_results = rate(py_index.find, posts)
+
+        n = len(regex_results)
+        same = index_results[:n] == regex_results and py_results == index_results
+        print(f"{size:>8}{index.n_aliases:>9}{build_ms:>10.1f}{regex_rate:>15.0f}"
+              f"{index_rate:>15.0f}{py_rate:>18.0f}{index_rate / regex_rate:>8.1f}x  {'✅' if same else '❌'}")
+
+
+if __name__ == "__main__":
+    main()
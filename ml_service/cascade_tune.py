@@ -0,0 +1,112 @@
+# cascade_tune.py
+"""
+Offline threshold picker for the cascade model ("model": "cascade" in app.py).
+
+The cascade scores every post with LR (or SVM) and only escalates the posts below CASCADE_THRESHOLD
+to DistilBERT. A higher threshold escalates more posts: closer to full DistilBERT, but slower.
+
+This script scores a sample of posts with BOTH models once, then replays every threshold offline:
+    - escalated:  share of posts that would go to DistilBERT
+    - agreement:  share of cascade labels equal to the full DistilBERT labels
+    - speedup:    estimated throughput vs DistilBERT on every post (from the measured per post times)
+and recommends the smallest threshold that reaches --target-agreement (= the fastest one that is good enough).
+
+Usage (from ml_service/):
+    python cascade_tune.py data/wallstreetbets_2022.csv --limit 5000 --target-agreement 0.95
+    python cascade_tune.py data/bert_test.csv --gate margin      # CSV with "text" (+ optional "label")
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# DistilBERT has to be loaded before I can score anything
+os.environ.setdefault("DISTILBERT_LOAD", "sync")
+os.environ.setdefault("DISTILBERT_BATCHING", "0")
+os.environ.setdefault("PREDICTION_STORE", "0")
+
+import app  # noqa: E402  (loads the models)
+
+
+def load_posts(path, limit):
+    df = pd.read_csv(path, nrows=limit)
+    if "text" in df.columns:
+        posts = [{"title": str(t), "body": ""} for t in df["text"].fillna("")]
+    else:
+        posts = [
+            {"title": "" if pd.isna(t) else str(t), "body": "" if pd.isna(b) else str(b)}
+            for t, b in zip(df["title"], df.get("body", pd.Series([""] * len(df))))
+        ]
+    gold = df["label"].astype(str).str.lower().str.strip().to_numpy() if "label" in df.columns else None
+    return posts, gold
+
+
+def score_distilbert(posts, model_key, batch_size=256):
+    labels = []
+    for i in range(0, len(posts), batch_size):
+        labels.extend(p["label"] for p in app.predict_with_distilbert(posts[i:i + batch_size], model_key=model_key))
+    return np.array(labels, dtype=object)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="pick CASCADE_THRESHOLD for a target DistilBERT agreement")
+    parser.add_argument("csv", help="CSV with title/body (WSB dump) or a 'text' column (optionally 'label')")
+    parser.add_argument("--limit", type=int, default=5000)
+    parser.add_argument("--first-model", default=app.CASCADE_FIRST_MODEL, choices=["lr", "svm"])
+    parser.add_argument("--gate", default=app.CASCADE_GATE, choices=["confidence", "margin"])
+    parser.add_argument("--target-agreement", type=float, default=0.95)
+    args = parser.parse_args()
+
+    posts, gold = load_posts(args.csv, args.limit)
+    n = len(posts)
+    escalate_key = app.resolve_model_key("distilbert")
+    print(f"Posts: {n} | first model: {args.first_model} | escalate to: {escalate_key} | gate: {args.gate}")
+
+    t0 = time.perf_counter()
+    first_labels, scores, gaps = app.first_stage_columns(args.first_model, posts)
+    t1 = time.perf_counter()
+    bert_labels = score_distilbert(posts, escalate_key)
+    t2 = time.perf_counter()
+
+    first_s = (t1 - t0) / n
+    bert_s = (t2 - t1) / n
+    print(f"{args.first_model} sec_per_text = {first_s:.6f} | {escalate_key} sec_per_text = {bert_s:.6f}")
+    print(f"{args.first_model} alone agrees with {escalate_key} on {np.mean(first_labels == bert_labels):.4f} of posts\n")
+
+    gate = gaps if args.gate == "margin" else scores
+    disagree = first_labels != bert_labels
+
+    rows = []
+    for threshold in np.round(np.arange(0.0, 1.0001, 0.01), 2):
+        escalated = gate < threshold
+        frac = escalated.mean()
+        # escalated posts get the DistilBERT label, so only kept posts can disagree
+        agreement = 1.0 - np.mean(disagree & ~escalated)
+        speedup = bert_s / (first_s + frac * bert_s)
+        row = {"threshold": threshold, "escalated": frac, "agreement": agreement, "speedup": speedup}
+        if gold is not None:
+            cascade_labels = np.where(escalated, bert_labels, first_labels)
+            row["accuracy"] = np.mean(cascade_labels == gold)
+        rows.append(row)
+
+    table = pd.DataFrame(rows)
+    # printing every 5th threshold to keep it readable
+    print(table[(table["threshold"] * 100).round().astype(int) % 5 == 0].to_string(index=False, float_format="%.4f"))
+
+    good = table[table["agreement"] >= args.target_agreement]
+    if good.empty:
+        print(f"\n❌ No threshold reaches {args.target_agreement:.2f} agreement (gate={args.gate})")
+        return
+
+    best = good.iloc[0]
+    print(f"\n✅ Smallest threshold with agreement >= {args.target_agreement:.2f}:")
+    print(f"   CASCADE_FIRST_MODEL={args.first_model} CASCADE_GATE={args.gate} CASCADE_THRESHOLD={best['threshold']:g}")
+    print(f"   escalates {best['escalated']:.1%} of posts, agreement {best['agreement']:.4f}, "
+          f"~{best['speedup']:.2f}x the throughput of {escalate_key} on every post")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# distilbert_int8.py
+"""
+INT8 dynamically quantized DistilBERT (CPU only).
+
+DistilBERT is by far my slowest model, the backtest only runs MODELS = ["distilbert"]
+because all three together are too heavy. Dynamic quantization stores the weights of every
+nn.Linear layer as int8 and quantizes activations on the fly, which is usually a good
+speedup on CPU for a small accuracy cost.
+
+- build_or_load_int8(): used by app.py, builds the quantized copy once and caches it on disk
+  (model/distilbert_fin_sentiment_int8.pt), so it isn't rebuilt at every boot.
+  The cache remembers the fingerprint of the fp32 folder and is rebuilt if the fp32 model changes.
+
+- running this file directly does the accuracy parity check against the fp32 model:
+      python distilbert_int8.py data/bert_test.csv
+  (CSV with a "text" column, and optionally "label" for accuracy)
+  I want to see the label agreement here BEFORE switching real traffic to int8.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import torch
+
+from prediction_cache import artifact_fingerprint
+
+# quantization engine: x86/fbgemm on intel/amd, qnnpack on ARM (e.g. my mac)
+QUANTIZED_ENGINE = os.environ.get("DISTILBERT_INT8_ENGINE", "")
+
+# minimum fp32 vs int8 label agreement for the parity check to pass
+MIN_AGREEMENT = 0.98
+
+
+def quantize(fp32_model):
+    """
+    Quantizes every nn.Linear layer (attention + feed forward + classifier head) to int8.
+    Embeddings and LayerNorm stay fp32.
+    """
+    if QUANTIZED_ENGINE:
+        torch.backends.quantized.engine = QUANTIZED_ENGINE
+
+    qmodel = torch.ao.quantization.quantize_dynamic(fp32_model, {torch.nn.Linear}, dtype=torch.qint8)
+    qmodel.eval()
+    return qmodel
+
+
+def build_or_load_int8(fp32_model, fp32_dir, cache_path):
+    """
+    Returns the int8 model, loading it from cache_path if it was built from the same fp32 weights.
+    fp32_model is only quantized if the cache is missing or stale.
+    """
+    fingerprint = artifact_fingerprint(fp32_dir)
+
+    if os.path.exists(cache_path):
+        try:
+            cached = torch.load(cache_path, map_location="cpu", weights_only=False)
+            if cached.get("fingerprint") == fingerprint:
+                model = cached["model"]
+                model.eval()
+                return model
+            print("⚠️ ⚠️ Cached int8 DistilBERT is stale (fp32 weights changed), rebuilding...")
+        except Exception as e:
+            print("⚠️ ⚠️ Could not read cached int8 DistilBERT, rebuilding:", e)
+
+    qmodel = quantize(fp32_model)
+
+    # writing to a temp file first so a crash mid-write never leaves a broken cache behind
+    tmp_path = cache_path + ".tmp"
+    try:
+        torch.save({"fingerprint": fingerprint, "model": qmodel}, tmp_path)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        # the cache only saves boot time, the quantized model itself is fine
+        # (pickling the whole module can trip over lazy transformers imports, e.g. without torchvision)
+        print("⚠️ ⚠️ Could not cache int8 DistilBERT (quantizing again next boot):", e)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return qmodel
+
+
+# ------------------------------------------
+# Parity check: fp32 vs int8 on a held-out CSV
+# ------------------------------------------
+
+def predict_labels(model, tokenizer, texts, batch_size=32):
+    id2label = model.config.id2label
+    labels = []
+    for i in range(0, len(texts), batch_size):
+        enc = tokenizer(texts[i:i + batch_size], padding=True, truncation=True,
+                        max_length=128, return_tensors="pt")
+        with torch.no_grad():
+            ids = model(**enc).logits.argmax(dim=-1).tolist()
+        labels.extend(str(id2label[j]).lower() for j in ids)
+    return labels
+
+
+def main():
+    import pandas as pd
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    parser = argparse.ArgumentParser(description="fp32 vs int8 DistilBERT parity check")
+    parser.add_argument("csv", help="held-out CSV with a 'text' column (and optionally 'label')")
+    parser.add_argument("--model-dir", default=os.path.join("model", "distilbert_fin_sentiment"))
+    parser.add_argument("--limit", type=int, default=5000, help="max rows to check")
+    parser.add_argument("--min-agreement", type=float, default=MIN_AGREEMENT)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv).dropna(subset=["text"]).head(args.limit)
+    texts = df["text"].astype(str).tolist()
+    print(f"Held-out rows: {len(texts)}")
+
+    tokenizer = AutoTokenizer.from_pretrained(args.model_dir)
+    fp32 = AutoModelForSequenceClassification.from_pretrained(args.model_dir)
+    fp32.eval()
+
+    cache_path = args.model_dir.rstrip("/\\") + "_int8.pt"
+    int8 = build_or_load_int8(fp32, args.model_dir, cache_path)
+
+    t0 = time.perf_counter()
+    fp32_labels = predict_labels(fp32, tokenizer, texts)
+    t1 = time.perf_counter()
+    int8_labels = predict_labels(int8, tokenizer, texts)
+    t2 = time.perf_counter()
+
+    agreement = sum(a == b for a, b in zip(fp32_labels, int8_labels)) / len(texts)
+
+    print(f"\nfp32 sec_per_text = {(t1 - t0) / len(texts):.6f}")
+    print(f"int8 sec_per_text = {(t2 - t1) / len(texts):.6f}  ({(t1 - t0) / (t2 - t1):.2f}x faster)")
+    print(f"\nLabel agreement fp32 vs int8: {agreement:.4f}")
+
+    if "label" in df.columns:
+        gold = df["label"].astype(str).str.lower().str.strip().tolist()
+        fp32_acc = sum(a == g for a, g in zip(fp32_labels, gold)) / len(gold)
+        int8_acc = sum(a == g for a, g in zip(int8_labels, gold)) / len(gold)
+        print(f"fp32 accuracy: {fp32_acc:.4f}")
+        print(f"int8 accuracy: {int8_acc:.4f}  (diff {int8_acc - fp32_acc:+.4f})")
+
+    if agreement < args.min_agreement:
+        print(f"\n❌ Agreement below {args.min_agreement:.2f}, do NOT switch traffic to int8")
+        sys.exit(1)
+
+    print(f"\n✅ Agreement >= {args.min_agreement:.2f}, int8 is safe to serve")
+
+
+if __name__ == "__main__":
+    main()
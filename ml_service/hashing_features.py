@@ -0,0 +1,120 @@
+# hashing_features.py
+"""
+Stateless alternative to the pickled TfidfVectorizer (FEATURE_PIPELINE=hashing).
+
+vectorizer_lr.pkl carries the whole vocabulary dict (20k n-grams -> column) plus the stop word
+tables, unpickling that is slow and every serving process keeps its own copy of all those python strings.
+
+Here the n-gram -> column mapping is a hash function (HashingVectorizer, nothing to store),
+so the only learned state is the IDF weight of every hash bucket, saved as ONE flat float32 array:
+    model/hashing_idf.npy       # shape (n_features,), np.load(mmap_mode="r") shares it between workers
+    model/hashing_config.json   # n_features, ngram_range, stop_words (so train + serve hash the same way)
+
+transform() = hashed term counts * idf, then L2 normalised per row,
+same steps (and same smooth idf formula) as TfidfVectorizer with its defaults.
+Differences vs the old vectoriser:
+    - no max_features cap, every n-gram counts (hash collisions instead of a cut off vocabulary)
+    - n-grams never seen in training get idf 0 -> they don't move the margins
+      (TfidfVectorizer just drops them, so same effect)
+
+benchmark_feature_pipelines.py compares both pipelines (transform throughput, load time, accuracy).
+"""
+
+import json
+import os
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+IDF_FILENAME = "hashing_idf.npy"
+CONFIG_FILENAME = "hashing_config.json"
+
+# 2^18 buckets: ~1 MB of float32 idf weights, few collisions for my ~1M distinct uni+bigrams
+DEFAULT_N_FEATURES = 2 ** 18
+
+
+class HashedTfidf:
+    """
+    Drop-in for the fitted TfidfVectorizer in app.py: only .transform(texts) is used there.
+    """
+
+    def __init__(self, n_features=DEFAULT_N_FEATURES, ngram_range=(1, 2), stop_words="english", idf=None):
+        self.n_features = int(n_features)
+        self.ngram_range = tuple(ngram_range)
+        self.stop_words = stop_words
+        self.idf = idf
+
+        # alternate_sign=False + norm=None -> plain term counts, idf + normalisation are done below
+        self.hasher = HashingVectorizer(
+            n_features=self.n_features,
+            ngram_range=self.ngram_range,
+            stop_words=self.stop_words,
+            alternate_sign=False,
+            norm=None,
+            dtype=np.float64,
+        )
+
+    def fit(self, texts):
+        counts = self.hasher.transform(texts).tocsc()
+        n_docs = counts.shape[0]
+
+        # document frequency per bucket = non zeros per column
+        df = np.diff(counts.indptr)
+
+        # smooth idf, same as TfidfVectorizer(smooth_idf=True)
+        idf = np.log((1 + n_docs) / (1 + df)) + 1.0
+        # buckets no training text hashed into: weight 0, an unseen n-gram shouldn't count at all
+        idf[df == 0] = 0.0
+
+        self.idf = idf.astype(np.float32)
+        return self
+
+    def fit_transform(self, texts):
+        return self.fit(texts).transform(texts)
+
+    def transform(self, texts):
+        if self.idf is None:
+            raise ValueError("HashedTfidf is not fitted yet (call fit() or load())")
+
+        X = self.hasher.transform(texts)
+        # scaling the stored values in place, cheaper than X @ diag(idf)
+        X.data *= self.idf[X.indices]
+        X.eliminate_zeros()
+        return normalize(X, norm="l2", copy=False)
+
+    # -----------------------------
+    # Saving / loading
+    # -----------------------------
+
+    def config(self):
+        return {
+            "n_features": self.n_features,
+            "ngram_range": list(self.ngram_range),
+            "stop_words": self.stop_words,
+        }
+
+    def save(self, idf_path, config_path):
+        np.save(idf_path, self.idf)
+        with open(config_path, "w") as f:
+            json.dump(self.config(), f, indent=2)
+
+    @classmethod
+    def load(cls, idf_path, config_path, mmap_mode=None):
+        with open(config_path) as f:
+            config = json.load(f)
+
+        idf = np.load(idf_path, mmap_mode=mmap_mode)
+        if idf.shape != (config["n_features"],):
+            raise ValueError(f"{idf_path} has shape {idf.shape}, expected ({config['n_features']},)")
+
+        return cls(
+            n_features=config["n_features"],
+            ngram_range=config["ngram_range"],
+            stop_words=config["stop_words"],
+            idf=idf,
+        )
+
+
+def hashing_paths(model_dir):
+    return os.path.join(model_dir, IDF_FILENAME), os.path.join(model_dir, CONFIG_FILENAME)
@@ -0,0 +1,185 @@
+# linear_scoring.py
+"""
+Vectorised scoring for the linear models (LR + SVM) that share the TF-IDF vectoriser.
+
+The old predict_with_model looped in Python over every row (argmax + building a dict),
+and for 10k-post requests that loop was most of the runtime.
+
+What I do here instead:
+1) at load time, stack the coefficient matrices of ALL linear models side by side
+       W = [ lr.coef_.T | svm.coef_.T ]      shape (n_features, n_lr_classes + n_svm_classes)
+2) per request, ONE sparse x dense product gives the margins of every model: X @ W + b
+   (a request for a single model only multiplies that model's columns of W)
+3) margins -> probabilities, argmax and max with NumPy over the whole batch at once
+4) labels/scores come out as two columns (arrays), the dicts are only built at the very end
+
+The probability formulas are the same ones scikit-learn uses:
+    - LogisticRegression multinomial: softmax of the margins
+    - LogisticRegression binary: sigmoid of the single margin -> [1 - p, p]
+    - LogisticRegression one-vs-rest: sigmoid of each margin, normalised to sum to 1
+    - LinearSVC: sigmoid of each margin (same 0-1 style score app.py always used)
+"""
+
+import numpy as np
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _softmax(x):
+    # same steps as sklearn.utils.extmath.softmax
+    x = x - x.max(axis=1, keepdims=True)
+    np.exp(x, out=x)
+    x /= x.sum(axis=1, keepdims=True)
+    return x
+
+
+def _lr_is_ovr(model):
+    # older scikit-learn versions: multi_class="ovr", or "auto" with the liblinear solver
+    multi_class = getattr(model, "multi_class", "auto")
+    if multi_class == "ovr":
+        return True
+    return multi_class in ("auto", "warn", "deprecated") and getattr(model, "solver", "") == "liblinear"
+
+
+class StackedLinearScorer:
+    """
+    models: dict model_key -> fitted sklearn linear model (e.g. MODELS from app.py)
+
+    Models this can't handle exactly (no coef_, binary SVM, ...) are just skipped,
+    supports(key) tells app.py whether to use the old per-model path for them.
+    """
+
+    def __init__(self, models):
+        self.slices = {}    # model_key -> slice of columns in W
+        self.kinds = {}     # model_key -> "softmax" | "binary" | "ovr" | "sigmoid"
+        self.classes = {}   # model_key -> numpy array of class labels
+
+        blocks = []
+        intercepts = []
+        col = 0
+
+        for key, model in models.items():
+            kind = self._kind(model)
+            if kind is None:
+                continue
+
+            coef = np.asarray(model.coef_, dtype=np.float64)
+            intercept = np.broadcast_to(np.asarray(model.intercept_, dtype=np.float64), (coef.shape[0],))
+
+            blocks.append(coef.T)
+            intercepts.append(intercept)
+
+            self.slices[key] = slice(col, col + coef.shape[0])
+            self.kinds[key] = kind
+            self.classes[key] = np.asarray(model.classes_, dtype=object)
+            col += coef.shape[0]
+
+        if blocks:
+            # Fortran order = each column is contiguous, which is what the sparse x dense product reads
+            self.W = np.asfortranarray(np.hstack(blocks))
+            self.b = np.concatenate(intercepts)
+        else:
+            self.W = None
+            self.b = None
+
+    @staticmethod
+    def _kind(model):
+        if not hasattr(model, "coef_") or not hasattr(model, "classes_"):
+            return None
+
+        n_classes = len(model.classes_)
+        n_rows = np.atleast_2d(model.coef_).shape[0]
+
+        if hasattr(model, "predict_proba"):
+            if n_classes <= 2:
+                return "binary" if n_rows == 1 else None
+            if n_rows != n_classes:
+                return None
+            return "ovr" if _lr_is_ovr(model) else "softmax"
+
+        if hasattr(model, "decision_function") and n_classes > 2 and n_rows == n_classes:
+            return "sigmoid"
+
+        return None
+
+    def supports(self, model_key):
+        return model_key in self.slices
+
+    def margins(self, X_vec, model_key=None):
+        """
+        ONE sparse x dense product for every stacked model: (n_posts, total_classes)
+        model_key: only that model's columns of W and b -> (n_posts, n_classes)
+        (no point paying for the other models when the request only wants one of them)
+        """
+        if model_key is None:
+            return np.asarray(X_vec @ self.W) + self.b
+
+        # W is Fortran order, so a column slice is still contiguous (a view, no copy)
+        sl = self.slices[model_key]
+        return np.asarray(X_vec @ self.W[:, sl]) + self.b[sl]
+
+    def _model_columns(self, model_key, margins):
+        # full width = margins of every model -> cut out this model's block,
+        # anything else is already margins(X_vec, model_key)
+        # (if this is the only stacked model, both are the same columns anyway)
+        if margins.shape[1] == self.W.shape[1]:
+            return margins[:, self.slices[model_key]]
+        return margins
+
+    def probabilities(self, model_key, margins, rows=None):
+        """
+        margins: output of margins(), for every model or just for model_key
+        rows: optional list of row indexes to keep (e.g. only the texts this model still needs)
+
+        Returns (n_posts, n_classes) probabilities (0-1 style scores for LinearSVC), columns = classes[model_key]
+        """
+        m = self._model_columns(model_key, margins)
+        if rows is not None:
+            m = m[rows]
+
+        kind = self.kinds[model_key]
+
+        if kind == "binary":
+            p = _sigmoid(m[:, 0])
+            probas = np.column_stack([1.0 - p, p])
+        elif kind == "softmax":
+            probas = _softmax(m)
+        elif kind == "ovr":
+            probas = _sigmoid(m)
+            probas /= probas.sum(axis=1, keepdims=True)
+        else:
+            probas = _sigmoid(m)
+
+        return probas
+
+    def label_score_columns(self, model_key, margins, rows=None, probas=None):
+        """
+        Returns two arrays: labels (object) and scores (float), one entry per post
+        (probas: already computed probabilities(), to skip doing it twice)
+        """
+        if probas is None:
+            probas = self.probabilities(model_key, margins, rows)
+
+        # argmax over probabilities (not margins), so ties break exactly like before
+        best = probas.argmax(axis=1)
+        scores = probas[np.arange(probas.shape[0]), best]
+        labels = self.classes[model_key][best]
+
+        return labels, scores
+
+    @staticmethod
+    def top_two_gap(probas):
+        """
+        best probability - second best, per post (how far the model is from changing its mind)
+        """
+        if probas.shape[1] < 2:
+            return probas[:, 0].copy()
+        top_two = np.partition(probas, -2, axis=1)[:, -2:]
+        return top_two[:, 1] - top_two[:, 0]
+
+    @staticmethod
+    def to_predictions(labels, scores):
+        # column wise -> list of dicts, .tolist() turns numpy values into plain python ones in C
+        return [{"label": label, "score": score} for label, score in zip(labels.tolist(), scores.tolist())]
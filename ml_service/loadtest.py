@@ -0,0 +1,141 @@
+# loadtest.py
+"""
+Load test for /predict: Flask (app.py) vs the async server (asgi_app.py).
+
+Opens N concurrent clients (keep-alive connections) for a fixed duration, every client sends
+/predict requests back to back with real WSB posts, and I compare:
+    - throughput (requests/s and posts/s)
+    - latency p50 / p95 / p99 / max
+    - status codes (429 / 504 from admission control count as rejected, not as errors)
+
+Usage (from ml_service/, with both servers running):
+    python app.py                                  # flask on 5051
+    python asgi_app.py --port 5052                 # async on 5052
+    python loadtest.py --model distilbert --concurrency 64 --duration 30 \
+        --url http://localhost:5051 --url http://localhost:5052
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+import numpy as np
+import pandas as pd
+
+DATA_PATH = "data/wallstreetbets_2022.csv"
+
+
+def load_posts(limit):
+    try:
+        df = pd.read_csv(DATA_PATH, usecols=["title", "body"], nrows=limit)
+        posts = [{"title": str(t), "body": "" if pd.isna(b) else str(b)} for t, b in zip(df["title"], df["body"])]
+    except (OSError, ValueError):
+        print(f"⚠️ ⚠️ {DATA_PATH} not found, using synthetic posts")
+        posts = []
+    if not posts:
+        posts = [{"title": f"TSLA to the moon {i}", "body": "buying calls tomorrow"} for i in range(limit)]
+    return posts
+
+
+async def client(host, port, payloads, stop_at, latencies, statuses):
+    # one keep-alive connection per client, plain asyncio so thousands of clients stay cheap here too
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < stop_at:
+            body = random.choice(payloads)
+            request = (
+                f"POST /predict HTTP/1.1\r\nHost: {host}:{port}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n"
+            ).encode() + body
+
+            t0 = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+
+            head = await reader.readuntil(b"\r\n\r\n")
+            status = int(head.split(b" ", 2)[1])
+            length = 0
+            close = False
+            for line in head.split(b"\r\n")[1:]:
+                name, _, value = line.partition(b":")
+                if name.strip().lower() == b"content-length":
+                    length = int(value.strip())
+                elif name.strip().lower() == b"connection" and value.strip().lower() == b"close":
+                    close = True
+            await reader.readexactly(length)
+
+            latencies.append(time.perf_counter() - t0)
+            statuses[status] += 1
+
+            if close:
+                writer.close()
+                reader, writer = await asyncio.open_connection(host, port)
+    except (ConnectionError, asyncio.IncompleteReadError) as e:
+        statuses[f"conn_error: {type(e).__name__}"] += 1
+    finally:
+        writer.close()
+
+
+async def run_load(url, payloads, concurrency, duration):
+    parts = urlsplit(url)
+    latencies = []
+    statuses = Counter()
+
+    t0 = time.perf_counter()
+    stop_at = t0 + duration
+    await asyncio.gather(*(
+        client(parts.hostname, parts.port or 80, payloads, stop_at, latencies, statuses)
+        for _ in range(concurrency)
+    ))
+    wall = time.perf_counter() - t0
+
+    return latencies, statuses, wall
+
+
+def report(url, latencies, statuses, wall, posts_per_request):
+    ok = statuses.get(200, 0)
+    rejected = statuses.get(429, 0) + statuses.get(504, 0)
+    lat = np.array(latencies) * 1000 if latencies else np.zeros(1)
+
+    print(f"\n=== {url} ===")
+    print(f"wall: {wall:.1f}s | requests: {len(latencies)} | ok: {ok} | rejected (429/504): {rejected}")
+    print(f"throughput: {ok / wall:.1f} req/s | {ok * posts_per_request / wall:.1f} posts/s")
+    print(f"latency ms: p50 {np.percentile(lat, 50):.1f} | p95 {np.percentile(lat, 95):.1f} | "
+          f"p99 {np.percentile(lat, 99):.1f} | max {lat.max():.1f}")
+    print("status codes:", dict(statuses))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/predict load test (flask vs asgi)")
+    parser.add_argument("--url", action="append", help="base url, repeat to compare servers")
+    parser.add_argument("--model", default="lr")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--posts-per-request", type=int, default=8)
+    parser.add_argument("--unique-posts", type=int, default=20_000,
+                        help="pool of posts to sample from (bigger = fewer cache hits)")
+    args = parser.parse_args()
+
+    urls = args.url or ["http://localhost:5051", "http://localhost:5052"]
+    posts = load_posts(args.unique_posts)
+
+    # payloads are built up front so the client side costs as little as possible
+    payloads = []
+    for _ in range(2000):
+        sample = random.sample(posts, min(args.posts_per_request, len(posts)))
+        payloads.append(json.dumps({"model": args.model, "posts": sample}).encode())
+
+    print(f"model={args.model} concurrency={args.concurrency} duration={args.duration}s "
+          f"posts/request={args.posts_per_request}")
+
+    for url in urls:
+        latencies, statuses, wall = asyncio.run(run_load(url, payloads, args.concurrency, args.duration))
+        report(url, latencies, statuses, wall, args.posts_per_request)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# metrics.py
+"""
+Tiny Prometheus style metrics for the ML service (GET /metrics in app.py).
+
+Until now all I had were print statements and the sec_per_text number in backtest.py,
+so this keeps counters + histograms in memory and renders them in the Prometheus text format
+(https://prometheus.io/docs/instrumenting/exposition_formats/), no extra dependency needed.
+
+Cost on the hot path: observe() is a bisect over ~15 bucket bounds and a few integer adds
+under a lock, so timing every stage of every request is basically free next to a TF-IDF
+transform or a DistilBERT forward pass.
+
+Note: with serve_prefork.py every worker has its own numbers (each scrape hits one worker).
+"""
+
+import bisect
+import threading
+
+# seconds, from a cached LR answer (~0.1ms) up to a huge DistilBERT batch
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# posts per model call / forward pass
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+# DistilBERT tokens per text (max_length is 128)
+TOKEN_BUCKETS = (8, 16, 24, 32, 48, 64, 96, 128)
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    inner = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs)
+    return "{" + inner + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = tuple(labelnames)
+        # labels -> [count per bucket (+1 for +Inf), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _get_series(self, labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        return series
+
+    def observe(self, value, *labels):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._get_series(labels)
+            series[0][idx] += 1
+            series[1] += value
+            series[2] += 1
+
+    def observe_many(self, values, *labels):
+        # one lock for a whole list (e.g. token lengths of every text in a batch)
+        idxs = [bisect.bisect_left(self.buckets, v) for v in values]
+        with self._lock:
+            series = self._get_series(labels)
+            for idx in idxs:
+                series[0][idx] += 1
+            series[1] += sum(values)
+            series[2] += len(idxs)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, (list(s[0]), s[1], s[2])) for labels, s in self._series.items())
+
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = _format_labels(self.labelnames, labels, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            plain = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{plain} {_format_value(total)}")
+            lines.append(f"{self.name}_count{plain} {count}")
+        return lines
+
+
+class GaugeCallback:
+    """
+    Gauge whose values are read at scrape time (cache stats, load times, queue depth...)
+    fn returns {label values tuple: number}
+    """
+
+    def __init__(self, name, documentation, labelnames, fn, kind="gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+        self.kind = kind
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in sorted(self.fn().items()):
+            if value is None:
+                continue
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, buckets, labelnames=()):
+        return self.register(Histogram(name, documentation, buckets, labelnames))
+
+    def gauge_callback(self, name, documentation, labelnames, fn, kind="gauge"):
+        return self.register(GaugeCallback(name, documentation, labelnames, fn, kind))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
@@ -0,0 +1,325 @@
+# ml_client.py
+"""
+Client for the Flask ML service, used by backtest.py.
+
+backtest.py used to call requests.post() once per 64 text batch, one batch at a time:
+new TCP connection every call, and the service sat idle while the backtest waited for each answer.
+
+What this does instead:
+    - keep-alive sessions (one per worker thread, so connections are reused across batches)
+    - up to max_in_flight batches at the same time (thread pool), so the service always has work queued
+      (its micro batching / admission control decide how much actually runs at once)
+    - retries with exponential backoff + jitter on transient errors:
+      connection errors, timeouts, 429 (honours Retry-After), 502 / 503 / 504
+    - predictions come back in the same order as the texts, no matter which batch finished first
+    - stats() for the latency summary: batches, retries, wall clock seconds
+
+Update: InProcessClient, same interface without any HTTP.
+It imports app.py, so the models are loaded by exactly the same code the service runs,
+and calls the predictors directly: no JSON encoding, no sockets, no Flask request handling.
+Meant for big offline runs where nothing else needs the service (backtest.py ML_MODE=inprocess).
+"""
+
+import abc
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import wire_format
+
+# status codes worth retrying: shed by admission control, model still loading, deadline expired, proxy hiccups
+RETRY_STATUSES = {429, 502, 503, 504}
+
+# in-process LR/SVM score a whole batch with one sparse matrix product, bigger batches are just faster
+# (every row is scored on its own, so the batch size never changes a prediction)
+INPROCESS_LINEAR_BATCH_SIZE = 4096
+
+
+class MLServiceError(Exception):
+    """A batch still failed after all retries (or with a non retryable status)."""
+
+
+class _BatchingClient(abc.ABC):
+    """
+    What both clients share: batches, up to max_in_flight of them at once,
+    predictions back in text order, stats. Subclasses implement predict_batch() + serving_info().
+    """
+
+    def __init__(self, max_in_flight=4):
+        self.max_in_flight = max(1, int(max_in_flight))
+        self._lock = threading.Lock()
+        self._stats = {"batches": 0, "texts": 0, "retries": 0, "seconds": 0.0}
+        self._served = {}
+
+    @abc.abstractmethod
+    def predict_batch(self, model_name, texts):
+        """
+        One batch of texts -> one prediction dict per text, in the same order
+        """
+
+    @abc.abstractmethod
+    def serving_info(self):
+        """
+        {"model_versions": name -> version, "served_models": name -> key it's stored under,
+         "prediction_store": path of the store the model side writes every fresh prediction to, or None}
+        """
+
+    def model_versions(self):
+        return self.serving_info()["model_versions"]
+
+    def batch_size_for(self, model_name, batch_size):
+        return batch_size
+
+    def predict(self, model_name, texts, batch_size=64):
+        """
+        All texts, split into batches of batch_size with up to max_in_flight of them in flight.
+        Returns the predictions in the same order as texts.
+        """
+        texts = list(texts)
+        batch_size = self.batch_size_for(model_name, batch_size)
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        if not batches:
+            return []
+
+        t0 = time.perf_counter()
+        if self.max_in_flight == 1 or len(batches) == 1:
+            results = [self.predict_batch(model_name, b) for b in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_in_flight, len(batches))) as pool:
+                # map() yields in submission order -> predictions line up with texts
+                results = list(pool.map(lambda b: self.predict_batch(model_name, b), batches))
+
+        with self._lock:
+            self._stats["seconds"] += time.perf_counter() - t0
+
+        preds = []
+        for batch, batch_preds in zip(batches, results):
+            if len(batch_preds) != len(batch):
+                raise MLServiceError(f"Got {len(batch_preds)} predictions for {len(batch)} texts")
+            preds.extend(batch_preds)
+        return preds
+
+    def _count_batch(self, texts, model_name=None, model_version=None):
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["texts"] += len(texts)
+            if model_version is not None:
+                self._served[model_name] = model_version
+
+    def served_version(self, model_name):
+        """
+        model_version the last prediction response for model_name came with (None before the first one).
+        That's the version that really scored the texts, e.g. the int8 one when "distilbert" is aliased to it,
+        so anything cached/stored per version should use this instead of a version looked up beforehand.
+        """
+        with self._lock:
+            return self._served.get(model_name)
+
+    def stats(self):
+        """batches / texts / retries / seconds (wall clock inside predict()) since the last reset"""
+        with self._lock:
+            return dict(self._stats)
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {"batches": 0, "texts": 0, "retries": 0, "seconds": 0.0}
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MLClient(_BatchingClient):
+
+    def __init__(self, base_url, wire="json", max_in_flight=4, retries=4, backoff_s=0.5, timeout=60):
+        super().__init__(max_in_flight)
+        self.base_url = base_url.rstrip("/")
+        self.predict_url = f"{self.base_url}/predict"
+        self.wire = wire if wire == "msgpack" and wire_format.msgpack_available() else "json"
+        self.retries = max(0, int(retries))
+        self.backoff_s = backoff_s
+        self.timeout = timeout
+
+        self._local = threading.local()
+        self._sessions = []
+
+    # -----------------------------
+    # Sessions
+    # -----------------------------
+
+    def _session(self):
+        # requests.Session isn't meant to be shared between threads, so every worker thread gets
+        # its own, each keeps its connection alive between batches
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+            session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions.clear()
+
+    # -----------------------------
+    # Requests
+    # -----------------------------
+
+    def _backoff(self, attempt, resp=None):
+        # exponential with jitter, so in-flight batches don't all come back at the same moment
+        delay = self.backoff_s * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+        # Retry-After from the service is the minimum (429 from admission control, 503 while loading),
+        # jittered too, otherwise every shed batch retries in the same instant and gets shed again
+        if resp is not None:
+            try:
+                delay = max(delay, float(resp.headers.get("Retry-After")) * random.uniform(1.0, 1.5))
+            except (TypeError, ValueError):
+                pass
+        return delay
+
+    def _post(self, body, headers):
+        last_error = None
+        for attempt in range(self.retries + 1):
+            resp = None
+            try:
+                resp = self._session().post(self.predict_url, data=body, headers=headers, timeout=self.timeout)
+                if resp.status_code not in RETRY_STATUSES:
+                    resp.raise_for_status()
+                    return resp
+                last_error = f"HTTP {resp.status_code}"
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = f"{type(e).__name__}: {e}"
+            except requests.HTTPError as e:
+                raise MLServiceError(f"{self.predict_url} answered {e.response.status_code}: {e.response.text[:200]}")
+
+            if attempt == self.retries:
+                break
+            with self._lock:
+                self._stats["retries"] += 1
+            time.sleep(self._backoff(attempt, resp))
+
+        raise MLServiceError(f"{self.predict_url} failed after {self.retries + 1} attempts ({last_error})")
+
+    def predict_batch(self, model_name, texts):
+        """
+        One /predict call (with retries). Returns a list of {"label", "score"} dicts, same order as texts.
+        """
+        if self.wire == "msgpack":
+            # texts go as one column and predictions come back as columns
+            body = wire_format.pack({"model": model_name, "texts": list(texts)})
+            headers = {"Content-Type": wire_format.MSGPACK_CONTENT_TYPE, "Accept": wire_format.MSGPACK_CONTENT_TYPE}
+            resp = self._post(body, headers)
+            payload = wire_format.unpack(resp.content)
+            preds = wire_format.decode_predictions(payload)
+        else:
+            # converting each text into the same format that api expects: {title, body}
+            posts = [{"title": t, "body": ""} for t in texts]
+            body = json.dumps({"model": model_name, "posts": posts})
+            resp = self._post(body, {"Content-Type": "application/json"})
+            payload = resp.json()
+            preds = payload["predictions"]
+
+        self._count_batch(texts, model_name, payload.get("model_version"))
+        return preds
+
+    def serving_info(self):
+        resp = self._session().get(f"{self.base_url}/", timeout=10)
+        resp.raise_for_status()
+        payload = resp.json()
+        return {
+            "model_versions": payload.get("model_versions") or {},
+            "served_models": payload.get("served_models") or {},
+            "prediction_store": payload.get("prediction_store"),
+        }
+
+
+class InProcessClient(_BatchingClient):
+    """
+    Loads the models of app.py into THIS process and scores with them directly.
+
+    models: the model names the caller is going to ask for, DistilBERT is only loaded if one
+    of them needs it. app.py is imported on first use (the import is what loads the models),
+    with the same settings cascade_tune.py uses for offline scoring:
+        DISTILBERT_LOAD=sync       loaded before the first batch (instead of 503 + retry while it loads)
+        DISTILBERT_BATCHING=0      one caller, nothing to micro batch
+        PREDICTION_STORE=0         the caller has its own store
+    (anything already set in the environment wins)
+
+    max_in_flight=1 by default: torch already uses every core for one forward pass,
+    and LR/SVM batches are done long before a second thread would help.
+    """
+
+    def __init__(self, models=None, max_in_flight=1):
+        super().__init__(max_in_flight)
+        self.models = [m.lower() for m in (models or [])]
+        self._app = None
+
+    @property
+    def app(self):
+        if self._app is None:
+            with self._lock:
+                if self._app is None:
+                    needs_distilbert = any(m not in ("lr", "svm") for m in self.models)
+                    os.environ.setdefault("DISTILBERT_LOAD", "sync" if needs_distilbert else "off")
+                    os.environ.setdefault("DISTILBERT_BATCHING", "0")
+                    os.environ.setdefault("PREDICTION_STORE", "0")
+
+                    t0 = time.perf_counter()
+                    import app  # loads the models (same loading code as the service)
+                    print(f"✅ ✅ In-process models loaded in {time.perf_counter() - t0:.1f}s")
+                    self._app = app
+        return self._app
+
+    def _model_key(self, model_name, model_set=None):
+        app = self.app
+        # same name -> key rules as /predict (unknown names fall back to lr, distilbert may mean int8)
+        key = app.pick_model_key((model_name or "lr").lower(), model_set)
+        broken = [k for k in (app.cascade_parts(model_set) if key == app.CASCADE_KEY else [key])
+                  if app.MODEL_STATUS.get(k, {}).get("state") in ("failed", "disabled")]
+        if broken:
+            raise MLServiceError(f"Model {', '.join(broken)} is not available in-process "
+                                 f"({', '.join(app.MODEL_STATUS[k]['state'] for k in broken)})")
+        return key
+
+    def batch_size_for(self, model_name, batch_size):
+        if self._model_key(model_name) in ("lr", "svm"):
+            return max(batch_size, INPROCESS_LINEAR_BATCH_SIZE)
+        return batch_size
+
+    def predict_batch(self, model_name, texts):
+        # one ModelSet for the whole batch, like one /predict request
+        model_set = self.app.active_models
+        key = self._model_key(model_name, model_set)
+        posts = [{"title": t, "body": ""} for t in texts]
+        # shed=False: wait for a model slot instead of getting Overloaded, there's nobody to retry for us
+        preds, model_version = self.app.predict_versioned(key, posts, shed=False, model_set=model_set)
+
+        self._count_batch(texts, model_name, model_version)
+        return [{"label": str(p["label"]), "score": float(p["score"])} for p in preds]
+
+    def serving_info(self):
+        # same as the service's "/" (versions + keys of what each name is really served by)
+        app = self.app
+        model_set = app.active_models
+        return {
+            "model_versions": app.served_model_versions(model_set),
+            "served_models": app.served_model_keys(model_set),
+            "prediction_store": app.PREDICTION_STORE_PATH if app.prediction_store is not None else None,
+        }
@@ -0,0 +1,329 @@
+# model_registry.py
+"""
+Versioned model registry over ml_service/model.
+
+Before this, deploying a new lr_model.pkl / svm_model.pkl / DistilBERT meant overwriting
+the files in model/ and restarting app.py (full cold start, failing traffic in between).
+
+Layout:
+    model/
+        versions/
+            CURRENT                          # name of the active version (one line)
+            20260101-120000/
+                manifest.json                # sha256 + size of every artifact file
+                vectorizer_lr.pkl
+                lr_model.pkl
+                svm_model.pkl
+                hashing_idf.npy, hashing_config.json,
+                lr_model_hashing.pkl, svm_model_hashing.pkl   # (optional, FEATURE_PIPELINE=hashing)
+                distilbert_fin_sentiment/    # (optional, HF folder)
+            20260214-093000/
+                ...
+
+Without a versions/ folder app.py keeps using the old flat model/ layout.
+
+app.py loads a new version in the background (POST /admin/reload) and swaps it in atomically
+(one new ModelSet, see app.py): in-flight requests finish on the old models, new requests see the new ones.
+
+CLI (from ml_service/):
+    python model_registry.py publish [--source model] [--version v2] [--activate]
+    python model_registry.py list
+    python model_registry.py verify <version>
+    python model_registry.py activate <version>
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+VERSIONS_DIRNAME = "versions"
+CURRENT_FILENAME = "CURRENT"
+MANIFEST_FILENAME = "manifest.json"
+
+# artifact name -> file/folder name inside a version (same names as the flat model/ layout)
+ARTIFACTS = {
+    "vectorizer": "vectorizer_lr.pkl",
+    "lr": "lr_model.pkl",
+    "svm": "svm_model.pkl",
+    "distilbert": "distilbert_fin_sentiment",
+    # FEATURE_PIPELINE=hashing (see hashing_features.py)
+    "hashing_idf": "hashing_idf.npy",
+    "hashing_config": "hashing_config.json",
+    "lr_hashing": "lr_model_hashing.pkl",
+    "svm_hashing": "svm_model_hashing.pkl",
+}
+# derived from the DistilBERT weights by app.py (not published, not in the manifest)
+INT8_CACHE_FILENAME = "distilbert_fin_sentiment_int8.pt"
+
+
+class RegistryError(Exception):
+    """Missing version, broken manifest or an artifact whose hash doesn't match."""
+
+
+# -----------------------------
+# Hashing + manifests
+# -----------------------------
+
+def sha256_file(path, chunk_size=1024 * 1024):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def artifact_files(version_dir, name):
+    """relative paths of every file that belongs to one artifact (a single file or a whole folder)"""
+    path = os.path.join(version_dir, name)
+    if os.path.isfile(path):
+        return [name]
+
+    files = []
+    for root, _, names in os.walk(path):
+        for n in names:
+            files.append(os.path.relpath(os.path.join(root, n), version_dir).replace(os.sep, "/"))
+    return sorted(files)
+
+
+def build_manifest(version_dir, version):
+    files = {}
+    for name in ARTIFACTS.values():
+        if not os.path.exists(os.path.join(version_dir, name)):
+            continue
+        for rel in artifact_files(version_dir, name):
+            full = os.path.join(version_dir, rel)
+            files[rel] = {"sha256": sha256_file(full), "size": os.path.getsize(full)}
+
+    return {
+        "version": version,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "files": files,
+    }
+
+
+def read_manifest(version_dir):
+    path = os.path.join(version_dir, MANIFEST_FILENAME)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        raise RegistryError(f"Cannot read {path}: {e}")
+
+
+def write_json_atomic(path, payload):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def verify(version_dir):
+    """
+    Re-hashes every file listed in the manifest, raises RegistryError on the first mismatch.
+    Returns the manifest.
+    """
+    manifest = read_manifest(version_dir)
+    for rel, meta in manifest.get("files", {}).items():
+        full = os.path.join(version_dir, rel)
+        if not os.path.isfile(full):
+            raise RegistryError(f"{rel} is missing")
+        if os.path.getsize(full) != meta["size"] or sha256_file(full) != meta["sha256"]:
+            raise RegistryError(f"{rel} does not match its manifest hash")
+    return manifest
+
+
+def content_version(manifest, *names):
+    """
+    Short version string for a model from the manifest hashes of its artifacts,
+    e.g. content_version(manifest, "vectorizer_lr.pkl", "lr_model.pkl").
+    Same bytes -> same version, even if they got re-published under another version name
+    (so the prediction cache / store keep working across identical deploys).
+    Returns None if one of the artifacts isn't in the manifest.
+    """
+    h = hashlib.sha1()
+    for name in names:
+        entries = sorted((rel, meta["sha256"]) for rel, meta in manifest.get("files", {}).items()
+                         if rel == name or rel.startswith(name + "/"))
+        if not entries:
+            return None
+        for rel, digest in entries:
+            h.update(f"{rel}:{digest}|".encode())
+    return h.hexdigest()[:12]
+
+
+# -----------------------------
+# Versions
+# -----------------------------
+
+def versions_dir(model_dir):
+    return os.path.join(model_dir, VERSIONS_DIRNAME)
+
+
+def list_versions(model_dir):
+    root = versions_dir(model_dir)
+    if not os.path.isdir(root):
+        return []
+    return sorted(n for n in os.listdir(root) if os.path.isfile(os.path.join(root, n, MANIFEST_FILENAME)))
+
+
+def current_version(model_dir):
+    try:
+        with open(os.path.join(versions_dir(model_dir), CURRENT_FILENAME)) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def set_current(model_dir, version):
+    if version not in list_versions(model_dir):
+        raise RegistryError(f"Unknown model version: {version}")
+
+    # temp file + rename, so a crash never leaves a half written CURRENT behind
+    path = os.path.join(versions_dir(model_dir), CURRENT_FILENAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(version + "\n")
+    os.replace(tmp_path, path)
+
+
+def resolve(model_dir, version=None):
+    """
+    Returns (version, folder with the artifacts)
+        version given      -> that version (must exist)
+        registry in use    -> CURRENT (or the newest version if CURRENT is missing)
+        no registry        -> (None, model_dir), the old flat layout
+    """
+    available = list_versions(model_dir)
+
+    if version:
+        if version not in available:
+            raise RegistryError(f"Unknown model version: {version}")
+        return version, os.path.join(versions_dir(model_dir), version)
+
+    if not available:
+        return None, model_dir
+
+    version = current_version(model_dir)
+    if version not in available:
+        version = available[-1]
+    return version, os.path.join(versions_dir(model_dir), version)
+
+
+def bundle_paths(bundle_dir):
+    """artifact name -> absolute path inside one version folder (or the flat model/ folder)"""
+    paths = {key: os.path.join(bundle_dir, name) for key, name in ARTIFACTS.items()}
+    paths["distilbert_int8"] = os.path.join(bundle_dir, INT8_CACHE_FILENAME)
+    return paths
+
+
+def link_or_copy(src, dst):
+    # versions share unchanged files as hard links (no 250MB DistilBERT copy per LR retrain)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def publish(model_dir, source_dir, version=None, activate=False):
+    """
+    Copies the artifacts found in source_dir into model/versions/<version>/ and writes its manifest.
+    Artifacts missing from source_dir (e.g. only LR/SVM got retrained) are carried over from the
+    CURRENT version, so every version is complete on its own.
+    The version only shows up in list_versions() once the manifest exists (written last).
+    """
+    version = version or time.strftime("%Y%m%d-%H%M%S")
+    target = os.path.join(versions_dir(model_dir), version)
+    if os.path.exists(target):
+        raise RegistryError(f"Version {version} already exists")
+
+    found = [name for name in ARTIFACTS.values() if os.path.exists(os.path.join(source_dir, name))]
+    if not found:
+        raise RegistryError(f"No model artifacts found in {source_dir}")
+
+    base_version = current_version(model_dir)
+    base_dir = os.path.join(versions_dir(model_dir), base_version) if base_version else None
+
+    os.makedirs(target)
+    for name in ARTIFACTS.values():
+        if name in found:
+            src, copy_fn = os.path.join(source_dir, name), shutil.copy2
+        elif base_dir and os.path.exists(os.path.join(base_dir, name)):
+            src, copy_fn = os.path.join(base_dir, name), link_or_copy
+            print(f"➡️ ➡️ {name} not in {source_dir}, keeping the one from {base_version}")
+        else:
+            continue
+
+        if os.path.isdir(src):
+            shutil.copytree(src, os.path.join(target, name), copy_function=copy_fn)
+        else:
+            copy_fn(src, os.path.join(target, name))
+
+    write_json_atomic(os.path.join(target, MANIFEST_FILENAME), build_manifest(target, version))
+
+    if activate:
+        set_current(model_dir, version)
+    return version
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+
+def main():
+    default_model_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model")
+
+    parser = argparse.ArgumentParser(description="versioned model registry")
+    parser.add_argument("--model-dir", default=default_model_dir)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_publish = sub.add_parser("publish", help="copy trained artifacts into a new version")
+    p_publish.add_argument("--source", default=default_model_dir,
+                           help="folder with vectorizer_lr.pkl / lr_model.pkl / svm_model.pkl / distilbert_fin_sentiment")
+    p_publish.add_argument("--version", default=None, help="version name (default: timestamp)")
+    p_publish.add_argument("--activate", action="store_true", help="make it CURRENT (used on next boot)")
+
+    sub.add_parser("list", help="list versions")
+
+    p_verify = sub.add_parser("verify", help="re-hash a version against its manifest")
+    p_verify.add_argument("version")
+
+    p_activate = sub.add_parser("activate", help="make a version CURRENT")
+    p_activate.add_argument("version")
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == "publish":
+            version = publish(args.model_dir, args.source, args.version, args.activate)
+            print(f"✅ ✅ Published model version {version}" + (" (CURRENT)" if args.activate else ""))
+            print("➡️ ➡️ Hot reload a running service: curl -X POST localhost:5051/admin/reload "
+                  f"-H 'Content-Type: application/json' -d '{{\"version\": \"{version}\"}}'")
+
+        elif args.command == "list":
+            current = current_version(args.model_dir)
+            for version in list_versions(args.model_dir):
+                manifest = read_manifest(os.path.join(versions_dir(args.model_dir), version))
+                size_mb = sum(m["size"] for m in manifest["files"].values()) / 1024 / 1024
+                marker = "*" if version == current else " "
+                print(f"{marker} {version}  {manifest.get('created_at', '?')}  "
+                      f"{len(manifest['files'])} files  {size_mb:.1f} MB")
+
+        elif args.command == "verify":
+            _, version_dir = resolve(args.model_dir, args.version)
+            manifest = verify(version_dir)
+            print(f"✅ ✅ {args.version}: all {len(manifest['files'])} files match the manifest")
+
+        elif args.command == "activate":
+            set_current(args.model_dir, args.version)
+            print(f"✅ ✅ {args.version} is now CURRENT")
+
+    except RegistryError as e:
+        print("❌ ❌ ❌", e)
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
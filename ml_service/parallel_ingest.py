@@ -0,0 +1,96 @@
+# parallel_ingest.py
+"""
+Splitting a big CSV into byte ranges that worker processes can parse on their own (used by backtest.py).
+
+Cutting at a plain newline is NOT safe for the WSB dump: post bodies are quoted fields with
+newlines inside, so a cut there would start a range in the middle of a post.
+A newline only ends a record if it's outside quotes, and with standard CSV quoting
+(a field with quotes in it is quoted, inner quotes are doubled "") that means:
+an EVEN number of quote chars between the start of the data and that newline.
+Counting quote bytes is C speed (bytes.count), so the split is one sequential read of the file,
+way cheaper than parsing it.
+
+(files where a quote shows up in the middle of an unquoted field break that rule,
+backtest.py INGEST_WORKERS=1 reads the file the old single process way)
+"""
+
+import io
+import os
+
+import pandas as pd
+
+# block size for the quote counting scan
+SCAN_BLOCK_BYTES = 8 * 1024 * 1024
+
+
+def csv_byte_ranges(path, range_bytes):
+    """
+    Returns (header line bytes, [(start, end), ...]) with ranges of ~range_bytes that
+    start and end exactly on record boundaries and cover every data row once, in file order.
+    """
+    with open(path, "rb") as f:
+        header = f.readline()
+        data_start = f.tell()
+        size = os.fstat(f.fileno()).st_size
+
+        ranges = []
+        start = data_start
+        pos = data_start      # everything before pos has been quote counted
+        quotes = 0            # quote chars between data_start and pos
+
+        while start < size:
+            target = start + range_bytes
+            if target >= size:
+                ranges.append((start, size))
+                break
+
+            # count quotes up to the target offset
+            f.seek(pos)
+            while pos < target:
+                block = f.read(min(SCAN_BLOCK_BYTES, target - pos))
+                quotes += block.count(b'"')
+                pos += len(block)
+
+            # then walk forward to the first newline that is outside quotes
+            end = None
+            while end is None:
+                block = f.read(SCAN_BLOCK_BYTES)
+                if not block:
+                    end = size
+                    break
+                i = 0
+                while True:
+                    nl = block.find(b"\n", i)
+                    if nl == -1:
+                        quotes += block.count(b'"', i)
+                        pos += len(block)
+                        break
+                    quotes += block.count(b'"', i, nl)
+                    if quotes % 2 == 0:
+                        end = pos + nl + 1
+                        break
+                    i = nl + 1
+
+            pos = end
+            ranges.append((start, end))
+            start = end
+
+    return header, ranges
+
+
+def join_text(title, body):
+    # the text backtest.py always built: title + " " + body, stripped (title/body already fillna(""))
+    # (also what wsb_cache.py stores, so CSV and Parquet runs see the same text)
+    return (title.astype(str) + " " + body.astype(str)).str.strip()
+
+
+def read_csv_range(path, header, start, end, chunksize, **read_csv_kwargs):
+    """
+    Parses one byte range (with the header line put back in front) in chunks of `chunksize` rows.
+    Memory per call ~ the range bytes + one chunk DataFrame.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    yield from pd.read_csv(io.BytesIO(header + data), chunksize=chunksize, **read_csv_kwargs)
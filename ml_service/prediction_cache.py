@@ -0,0 +1,164 @@
+# prediction_cache.py
+"""
+In-process prediction cache for the ML service.
+
+WSB is full of reposted / copy pasted text ("TSLA to the moon"), and the backtest +
+the Node proxy send the same strings to /predict again and again.
+So before a text reaches the vectoriser or DistilBERT, I check here if I already scored it.
+
+Cache key = (model key, model version, normalised text)
+    - model version comes from artifact_fingerprint(), so retraining a model
+      automatically stops old cached predictions from being used
+    - normalised text = title + body with whitespace collapsed
+
+Eviction:
+    - LRU (least recently used entry goes first) once max_entries or max_bytes is hit
+    - optional TTL (ttl_seconds=0 means entries never expire)
+"""
+
+import hashlib
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    """
+    Collapsing all whitespace so "TSLA  to the\\nmoon" and "TSLA to the moon" share one entry.
+    (TF-IDF and the DistilBERT tokenizer both split on whitespace anyway, so predictions are the same)
+    """
+    text = " ".join(str(text).split())
+    return text if text else " "
+
+
+def artifact_fingerprint(*paths):
+    """
+    Short version string for a set of model files/folders.
+    I'm hashing file names + sizes + modification times (not the full contents),
+    because hashing the DistilBERT weights on every boot would be slow.
+    """
+    h = hashlib.sha1()
+
+    for path in paths:
+        if os.path.isdir(path):
+            files = []
+            for root, _, names in os.walk(path):
+                for name in names:
+                    files.append(os.path.join(root, name))
+            files.sort()
+        else:
+            files = [path]
+
+        for f in files:
+            st = os.stat(f)
+            rel = os.path.relpath(f, os.path.dirname(path))
+            h.update(f"{rel}|{st.st_size}|{st.st_mtime_ns}\n".encode("utf-8"))
+
+    return h.hexdigest()[:12]
+
+
+class PredictionCache:
+    """
+    Thread safe LRU + TTL cache for single text predictions.
+
+    max_entries: hard cap on number of cached texts
+    max_bytes: rough cap on memory used by cached texts + predictions
+    ttl_seconds: how long an entry stays valid (0 = forever)
+    """
+
+    # rough per entry overhead (tuple key, dict value, OrderedDict node), good enough for a memory cap
+    ENTRY_OVERHEAD_BYTES = 400
+
+    def __init__(self, max_entries=100_000, max_bytes=64 * 1024 * 1024, ttl_seconds=0):
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(1, int(max_bytes))
+        self.ttl_seconds = float(ttl_seconds or 0)
+
+        self._data = OrderedDict()   # key -> (value, stored_at, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _entry_size(self, key, value):
+        return sys.getsizeof(key[2]) + sys.getsizeof(value.get("label", "")) + self.ENTRY_OVERHEAD_BYTES
+
+    def get_many(self, model_key, version, texts):
+        """
+        Looks up every text, returns a list with the cached prediction or None for a miss.
+        """
+        now = time.monotonic()
+        results = []
+
+        with self._lock:
+            for text in texts:
+                key = (model_key, version, text)
+                entry = self._data.get(key)
+
+                if entry is not None and self.ttl_seconds and now - entry[1] > self.ttl_seconds:
+                    # expired, dropping it and treating it like a miss
+                    self._remove(key)
+                    self.expirations += 1
+                    entry = None
+
+                if entry is None:
+                    self.misses += 1
+                    results.append(None)
+                else:
+                    self.hits += 1
+                    self._data.move_to_end(key)   # most recently used goes to the end
+                    results.append(dict(entry[0]))
+
+        return results
+
+    def put_many(self, model_key, version, texts, predictions):
+        now = time.monotonic()
+
+        with self._lock:
+            for text, pred in zip(texts, predictions):
+                key = (model_key, version, text)
+                if key in self._data:
+                    self._remove(key)
+
+                size = self._entry_size(key, pred)
+                if size > self.max_bytes:
+                    continue  # one giant text should not wipe the whole cache
+
+                self._data[key] = (dict(pred), now, size)
+                self._bytes += size
+
+            # evicting least recently used entries until we are back under both limits
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "approx_bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
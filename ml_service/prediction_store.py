@@ -0,0 +1,110 @@
+# prediction_store.py
+"""
+Persistent on-disk prediction store (SQLite), shared by app.py and backtest.py.
+
+The in-process cache (prediction_cache.py) is gone after a restart and every gunicorn
+worker has its own copy. Re-running backtest.py for a new window or ticker list was
+rescoring hundreds of thousands of posts I had already scored.
+So every prediction also gets written here, and scoring is paid once per
+unique text per model version, across restarts, workers and backtest runs.
+
+Key = (text hash, model key, model version)
+    - text hash = blake2b of the normalised text (see normalize_text)
+    - model version = artifact fingerprint of the model files, same as the cache uses
+
+Why SQLite: its in the standard library, WAL mode lets many processes read while one writes,
+and a (hash, model, version) primary key lookup is fast enough for batches of thousands.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+
+
+def text_hash(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class PredictionStore:
+    # sqlite limits how many "?" placeholders one query can have, so I query in chunks
+    QUERY_CHUNK = 500
+
+    def __init__(self, path, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS predictions (
+                text_hash     TEXT NOT NULL,
+                model         TEXT NOT NULL,
+                model_version TEXT NOT NULL,
+                label         TEXT NOT NULL,
+                score         REAL NOT NULL,
+                PRIMARY KEY (text_hash, model, model_version)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.commit()
+
+    def _conn(self):
+        # one connection per thread AND per process (a forked worker must not reuse the parent's)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute("PRAGMA journal_mode=WAL")      # readers don't block the writer
+            conn.execute("PRAGMA synchronous=NORMAL")    # safe with WAL and a lot faster
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get_many(self, model_key, version, texts):
+        """
+        Returns a list (same order as texts) with the stored prediction or None.
+        texts should already be normalised.
+        """
+        hashes = [text_hash(t) for t in texts]
+        found = {}
+
+        conn = self._conn()
+        unique = list(dict.fromkeys(hashes))
+        for i in range(0, len(unique), self.QUERY_CHUNK):
+            chunk = unique[i:i + self.QUERY_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT text_hash, label, score FROM predictions "
+                f"WHERE model = ? AND model_version = ? AND text_hash IN ({placeholders})",
+                [model_key, version] + chunk,
+            )
+            for h, label, score in rows:
+                found[h] = {"label": label, "score": score}
+
+        return [dict(found[h]) if h in found else None for h in hashes]
+
+    def put_many(self, model_key, version, texts, predictions):
+        rows = [
+            (text_hash(t), model_key, version, str(p["label"]), float(p["score"]))
+            for t, p in zip(texts, predictions)
+        ]
+        if not rows:
+            return
+
+        conn = self._conn()
+        with conn:  # one transaction for the whole batch
+            conn.executemany(
+                "INSERT OR REPLACE INTO predictions (text_hash, model, model_version, label, score) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def count(self, model_key=None):
+        conn = self._conn()
+        if model_key is None:
+            return conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+        return conn.execute("SELECT COUNT(*) FROM predictions WHERE model = ?", (model_key,)).fetchone()[0]
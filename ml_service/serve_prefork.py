@@ -0,0 +1,212 @@
+# serve_prefork.py
+"""
+Production serving mode: load the models ONCE, then fork workers that share them.
+
+Before this I ran several copies of app.py to use all my cores, and every process
+unpickled its own vectoriser/LR/SVM and loaded its own DistilBERT, so RAM grew
+linearly with the number of workers.
+
+How this works:
+1) the parent imports app.py with DistilBERT loaded synchronously (threads don't survive a fork)
+   and the LR/SVM numpy arrays memory-mapped from the .pkl files (LINEAR_MODELS_MMAP=1)
+2) gc.freeze() moves everything loaded so far out of the garbage collector's view,
+   so the GC doesn't write to those pages in the workers (that would un-share them)
+3) the parent opens the listening socket and forks N workers, every worker serves on the same socket
+   and all of them share the model pages copy-on-write
+4) every worker limits torch to cores / workers threads so they don't fight over cores
+5) the parent restarts dead workers and reports resident memory (RSS + PSS) per worker
+
+Update: every worker serves with waitress (pip install waitress, in requirements.txt), a production
+WSGI server (thread pool, connection limits, request buffering) instead of werkzeug's development server.
+Without waitress the workers fall back to werkzeug with a warning, that's ok for benchmarks on a laptop,
+NOT for production. (gunicorn --preload gives the same load once + fork setup too, this script is
+here for the gc.freeze / mmap / torch thread tuning and the PSS report)
+
+PSS ("proportional set size") splits shared pages between the processes sharing them,
+so the sum of PSS is the real memory cost, while RSS counts shared pages in every worker.
+
+Linux only (fork + /proc), run from ml_service/:
+    python serve_prefork.py --workers 4 --port 5051
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+DEFAULT_PORT = int(os.environ.get("FLASK_PORT", 5051))
+DEFAULT_WORKERS = int(os.environ.get("PREFORK_WORKERS", os.cpu_count() or 1))
+REPORT_INTERVAL_S = float(os.environ.get("PREFORK_REPORT_INTERVAL_S", 60))
+# request threads per worker (waitress)
+WORKER_THREADS = int(os.environ.get("PREFORK_WORKER_THREADS", 8))
+
+
+def read_memory_kb(pid):
+    """
+    Returns {"rss_kb": ..., "pss_kb": ...} for a process (pss is None if the kernel can't tell us).
+    """
+    mem = {"rss_kb": None, "pss_kb": None}
+    try:
+        # smaps_rollup has Rss + Pss in one small file (Linux 4.14+)
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Rss:"):
+                    mem["rss_kb"] = int(line.split()[1])
+                elif line.startswith("Pss:"):
+                    mem["pss_kb"] = int(line.split()[1])
+    except OSError:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        mem["rss_kb"] = int(line.split()[1])
+        except OSError:
+            pass
+    return mem
+
+
+def report_memory(workers):
+    total_pss = 0
+    print("📊 📊 Worker memory:")
+    for pid in sorted(workers.values()):
+        mem = read_memory_kb(pid)
+        rss = f"{mem['rss_kb'] / 1024:.1f} MB" if mem["rss_kb"] is not None else "?"
+        pss = f"{mem['pss_kb'] / 1024:.1f} MB" if mem["pss_kb"] is not None else "?"
+        total_pss += mem["pss_kb"] or 0
+        print(f"   worker {pid}: RSS {rss} | PSS {pss}")
+
+    parent = read_memory_kb(os.getpid())
+    total_pss += parent["pss_kb"] or 0
+    print(f"   total PSS (parent + workers): {total_pss / 1024:.1f} MB")
+    sys.stdout.flush()
+
+
+def run_worker(app_module, sock, torch_threads):
+    # per worker torch thread count, so N workers x threads ~= number of cores
+    if app_module.distilbert_model is not None:
+        import torch
+        torch.set_num_threads(torch_threads)
+        torch.set_num_interop_threads(1)
+
+    try:
+        import waitress
+    except ImportError:
+        waitress = None
+
+    try:
+        if waitress is not None:
+            print(f"🚀 Worker {os.getpid()} serving with waitress "
+                  f"({WORKER_THREADS} threads, torch threads: {torch_threads})")
+            sys.stdout.flush()
+            # the already listening socket from the parent, every worker accepts on it
+            waitress.serve(app_module.app, sockets=[sock], threads=WORKER_THREADS, ident="ml-service")
+        else:
+            from werkzeug.serving import make_server
+
+            server = make_server(
+                sock.getsockname()[0], sock.getsockname()[1], app_module.app,
+                threaded=True, fd=sock.fileno(),
+            )
+            print(f"⚠️ ⚠️ Worker {os.getpid()} serving with werkzeug's DEVELOPMENT server "
+                  f"(pip install waitress for production) (torch threads: {torch_threads})")
+            sys.stdout.flush()
+            server.serve_forever()
+    finally:
+        os._exit(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="pre-fork multi-worker ML service")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--torch-threads", type=int, default=None,
+                        help="torch threads per worker (default: cores / workers)")
+    parser.add_argument("--report-interval", type=float, default=REPORT_INTERVAL_S)
+    args = parser.parse_args()
+
+    n_workers = max(1, args.workers)
+    torch_threads = args.torch_threads or max(1, (os.cpu_count() or 1) // n_workers)
+
+    # models must be fully loaded in the parent BEFORE forking
+    os.environ.setdefault("DISTILBERT_LOAD", "sync")
+    os.environ.setdefault("LINEAR_MODELS_MMAP", "1")
+    os.environ["FLASK_DEBUG"] = "0"
+
+    import app as app_module
+
+    # nothing loaded so far should be touched by the GC in the workers (keeps the pages shared)
+    gc.collect()
+    gc.freeze()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(1024)
+    sock.set_inheritable(True)
+
+    print(f"✅ ✅ Models loaded once in parent {os.getpid()}, forking {n_workers} workers "
+          f"on {args.host}:{args.port}")
+    sys.stdout.flush()
+
+    workers = {}   # slot -> pid
+
+    def spawn(slot):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            run_worker(app_module, sock, torch_threads)
+        workers[slot] = pid
+
+    for slot in range(n_workers):
+        spawn(slot)
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    next_report = time.monotonic() + min(5.0, args.report_interval)
+
+    while not stopping:
+        # restarting any worker that died (crash, OOM kill, ...)
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            pid = 0
+
+        if pid:
+            for slot, wpid in list(workers.items()):
+                if wpid == pid:
+                    print(f"⚠️ ⚠️ Worker {pid} exited (status {status}), restarting")
+                    spawn(slot)
+
+        if time.monotonic() >= next_report:
+            report_memory(workers)
+            next_report = time.monotonic() + args.report_interval
+
+        time.sleep(0.5)
+
+    print("🛑 Stopping workers...")
+    for pid in workers.values():
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    for pid in workers.values():
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+# the ml_service scripts are run from ml_service/ (relative data/, model/ and ticker_aliases.txt paths),
+# so the tests import them from there too
+import os
+import sys
+
+ML_SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ML_SERVICE_DIR)
+os.chdir(ML_SERVICE_DIR)
+
+# importing app.py loads the models: no DistilBERT + no on-disk store for the tests
+os.environ.setdefault("DISTILBERT_LOAD", "off")
+os.environ.setdefault("PREDICTION_STORE", "0")
@@ -0,0 +1,102 @@
+# admission control: full queue -> Overloaded (429), deadline passed while queued -> DeadlineExceeded (504)
+import threading
+import time
+
+import pytest
+
+import app
+from admission import AdmissionController, DeadlineExceeded, Overloaded
+
+
+def hold_slot(controller):
+    # keeps one slot busy until release is set
+    entered, release = threading.Event(), threading.Event()
+
+    def run():
+        with controller.admit():
+            entered.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    assert entered.wait(5)
+    return release, thread
+
+
+def test_full_queue_is_shed():
+    controller = AdmissionController("lr", max_concurrency=1, max_queue=0)
+    release, thread = hold_slot(controller)
+
+    with pytest.raises(Overloaded) as err:
+        with controller.admit():
+            pass
+    release.set()
+    thread.join(5)
+
+    assert err.value.model_key == "lr" and err.value.retry_after >= 1
+    assert controller.stats()["shed"] == 1
+
+
+def test_deadline_passes_while_queued():
+    controller = AdmissionController("lr", max_concurrency=1, max_queue=1)
+    release, thread = hold_slot(controller)
+
+    t0 = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        with controller.admit(deadline=time.monotonic() + 0.1):
+            pass
+    release.set()
+    thread.join(5)
+
+    assert time.monotonic() - t0 < 1
+    assert controller.stats()["expired"] == 1 and controller.stats()["waiting"] == 0
+
+
+def test_no_shed_waits_for_a_slot():
+    controller = AdmissionController("lr", max_concurrency=1, max_queue=0)
+    release, thread = hold_slot(controller)
+    threading.Timer(0.1, release.set).start()
+
+    with controller.admit(shed=False):
+        assert controller.stats()["active"] == 1
+    thread.join(5)
+
+    assert controller.stats()["admitted"] == 2 and controller.stats()["shed"] == 0
+
+
+@pytest.fixture
+def busy_lr(monkeypatch):
+    # lr with one slot, held by another request, and no cache in front of it
+    monkeypatch.setattr(app, "PREDICTION_CACHE_ENABLED", False)
+
+    held = []
+
+    def occupy(max_queue):
+        controller = AdmissionController("lr", max_concurrency=1, max_queue=max_queue)
+        monkeypatch.setitem(app.admission_controllers, "lr", controller)
+        held.append(hold_slot(controller))
+
+    yield occupy
+    for release, thread in held:
+        release.set()
+        thread.join(5)
+
+
+def test_predict_answers_429_with_retry_after(busy_lr):
+    busy_lr(0)
+
+    resp = app.app.test_client().post("/predict", json={"model": "lr", "posts": [{"title": "tsla up"}]})
+
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 1
+    assert resp.get_json()["model"] == "lr"
+
+
+def test_predict_answers_504_after_its_deadline(busy_lr):
+    busy_lr(1)
+
+    resp = app.app.test_client().post(
+        "/predict", json={"model": "lr", "posts": [{"title": "tsla up"}], "timeout_ms": 100})
+
+    assert resp.status_code == 504
+    assert resp.get_json() == {"error": "Request deadline exceeded before inference"}
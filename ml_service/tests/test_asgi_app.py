@@ -0,0 +1,39 @@
+# the built-in asyncio server must answer every request, even when a handler blows up
+import asyncio
+import json
+
+import asgi_app
+
+
+async def raw_request(body, path="/predict"):
+    server = await asyncio.start_server(asgi_app.handle_connection, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"POST {path} HTTP/1.1\r\nhost: test\r\ncontent-type: application/json\r\n"
+                     f"content-length: {len(body)}\r\nconnection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), 10)
+        writer.close()
+
+    head, _, payload = response.partition(b"\r\n\r\n")
+    return int(head.split(b" ")[1]), json.loads(payload)
+
+
+def test_body_that_is_not_an_object_gets_a_400():
+    status, payload = asyncio.run(raw_request(b"[1, 2]"))
+
+    assert status == 400
+    assert payload == {"error": "JSON body must be an object"}
+
+
+def test_handler_exception_gets_a_500(monkeypatch):
+    async def broken(headers, body, ctx):
+        raise RuntimeError("boom")
+
+    monkeypatch.setitem(asgi_app.ROUTES, ("POST", "/broken"), broken)
+
+    status, payload = asyncio.run(raw_request(b"{}", path="/broken"))
+
+    assert status == 500
+    assert payload == {"error": "Internal server error", "details": "boom"}
@@ -0,0 +1,123 @@
+# daily signals + T+1 join vs the loops they replaced (per group .mean(), then iterrows with get_loc/.loc)
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import daily_signals, group_means, join_next_day
+
+MODELS = ["lr", "svm"]
+
+
+def posts_frame(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    days = pd.date_range("2022-01-01", "2022-02-15").strftime("%Y-%m-%d")
+    df = pd.DataFrame({
+        "date": rng.choice(days, n),
+        "ticker": rng.choice(["TSLA", "AAPL", "AMD", "GME"], n),
+    })
+    for m in MODELS:
+        df[f"{m}_dir"] = rng.integers(-1, 2, n)
+        df[f"{m}_score"] = rng.random(n)
+    return df
+
+
+def close_frame(seed=0):
+    # trading days only (no weekends, one holiday), GME has no prices, a couple of NaN closes
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range("2022-01-01", "2022-02-10").drop(pd.Timestamp("2022-01-17"))
+    close = pd.DataFrame(rng.random((len(days), 3)) * 100 + 50, index=days, columns=["AAPL", "AMD", "TSLA"])
+    close.iloc[3, 0] = np.nan
+    close.iloc[10, 2] = np.nan
+    close.iloc[11, 1] = close.iloc[12, 1]   # a flat day
+    return close
+
+
+def old_daily_signals(df, models):
+    daily_rows = []
+    for (day, ticker), g in df.groupby(["date", "ticker"]):
+        row = {"date": day, "ticker": ticker, "n_posts": len(g)}
+        for model_name in models:
+            mean_dir = g[f"{model_name}_dir"].mean()
+            row[f"{model_name}_daily_signal"] = 1 if mean_dir > 0 else -1 if mean_dir < 0 else 0
+            row[f"{model_name}_mean_score"] = g[f"{model_name}_score"].mean()
+        daily_rows.append(row)
+
+    daily_df = pd.DataFrame(daily_rows)
+    daily_df["date"] = pd.to_datetime(daily_df["date"])
+    return daily_df
+
+
+def old_join_next_day(daily_df, close, models):
+    results = []
+    for _, r in daily_df.iterrows():
+        day, ticker = r["date"], r["ticker"]
+        if ticker not in close.columns or day not in close.index:
+            continue
+        idx = close.index.get_loc(day)
+        if idx + 1 >= len(close.index):
+            continue
+        next_day = close.index[idx + 1]
+
+        c0 = float(close.loc[day, ticker])
+        c1 = float(close.loc[next_day, ticker])
+        real_dir = 1 if c1 > c0 else -1 if c1 < c0 else 0
+
+        out = {
+            "date": day.date().isoformat(),
+            "next_trading_day": next_day.date().isoformat(),
+            "ticker": ticker,
+            "close_t": c0,
+            "close_t1": c1,
+            "real_dir": real_dir,
+            "n_posts": int(r["n_posts"]),
+        }
+        for model_name in models:
+            pred_dir = int(r[f"{model_name}_daily_signal"])
+            out[f"{model_name}_pred_dir"] = pred_dir
+            out[f"{model_name}_correct"] = 1 if pred_dir == real_dir else 0
+            out[f"{model_name}_mean_score"] = float(r[f"{model_name}_mean_score"])
+        results.append(out)
+    return pd.DataFrame(results)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_daily_signals_match_the_old_loop_bit_for_bit(seed):
+    df = posts_frame(seed=seed)
+
+    new, old = daily_signals(df, MODELS), old_daily_signals(df, MODELS)
+
+    # check_exact: the mean scores have to be the same bits, not just close
+    pd.testing.assert_frame_equal(new, old, check_exact=True, check_dtype=False)
+    assert new["lr_mean_score"].to_numpy().tobytes() == old["lr_mean_score"].to_numpy().tobytes()
+
+
+def test_group_means_uses_the_pairwise_sum():
+    # long enough groups that the pairwise sum, a running sum and groupby().mean() disagree in the last bit
+    rng = np.random.default_rng(3)
+    counts = np.array([1, 7, 300, 300, 1000])
+    codes = rng.permutation(np.repeat(np.arange(len(counts)), counts))
+    values = rng.random(len(codes)) * 1e6
+
+    means = group_means([values], codes, counts)[0]
+
+    expected = [pd.Series(values[codes == g]).mean() for g in range(len(counts))]
+    assert means.tolist() == expected
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_join_next_day_matches_the_old_loop(seed):
+    daily_df = daily_signals(posts_frame(seed=seed), MODELS)
+    close = close_frame(seed)
+
+    new, old = join_next_day(daily_df, close, MODELS), old_join_next_day(daily_df, close, MODELS)
+
+    assert len(new) > 0 and set(new["ticker"]) == {"AAPL", "AMD", "TSLA"}
+    pd.testing.assert_frame_equal(new, old, check_exact=True, check_dtype=False)
+
+
+def test_join_next_day_skips_the_last_trading_day():
+    close = close_frame()
+    last = close.index[-1].date().isoformat()
+    daily_df = daily_signals(posts_frame().assign(date=last), MODELS)
+
+    assert join_next_day(daily_df, close, MODELS).empty
@@ -0,0 +1,99 @@
+# micro batcher: concurrent requests share one predict_fn call, every caller gets back its own slice
+import threading
+import time
+
+import pytest
+
+from admission import DeadlineExceeded
+from batching import MicroBatcher
+
+
+class RecordingModel:
+    # "predicts" the post itself, so every caller can check it got its own posts back in order
+    def __init__(self, delay=0.0):
+        self.batches = []
+        self.delay = delay
+
+    def __call__(self, posts):
+        time.sleep(self.delay)
+        self.batches.append(list(posts))
+        return [{"label": p, "score": 1.0} for p in posts]
+
+
+def submit_all(batcher, requests):
+    results = {}
+    threads = [
+        threading.Thread(target=lambda name=name, posts=posts: results.update({name: batcher.submit(posts)}))
+        for name, posts in requests.items()
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    return results
+
+
+def test_concurrent_requests_get_their_own_slices():
+    model = RecordingModel()
+    batcher = MicroBatcher(model, max_batch_size=32, max_wait_ms=200)
+    requests = {f"r{i}": [f"r{i}-{j}" for j in range(i + 1)] for i in range(4)}
+
+    results = submit_all(batcher, requests)
+
+    for name, posts in requests.items():
+        assert [p["label"] for p in results[name]] == posts
+    # all four fit in one batch and arrived within the wait window
+    assert len(model.batches) == 1
+    assert sorted(model.batches[0]) == sorted(p for posts in requests.values() for p in posts)
+
+
+def test_batches_never_exceed_max_batch_size_or_split_a_request():
+    model = RecordingModel()
+    batcher = MicroBatcher(model, max_batch_size=4, max_wait_ms=100)
+    requests = {f"r{i}": [f"r{i}-{j}" for j in range(3)] for i in range(3)}
+
+    results = submit_all(batcher, requests)
+
+    for name, posts in requests.items():
+        assert [p["label"] for p in results[name]] == posts
+    assert all(len(batch) <= 4 for batch in model.batches)
+    # 3 posts per request + max 4 per batch -> one request per batch
+    assert len(model.batches) == 3
+
+
+def test_empty_submit_never_reaches_the_model():
+    model = RecordingModel()
+    assert MicroBatcher(model).submit([]) == []
+    assert model.batches == []
+
+
+def test_expired_requests_are_dropped_before_the_forward_pass():
+    # the first batch keeps the worker busy, the second request expires while it waits
+    model = RecordingModel(delay=0.3)
+    batcher = MicroBatcher(model, max_batch_size=1, max_wait_ms=0)
+
+    first = threading.Thread(target=batcher.submit, args=(["slow"],))
+    first.start()
+    time.sleep(0.05)
+
+    with pytest.raises(DeadlineExceeded):
+        batcher.submit(["late"], deadline=time.monotonic() + 0.1)
+    first.join(5)
+
+    assert batcher.submit(["fresh"], deadline=time.monotonic() + 5)[0]["label"] == "fresh"
+    assert ["late"] not in model.batches
+
+
+def test_a_failing_batch_fails_its_callers_only():
+    calls = []
+
+    def flaky(posts):
+        calls.append(posts)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return [{"label": "ok", "score": 1.0} for _ in posts]
+
+    batcher = MicroBatcher(flaky, max_wait_ms=0)
+    with pytest.raises(RuntimeError):
+        batcher.submit(["a"])
+    assert batcher.submit(["b"]) == [{"label": "ok", "score": 1.0}]
@@ -0,0 +1,85 @@
+# a hot reload publishes a new ModelSet, requests keep the one they started on and nobody waits for anybody
+import threading
+import time
+
+import app
+from batching import MicroBatcher
+
+
+class SlowVectorizer:
+    # the old version's vectorizer, blocks until the test lets it go
+    def __init__(self, vectorizer, release):
+        self.vectorizer = vectorizer
+        self.entered = threading.Event()
+        self.release = release
+
+    def transform(self, texts):
+        self.entered.set()
+        self.release.wait(5)
+        return self.vectorizer.transform(texts)
+
+
+def test_reload_does_not_wait_for_in_flight_requests(monkeypatch):
+    monkeypatch.setattr(app, "PREDICTION_CACHE_ENABLED", False)
+    # (one lr slot on a 1 cpu box would make the second request queue behind the first one)
+    monkeypatch.setattr(app, "ADMISSION_CONTROL", False)
+    monkeypatch.setattr(app, "active_models", app.active_models)
+    current = app.active_models
+
+    release = threading.Event()
+    slow = SlowVectorizer(current.vectorizer, release)
+    old = app.publish_models(versions={"lr": "old"}, vectorizer=slow)
+
+    result = {}
+    in_flight = threading.Thread(target=lambda: result.update(
+        old=app.predict_versioned("lr", [{"title": "tsla calls printing", "body": ""}], shed=False)))
+    in_flight.start()
+    assert slow.entered.wait(5)
+
+    # the swap and a request on the new version both finish while the old request is still running
+    t0 = time.perf_counter()
+    new = app.publish_models(versions={"lr": "new"}, vectorizer=current.vectorizer)
+    posts = [{"title": "amd puts", "body": ""}]
+    predictions, version = app.predict_versioned("lr", posts, deadline=time.monotonic() + 1)
+    assert time.perf_counter() - t0 < 1
+    assert version == "new" and len(predictions) == 1
+    assert in_flight.is_alive()
+
+    release.set()
+    in_flight.join(5)
+    assert result["old"][1] == "old"
+    assert app.active_models is new and old.versions["lr"] == "old"
+
+
+def test_published_sets_are_copies(monkeypatch):
+    monkeypatch.setattr(app, "active_models", app.active_models)
+    before = app.active_models
+
+    after = app.publish_models(versions={"lr": "v2", "svm": None})
+
+    assert after.versions["lr"] == "v2" and "svm" not in after.versions
+    assert before.versions["lr"] != "v2" and "svm" in before.versions
+    assert after.models is not before.models
+
+
+def test_batcher_never_mixes_contexts():
+    calls = []
+
+    def predict(posts, context=None):
+        calls.append((context, list(posts)))
+        return [{"label": context, "score": 1.0} for _ in posts]
+
+    batcher = MicroBatcher(predict, max_batch_size=32, max_wait_ms=50)
+    results = {}
+    threads = [
+        threading.Thread(target=lambda c=c: results.update({c: batcher.submit([c] * 2, context=c)}))
+        for c in ["old", "new", "old"]
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+
+    assert all(len({p for p in posts}) == 1 and posts[0] == context for context, posts in calls)
+    assert {p["label"] for p in results["old"]} == {"old"}
+    assert {p["label"] for p in results["new"]} == {"new"}
@@ -0,0 +1,104 @@
+# stacked LR/SVM scorer vs scikit-learn's own predict_proba / decision_function
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from sklearn.linear_model import LogisticRegression
+from sklearn.svm import LinearSVC
+
+import app
+from linear_scoring import StackedLinearScorer
+
+
+def sparse_data(n_classes, n=300, n_features=50, seed=0):
+    rng = np.random.default_rng(seed)
+    X = sp.random(n, n_features, density=0.2, format="csr", random_state=seed)
+    y = rng.integers(0, n_classes, n)
+    labels = np.array(["negative", "neutral", "positive"][:n_classes])
+    return X, labels[y]
+
+
+def fitted_models():
+    X, y3 = sparse_data(3)
+    _, y2 = sparse_data(2, seed=1)
+    return X, {
+        "lr": LogisticRegression(max_iter=500).fit(X, y3),
+        "lr_binary": LogisticRegression(max_iter=500).fit(X, y2),
+        "svm": LinearSVC().fit(X, y3),
+    }
+
+
+def test_probabilities_match_sklearn():
+    X, models = fitted_models()
+    scorer = StackedLinearScorer(models)
+    margins = scorer.margins(X)
+
+    for key in ["lr", "lr_binary"]:
+        assert scorer.kinds[key] in ("softmax", "binary")
+        np.testing.assert_allclose(scorer.probabilities(key, margins), models[key].predict_proba(X), rtol=1e-12)
+
+    svm_scores = 1.0 / (1.0 + np.exp(-models["svm"].decision_function(X)))
+    np.testing.assert_allclose(scorer.probabilities("svm", margins), svm_scores, rtol=1e-12)
+
+
+def test_labels_and_scores_match_the_old_loop():
+    X, models = fitted_models()
+    scorer = StackedLinearScorer(models)
+    margins = scorer.margins(X)
+
+    for key, model in models.items():
+        probas = model.predict_proba(X) if hasattr(model, "predict_proba") else \
+            1.0 / (1.0 + np.exp(-model.decision_function(X)))
+        old = [(model.classes_[row.argmax()], float(row.max())) for row in probas]
+
+        labels, scores = scorer.label_score_columns(key, margins)
+        assert labels.tolist() == [label for label, _ in old]
+        np.testing.assert_allclose(scores, [score for _, score in old], rtol=1e-12)
+
+
+def test_rows_pick_a_subset():
+    X, models = fitted_models()
+    scorer = StackedLinearScorer(models)
+    rows = [5, 0, 17]
+
+    labels, scores = scorer.label_score_columns("lr", scorer.margins(X), rows)
+    full_labels, full_scores = scorer.label_score_columns("lr", scorer.margins(X[rows]))
+
+    assert labels.tolist() == full_labels.tolist()
+    np.testing.assert_array_equal(scores, full_scores)
+
+
+def test_unsupported_models_are_skipped():
+    X, y = sparse_data(2)
+    scorer = StackedLinearScorer({"svm_binary": LinearSVC().fit(X, y), "not_linear": object()})
+
+    assert not scorer.supports("svm_binary") and not scorer.supports("not_linear")
+    assert scorer.W is None
+
+
+@pytest.mark.parametrize("model_key", ["lr", "svm"])
+def test_service_models_match_sklearn(model_key):
+    model_set = app.active_models
+    model = model_set.models[model_key]
+    X = model_set.vectorizer.transform(["tsla to the moon", "amd puts printing", "flat day", "meh"])
+
+    predictions = app.score_with_model(model_key, X, model_set)
+
+    probas = model.predict_proba(X) if hasattr(model, "predict_proba") else \
+        1.0 / (1.0 + np.exp(-model.decision_function(X)))
+    assert [p["label"] for p in predictions] == [model.classes_[row.argmax()] for row in probas]
+    np.testing.assert_allclose([p["score"] for p in predictions], probas.max(axis=1), rtol=1e-12)
+
+
+def test_single_model_margins_match_the_full_product():
+    X, models = fitted_models()
+    scorer = StackedLinearScorer(models)
+    full = scorer.margins(X)
+
+    for key in models:
+        margins = scorer.margins(X, key)
+
+        # the same columns, bit for bit (every column of the product is its own dot products)
+        np.testing.assert_array_equal(margins, full[:, scorer.slices[key]])
+        np.testing.assert_array_equal(scorer.probabilities(key, margins), scorer.probabilities(key, full))
+        assert [a.tolist() for a in scorer.label_score_columns(key, margins)] == \
+            [a.tolist() for a in scorer.label_score_columns(key, full)]
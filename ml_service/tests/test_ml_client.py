@@ -0,0 +1,42 @@
+# the shared client base: abstract predict_batch/serving_info, batches come back in text order
+import pytest
+
+from ml_client import MLServiceError, _BatchingClient
+
+
+class EchoClient(_BatchingClient):
+    def predict_batch(self, model_name, texts):
+        return [{"label": text, "score": 1.0} for text in texts]
+
+    def serving_info(self):
+        return {"model_versions": {"echo": "v1"}, "served_models": {"echo": "echo"}, "prediction_store": None}
+
+
+def test_subclass_without_the_abstract_methods_fails_at_construction():
+    class NoServingInfo(_BatchingClient):
+        def predict_batch(self, model_name, texts):
+            return []
+
+    with pytest.raises(TypeError):
+        _BatchingClient()
+    with pytest.raises(TypeError):
+        NoServingInfo()
+
+
+@pytest.mark.parametrize("max_in_flight", [1, 4])
+def test_predictions_come_back_in_text_order(max_in_flight):
+    texts = [f"t{i}" for i in range(23)]
+
+    client = EchoClient(max_in_flight=max_in_flight)
+
+    assert [p["label"] for p in client.predict("echo", texts, batch_size=5)] == texts
+    assert client.model_versions() == {"echo": "v1"}
+
+
+def test_wrong_prediction_count_is_an_error():
+    class ShortClient(EchoClient):
+        def predict_batch(self, model_name, texts):
+            return super().predict_batch(model_name, texts)[:-1]
+
+    with pytest.raises(MLServiceError):
+        ShortClient().predict("echo", ["a", "b"])
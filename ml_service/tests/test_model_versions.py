@@ -0,0 +1,47 @@
+# "distilbert" served by the int8 copy (DISTILBERT_INT8=default) must never be stored under the fp32 version
+import app
+import backtest
+from prediction_store import PredictionStore
+
+
+def alias_int8(monkeypatch):
+    monkeypatch.setattr(app, "DISTILBERT_INT8", "default")
+    versions = dict(app.active_models.versions, distilbert="fp32v", distilbert_int8="fp32v-int8")
+    monkeypatch.setattr(app, "active_models",
+                        app.active_models.replace(distilbert_int8_model=object(), versions=versions))
+
+
+def test_served_versions_follow_the_alias(monkeypatch):
+    alias_int8(monkeypatch)
+
+    versions = app.health_payload()["model_versions"]
+    assert versions["distilbert"] == "fp32v-int8"
+    assert versions["distilbert_int8"] == "fp32v-int8"
+
+
+def test_served_versions_without_alias(monkeypatch):
+    alias_int8(monkeypatch)
+    monkeypatch.setattr(app, "DISTILBERT_INT8", "1")
+
+    assert app.served_model_versions()["distilbert"] == "fp32v"
+
+
+class FakeClient:
+    # answers like the service does with the alias on: int8 version in every response
+    def predict(self, model_name, texts, batch_size=64):
+        return [{"label": "positive", "score": 0.5} for _ in texts]
+
+    def served_version(self, model_name):
+        return "fp32v-int8"
+
+
+def test_backtest_stores_under_the_served_version(tmp_path, monkeypatch):
+    monkeypatch.setattr(backtest, "CHECKPOINT_EVERY", 2)
+    store = PredictionStore(str(tmp_path / "store.sqlite"))
+    texts = ["tsla up", "tsla down", "amd flat"]
+
+    # version looked up before scoring is the stale fp32 one
+    backtest.score_with_checkpoints(FakeClient(), store, "distilbert", "fp32v", texts)
+
+    assert store.get_many("distilbert", "fp32v", texts) == [None, None, None]
+    assert all(p is not None for p in store.get_many("distilbert", "fp32v-int8", texts))
@@ -0,0 +1,61 @@
+# byte ranges of a CSV with quoted newlines: every range starts on a record, together they parse like the whole file
+import pandas as pd
+import pytest
+
+import parallel_ingest
+from parallel_ingest import csv_byte_ranges, read_csv_range
+
+ROWS = pd.DataFrame({
+    "title": ["TSLA to the moon", "multi\nline \"title\"", "plain", "", "commas, inside", "last one"],
+    "body": ["short", "body with\n\nblank lines\nand \"\"quotes\"\"", "x\ny", "only body", "a\n\"b\"\nc", ""],
+    "created_utc": [1640995200, 1640995300, 1640995400, 1640995500, 1640995600, 1640995700],
+})
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "posts.csv"
+    ROWS.to_csv(path, index=False)
+    return str(path)
+
+
+def read_ranges(path, range_bytes):
+    header, ranges = csv_byte_ranges(path, range_bytes)
+    chunks = [chunk for start, end in ranges
+              for chunk in read_csv_range(path, header, start, end, chunksize=2, keep_default_na=False)]
+    return header, ranges, pd.concat(chunks, ignore_index=True)
+
+
+def test_ranges_cover_the_file_and_split_on_records(csv_path):
+    whole = pd.read_csv(csv_path, keep_default_na=False)
+    size = len(open(csv_path, "rb").read())
+
+    # every range size from 1 byte to the whole file, so cuts land inside every quoted newline
+    for range_bytes in range(1, size + 1):
+        header, ranges, parsed = read_ranges(csv_path, range_bytes)
+
+        assert ranges[0][0] == len(header) and ranges[-1][1] == size
+        assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+        pd.testing.assert_frame_equal(parsed, whole, check_dtype=False)
+
+
+def test_small_scan_blocks(csv_path, monkeypatch):
+    # quote counting across block borders
+    monkeypatch.setattr(parallel_ingest, "SCAN_BLOCK_BYTES", 3)
+    whole = pd.read_csv(csv_path, keep_default_na=False)
+
+    for range_bytes in (1, 10, 40):
+        pd.testing.assert_frame_equal(read_ranges(csv_path, range_bytes)[2], whole, check_dtype=False)
+
+
+def test_a_cut_inside_a_quoted_newline_moves_to_the_record_end(csv_path):
+    data = open(csv_path, "rb").read()
+    header_len = data.index(b"\n") + 1
+    inside = data.index(b"multi\n") + len(b"multi")   # the newline inside the quoted title
+
+    _, ranges = csv_byte_ranges(csv_path, inside - header_len)
+
+    first_end = ranges[0][1]
+    assert first_end > inside
+    assert data[first_end - 1:first_end] == b"\n"
+    assert data[header_len:first_end].count(b'"') % 2 == 0
@@ -0,0 +1,32 @@
+# /predict/stream?chunk_size= must be a positive integer (400 otherwise) and is capped
+import json
+
+import pytest
+
+import app
+
+NDJSON = b'{"title": "tsla calls"}\n{"title": "amd puts"}\n'
+
+
+@pytest.mark.parametrize("chunk_size", ["abc", "0", "-3", "1.5"])
+def test_bad_chunk_size_is_a_400(chunk_size):
+    resp = app.app.test_client().post(f"/predict/stream?model=lr&chunk_size={chunk_size}", data=NDJSON)
+
+    assert resp.status_code == 400
+    assert resp.get_json() == {"error": "chunk_size must be a positive integer"}
+
+
+def test_chunk_size_is_capped(monkeypatch):
+    monkeypatch.setattr(app, "STREAM_MAX_CHUNK_SIZE", 10)
+
+    assert app.parse_chunk_size("1000000") == 10
+    assert app.parse_chunk_size("1") == 1
+    assert app.parse_chunk_size(None) == app.STREAM_CHUNK_SIZE
+
+
+def test_stream_still_answers_every_line():
+    resp = app.app.test_client().post("/predict/stream?model=lr&chunk_size=1", data=NDJSON)
+
+    lines = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    assert resp.status_code == 200
+    assert len(lines) == 2 and all(set(p) == {"label", "score"} for p in lines)
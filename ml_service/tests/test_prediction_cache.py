@@ -0,0 +1,66 @@
+# prediction cache: keyed on (model, version, text), LRU once max_entries / max_bytes is hit, optional TTL
+from prediction_cache import PredictionCache, normalize_text
+
+POS = {"label": "positive", "score": 0.9}
+NEG = {"label": "negative", "score": 0.8}
+
+
+def test_hit_miss_and_version_key():
+    cache = PredictionCache()
+    cache.put_many("lr", "v1", ["tsla up"], [POS])
+
+    assert cache.get_many("lr", "v1", ["tsla up", "amd down"]) == [POS, None]
+    # another version or model never sees the entry
+    assert cache.get_many("lr", "v2", ["tsla up"]) == [None]
+    assert cache.get_many("svm", "v1", ["tsla up"]) == [None]
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 3
+
+
+def test_returned_predictions_are_copies():
+    cache = PredictionCache()
+    cache.put_many("lr", "v1", ["tsla up"], [POS])
+
+    cache.get_many("lr", "v1", ["tsla up"])[0]["label"] = "mutated"
+
+    assert cache.get_many("lr", "v1", ["tsla up"]) == [POS]
+
+
+def test_lru_eviction_by_entries():
+    cache = PredictionCache(max_entries=2)
+    cache.put_many("lr", "v1", ["a", "b"], [POS, POS])
+    cache.get_many("lr", "v1", ["a"])          # "a" is now the most recently used
+    cache.put_many("lr", "v1", ["c"], [NEG])
+
+    assert cache.get_many("lr", "v1", ["a", "b", "c"]) == [POS, None, NEG]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_cap_evicts_and_skips_giant_entries():
+    one_entry = PredictionCache()._entry_size(("lr", "v1", "a"), POS)
+    cache = PredictionCache(max_bytes=one_entry * 2)
+    cache.put_many("lr", "v1", ["a", "b", "c"], [POS, POS, POS])
+
+    assert cache.get_many("lr", "v1", ["a", "b", "c"]) == [None, POS, POS]
+    assert cache.stats()["approx_bytes"] <= one_entry * 2
+
+    # a text bigger than the whole cap is not cached and doesn't wipe the rest
+    cache.put_many("lr", "v1", ["x" * (one_entry * 4)], [NEG])
+    assert cache.get_many("lr", "v1", ["b", "c"]) == [POS, POS]
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("prediction_cache.time.monotonic", lambda: now[0])
+    cache = PredictionCache(ttl_seconds=10)
+    cache.put_many("lr", "v1", ["tsla up"], [POS])
+
+    now[0] += 5
+    assert cache.get_many("lr", "v1", ["tsla up"]) == [POS]
+    now[0] += 6
+    assert cache.get_many("lr", "v1", ["tsla up"]) == [None]
+    assert cache.stats()["expirations"] == 1 and cache.stats()["entries"] == 0
+
+
+def test_normalize_text_collapses_whitespace():
+    assert normalize_text("TSLA  to the\nmoon ") == "TSLA to the moon"
+    assert normalize_text("   ") == " "
@@ -0,0 +1,54 @@
+# sqlite prediction store: round trip per (text, model, version), survives a new connection / process
+import app
+from prediction_cache import normalize_text
+from prediction_store import PredictionStore
+
+POS = {"label": "positive", "score": 0.9}
+NEG = {"label": "negative", "score": 0.25}
+
+
+def test_round_trip(tmp_path):
+    store = PredictionStore(str(tmp_path / "store.sqlite"))
+    store.put_many("lr", "v1", ["tsla up", "amd down"], [POS, NEG])
+
+    assert store.get_many("lr", "v1", ["amd down", "nvda flat", "tsla up", "amd down"]) == [NEG, None, POS, NEG]
+    assert store.get_many("lr", "v2", ["tsla up"]) == [None]
+    assert store.get_many("svm", "v1", ["tsla up"]) == [None]
+    assert store.count() == 2 and store.count("lr") == 2
+
+
+def test_reopened_store_sees_the_rows(tmp_path):
+    path = str(tmp_path / "store.sqlite")
+    PredictionStore(path).put_many("distilbert", "v1", ["tsla up"], [POS])
+
+    assert PredictionStore(path).get_many("distilbert", "v1", ["tsla up"]) == [POS]
+
+
+def test_put_replaces_and_lookups_are_chunked(tmp_path):
+    store = PredictionStore(str(tmp_path / "store.sqlite"))
+    texts = [f"post {i}" for i in range(PredictionStore.QUERY_CHUNK * 2 + 7)]
+    store.put_many("lr", "v1", texts, [POS] * len(texts))
+    store.put_many("lr", "v1", texts[:1], [NEG])
+
+    found = store.get_many("lr", "v1", texts)
+    assert found[0] == NEG and found[1:] == [POS] * (len(texts) - 1)
+    assert store.count("lr") == len(texts)
+
+
+def test_service_predictions_land_in_the_store(tmp_path, monkeypatch):
+    store = PredictionStore(str(tmp_path / "store.sqlite"))
+    monkeypatch.setattr(app, "prediction_store", store)
+    monkeypatch.setattr(app, "PREDICTION_CACHE_ENABLED", False)
+    posts = [{"title": "TSLA  to the", "body": "moon"}, {"title": "amd puts", "body": ""}]
+
+    predictions, version = app.predict_versioned("lr", posts)
+
+    texts = [normalize_text(app.build_post_text(p)) for p in posts]
+    assert store.get_many("lr", version, texts) == [{"label": p["label"], "score": p["score"]} for p in predictions]
+
+    # the second call is answered from the store, the model never runs
+    def no_model(*args, **kwargs):
+        raise AssertionError("should have come from the store")
+
+    monkeypatch.setattr(app, "run_linear", no_model)
+    assert app.predict_versioned("lr", posts)[0] == predictions
@@ -0,0 +1,83 @@
+# ticker index vs the regex it replaced: one re.IGNORECASE \b(?:alias|alias)\b pattern per ticker
+import random
+import re
+
+import pytest
+
+import ticker_index
+from ticker_index import TickerIndex, load_aliases
+
+ALIASES = load_aliases("ticker_aliases.txt", ["TSLA", "AAPL", "MSFT", "NVDA", "AMD", "GME", "PLTR"])
+
+
+def regex_find(text):
+    # the old patterns, with the \b around ALL the aliases (the old (\bA|B|C\b) only had it on the ends)
+    found = []
+    for ticker, words in ALIASES.items():
+        joined = "|".join(re.escape(w) for w in words)
+        if re.search(rf"\b(?:{joined})\b", text, flags=re.IGNORECASE):
+            found.append(ticker)
+    return found
+
+
+TEXTS = [
+    "TSLA to the moon",
+    "$tsla and $AMD calls",
+    "tesla, apple & microsoft!!",
+    "TSLAQ is not tesla's ticker",   # glued -> no TSLA from TSLAQ, but "tesla's" counts
+    "GameStops everywhere",           # glued alias
+    "advanced micro devices earnings",
+    "Advanced Micro  Devices",        # two spaces: not the alias
+    "my_tsla position",               # "_" is a word char
+    "nvidia/amd/aapl",
+    "PLTR and $pltr",                 # not in the aliases file -> PLTR / $PLTR
+    "ſtuff about TSLA",
+    "",
+    "nothing here",
+]
+
+
+def random_texts(n, seed=0):
+    rng = random.Random(seed)
+    pieces = [w for words in ALIASES.values() for w in words] + ["moon", "calls", "puts", "Q", "s", "é"]
+    glue = [" ", "", "_", "$", ".", "!", "\n", "-", "'"]
+    texts = []
+    for _ in range(n):
+        parts = []
+        for _ in range(rng.randint(1, 6)):
+            word = rng.choice(pieces)
+            word = rng.choice([word, word.upper(), word.lower(), word.title()])
+            parts.append(word + rng.choice(glue))
+        texts.append("".join(parts))
+    return texts
+
+
+@pytest.fixture(params=["pyahocorasick", "pure python"])
+def index(request, monkeypatch):
+    if request.param == "pure python":
+        monkeypatch.setattr(ticker_index, "ahocorasick", None)
+    elif ticker_index.ahocorasick is None:
+        pytest.skip("pyahocorasick not installed")
+    return TickerIndex(ALIASES)
+
+
+def test_matches_the_regex_on_tricky_texts(index):
+    for text in TEXTS:
+        assert index.find(text) == regex_find(text), text
+
+
+def test_matches_the_regex_on_random_texts(index):
+    for text in random_texts(3000):
+        assert index.find(text) == regex_find(text), text
+
+
+def test_order_and_single_tickers(index):
+    assert index.find("gme then tsla then gme") == ["TSLA", "GME"]
+    assert index.single_tickers(["tsla", "tsla amd", None, "meh"]).tolist() == ["TSLA", None, None, None]
+
+
+def test_cashtag_only_alias():
+    index = TickerIndex({"ON": ["$ON"]})
+
+    assert index.find("$ON calls") == ["ON"]
+    assert index.find("turn ON the lights") == []
@@ -0,0 +1,59 @@
+# msgpack wire format: request decoding + prediction columns round trip (scores go over as float32)
+import numpy as np
+import pytest
+
+import app
+import wire_format
+
+pytestmark = pytest.mark.skipif(not wire_format.msgpack_available(), reason="msgpack not installed")
+
+PREDICTIONS = [
+    {"label": "positive", "score": 0.8125},
+    {"label": "negative", "score": 0.3},
+    {"label": "positive", "score": 0.999},
+]
+
+
+def test_predictions_round_trip():
+    decoded = wire_format.decode_predictions(wire_format.unpack(wire_format.pack(
+        wire_format.encode_predictions(PREDICTIONS))))
+
+    assert [p["label"] for p in decoded] == [p["label"] for p in PREDICTIONS]
+    expected = np.array([p["score"] for p in PREDICTIONS], dtype=np.float32).astype(np.float64)
+    assert [p["score"] for p in decoded] == expected.tolist()
+
+
+def test_cascade_deciders_round_trip():
+    predictions = [dict(p, decided_by=d) for p, d in zip(PREDICTIONS, ["lr", "distilbert", "lr"])]
+
+    decoded = wire_format.decode_predictions(wire_format.encode_predictions(predictions))
+
+    assert [p["decided_by"] for p in decoded] == ["lr", "distilbert", "lr"]
+
+
+def test_empty_predictions():
+    assert wire_format.decode_predictions(wire_format.encode_predictions([])) == []
+
+
+def test_request_texts_become_posts():
+    data = wire_format.decode_request(wire_format.pack({"model": "svm", "texts": ["tsla up", "amd down"]}))
+
+    assert data == {"model": "svm", "posts": [{"title": "tsla up", "body": ""}, {"title": "amd down", "body": ""}]}
+    with pytest.raises(ValueError):
+        wire_format.decode_request(wire_format.pack(["not", "a", "map"]))
+
+
+def test_msgpack_predict_matches_json():
+    client = app.app.test_client()
+    texts = ["tsla to the moon", "amd puts", "flat day"]
+
+    as_json = client.post("/predict", json={"model": "lr", "posts": [{"title": t} for t in texts]}).get_json()
+    resp = client.post("/predict", data=wire_format.pack({"model": "lr", "texts": texts}),
+                       content_type=wire_format.MSGPACK_CONTENT_TYPE)
+
+    assert resp.mimetype == wire_format.MSGPACK_CONTENT_TYPE
+    payload = wire_format.unpack(resp.get_data())
+    decoded = wire_format.decode_predictions(payload)
+    assert payload["model_version"] == as_json["model_version"]
+    assert [p["label"] for p in decoded] == [p["label"] for p in as_json["predictions"]]
+    np.testing.assert_allclose([p["score"] for p in decoded], [p["score"] for p in as_json["predictions"]], rtol=1e-6)
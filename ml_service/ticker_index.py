@@ -0,0 +1,224 @@
+# ticker_index.py
+r"""
+Ticker / alias matcher for backtest.py: ONE pass over the text for the whole universe.
+
+Before this backtest.py compiled one regex per ticker (TSLA|$TSLA|Tesla...) and ran all of them
+on every post, so the cost grew linearly with the number of tickers, and the aliases were
+hard coded if/elif branches. Fine for 6 tickers, not for the S&P 500 or every US listing.
+
+Now:
+    - aliases live in a text file (ticker_aliases.txt), one ticker per line:
+          TSLA: TSLA, $TSLA, Tesla
+          GME                         # no aliases -> GME and $GME (same default as before)
+    - every alias of every ticker goes into ONE Aho-Corasick automaton,
+      one scan of the (case folded) text reports every alias occurrence
+    - each occurrence only counts if it sits on word boundaries, like the \b...\b of the old regexes
+
+Same matching rules as the old re.IGNORECASE + \b patterns:
+    - case insensitive (including the few non ASCII chars re.IGNORECASE folds to ASCII, e.g. "ſ" ~ "s")
+    - alias can't be glued to other word chars: "TSLA" matches "TSLA!" and "$TSLA", not "TSLAQ"
+    - "$TSLA" (cashtag) only needs a non word char (or nothing) in front of the "$"
+      (\b\$TSLA\b needed a word char there, but "TSLA" itself already covers those texts,
+      so for every ticker that also lists its plain symbol the result is the same)
+    - an alias that is ONLY listed as "$ON" only matches as a cashtag, handy for symbols that are
+      also normal words (ON, ALL, IT, A ...) once the universe gets big
+
+The automaton is pyahocorasick (C, in requirements.txt), if its missing a small pure python
+Aho-Corasick below takes over (same results, just slower: at only 6 tickers even slower than
+the old regexes, it only pays off for big universes).
+"""
+
+import re
+import string
+
+import numpy as np
+
+try:
+    import ahocorasick   # pyahocorasick
+except ImportError:
+    ahocorasick = None
+
+DEFAULT_ALIASES_PATH = "ticker_aliases.txt"
+
+
+def is_word_char(c):
+    # same definition as \w of python's re for str patterns
+    return c.isalnum() or c == "_"
+
+
+class _FoldTable(dict):
+    """
+    str.translate table for non ASCII text, filled lazily per char.
+    Always maps ONE char to ONE char, so positions in the folded text = positions in the original
+    (needed for the word boundary checks).
+    """
+
+    def __missing__(self, codepoint):
+        c = chr(codepoint)
+        low = c.lower()
+        folded = low if len(low) == 1 else c
+
+        if not folded.isascii():
+            # a few non ASCII chars match ASCII letters under re.IGNORECASE ("ſ" ~ "s", Kelvin sign ~ "k")
+            for x in string.ascii_lowercase:
+                if re.fullmatch(x, c, flags=re.IGNORECASE):
+                    folded = x
+                    break
+
+        self[codepoint] = folded
+        return folded
+
+
+_FOLD_TABLE = _FoldTable()
+
+
+def fold(text):
+    if text.isascii():
+        return text.lower()
+    return text.translate(_FOLD_TABLE)
+
+
+def default_aliases(ticker):
+    return [ticker, f"${ticker}"]
+
+
+def load_aliases(path=DEFAULT_ALIASES_PATH, tickers=None):
+    """
+    Reads the alias file -> dict ticker -> list of aliases (file order).
+    tickers: only keep these (in this order), tickers missing from the file get the default aliases.
+    """
+    aliases = {}
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+
+            ticker, _, rest = line.partition(":")
+            ticker = ticker.strip().upper()
+            if not ticker:
+                raise ValueError(f"{path}:{line_no}: missing ticker")
+
+            words = [w.strip() for w in rest.split(",") if w.strip()]
+            aliases[ticker] = words or default_aliases(ticker)
+
+    if tickers is None:
+        return aliases
+    return {t: aliases.get(t, default_aliases(t)) for t in tickers}
+
+
+class _PyAutomaton:
+    """
+    Pure python Aho-Corasick, only used without pyahocorasick.
+    Same interface as the bits of ahocorasick.Automaton I use: add_word, make_automaton, iter.
+    """
+
+    def __init__(self):
+        self.goto = [{}]      # state -> {char: next state}
+        self.fail = [0]
+        self.out = [[]]       # state -> values of every word ending here (incl. via fail links)
+
+    def add_word(self, word, value):
+        state = 0
+        for c in word:
+            nxt = self.goto[state].get(c)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][c] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            state = nxt
+        self.out[state].append(value)
+
+    def make_automaton(self):
+        # BFS, fail link = longest proper suffix that is also a prefix of some word
+        # (depth 1 states keep fail = root)
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for c, nxt in self.goto[state].items():
+                f = self.fail[state]
+                while f and c not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(c, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+                queue.append(nxt)
+
+    def iter(self, text):
+        goto, fail, out = self.goto, self.fail, self.out
+        state = 0
+        for i, c in enumerate(text):
+            while state and c not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(c, 0)
+            for value in out[state]:
+                yield i, value
+
+
+class TickerIndex:
+    """
+    aliases: dict ticker -> list of aliases (e.g. from load_aliases())
+
+    find(text) -> list of tickers mentioned in text, each once, in the order of the aliases dict
+    (same order the old detect_tickers_in_text() returned them in)
+    """
+
+    def __init__(self, aliases):
+        self.tickers = list(aliases)
+        self.n_aliases = 0
+
+        # folded alias -> (length, [ticker positions]); two tickers can share an alias
+        entries = {}
+        for pos, (ticker, words) in enumerate(aliases.items()):
+            for word in words:
+                key = fold(word)
+                if not key or not is_word_char(key[-1]) or not (is_word_char(key[0]) or key[0] == "$"):
+                    raise ValueError(f"Alias {word!r} of {ticker} must start with a word char or '$' "
+                                     f"and end with a word char")
+                entry = entries.setdefault(key, (len(key), []))
+                if pos not in entry[1]:
+                    entry[1].append(pos)
+                self.n_aliases += 1
+
+        self.automaton = ahocorasick.Automaton() if ahocorasick is not None else _PyAutomaton()
+        for key, entry in entries.items():
+            self.automaton.add_word(key, entry)
+        self.automaton.make_automaton()
+        self.empty = not entries
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_ALIASES_PATH, tickers=None):
+        return cls(load_aliases(path, tickers))
+
+    def find(self, text):
+        if not isinstance(text, str) or self.empty:
+            return []
+
+        folded = fold(text)
+        n = len(text)
+        hits = set()
+
+        for end, (length, positions) in self.automaton.iter(folded):
+            start = end - length + 1
+            # word boundaries, checked on the ORIGINAL text (same length as folded)
+            # (for a "$" alias: nothing glued in front of the "$", same rule)
+            if start > 0 and is_word_char(text[start - 1]):
+                continue
+            if end + 1 < n and is_word_char(text[end + 1]):
+                continue
+            hits.update(positions)
+
+        return [self.tickers[pos] for pos in sorted(hits)]
+
+    def single_tickers(self, texts):
+        """
+        Whole text column at once -> numpy object array, one entry per text:
+        the ticker if the text mentions exactly one ticker, else None
+        """
+        out = np.empty(len(texts), dtype=object)
+        find = self.find
+        for i, text in enumerate(texts):
+            found = find(text)
+            if len(found) == 1:
+                out[i] = found[0]
+        return out
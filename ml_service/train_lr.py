@@ -8,6 +8,9 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import classification_report, accuracy_score
 import joblib  # for saving model objects to disk
 
+# Update: optional stateless hashing + idf pipeline (see hashing_features.py)
+from hashing_features import HashedTfidf, hashing_paths
+
 
 # Paths 
 
@@ -18,6 +21,12 @@ MODEL_DIR = "model"
 VEC_PATH = os.path.join(MODEL_DIR, "vectorizer_lr.pkl")
 MODEL_PATH = os.path.join(MODEL_DIR, "lr_model.pkl")
 
+# Update: FEATURE_PIPELINE=hashing trains on hashed features + a flat idf array instead of the TF-IDF vocabulary,
+# written next to the TF-IDF files so both pipelines can live in model/ (app.py picks one with the same setting)
+FEATURE_PIPELINE = os.environ.get("FEATURE_PIPELINE", "tfidf").lower()
+HASHING_IDF_PATH, HASHING_CONFIG_PATH = hashing_paths(MODEL_DIR)
+HASHING_MODEL_PATH = os.path.join(MODEL_DIR, "lr_model_hashing.pkl")
+
 
 def main():
     # Making sure the model directory exists
@@ -63,11 +72,16 @@ def main():
     # ngram_range: include unigrams + bigrams (1-gram, 2-gram)
     # stop_words: drop common English stopwords
     
-    vectorizer = TfidfVectorizer(
-        max_features=20000, 
-        ngram_range=(1, 2),
-        stop_words="english"
-    )
+    if FEATURE_PIPELINE == "hashing":
+        # same n-grams + stop words, but hashed into buckets, no vocabulary (and no 20k cap) to store
+        vectorizer = HashedTfidf(ngram_range=(1, 2), stop_words="english")
+    else:
+        vectorizer = TfidfVectorizer(
+            max_features=20000, 
+            ngram_range=(1, 2),
+            stop_words="english"
+        )
+    print("Feature pipeline:", FEATURE_PIPELINE)
 
     # Learn vocabulary from training data and transform it
     X_train_vec = vectorizer.fit_transform(X_train)
@@ -93,6 +107,14 @@ def main():
     print(classification_report(y_test, y_pred))
 
     # 6. Save the trained vectoriser and model as .pkl files
+    if FEATURE_PIPELINE == "hashing":
+        vectorizer.save(HASHING_IDF_PATH, HASHING_CONFIG_PATH)
+        joblib.dump(clf, HASHING_MODEL_PATH)
+
+        print(f"\nSaved hashing idf weights to {HASHING_IDF_PATH} (+ {HASHING_CONFIG_PATH})")
+        print(f"Saved model to {HASHING_MODEL_PATH}")
+        return
+
     joblib.dump(vectorizer, VEC_PATH)
     joblib.dump(clf, MODEL_PATH)
 
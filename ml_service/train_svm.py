@@ -8,6 +8,9 @@ Input:
 
 Output:
     model/svm_model.pkl       -> trained Linear SVM classifier
+
+Update: FEATURE_PIPELINE=hashing reuses model/hashing_idf.npy + hashing_config.json from
+train_lr.py instead (run train_lr.py with the same setting first) -> model/svm_model_hashing.pkl
 """
 
 import os
@@ -18,6 +21,8 @@ from sklearn.svm import LinearSVC
 from sklearn.metrics import classification_report, accuracy_score
 import joblib  # for saving/loading model objects to/from disk
 
+from hashing_features import HashedTfidf, hashing_paths
+
 
 # Paths / constants 
 
@@ -28,6 +33,11 @@ MODEL_DIR = "model"
 VEC_PATH = os.path.join(MODEL_DIR, "vectorizer_lr.pkl")
 SVM_MODEL_PATH = os.path.join(MODEL_DIR, "svm_model.pkl")
 
+# Update: hashing feature pipeline, same setting as train_lr.py / app.py
+FEATURE_PIPELINE = os.environ.get("FEATURE_PIPELINE", "tfidf").lower()
+HASHING_IDF_PATH, HASHING_CONFIG_PATH = hashing_paths(MODEL_DIR)
+HASHING_SVM_MODEL_PATH = os.path.join(MODEL_DIR, "svm_model_hashing.pkl")
+
 
 def main():
     # Making sure the model directory exists
@@ -61,8 +71,14 @@ def main():
     # 3. Text → numeric features using the SAME TF-IDF vectoriser as LR
     # I am not re-fitting a new vectoriser here, I just reuse the one from train_lr.py
     # so that LR and SVM both operate in exactly the same feature space.
-    print(f"\nLoading existing TF-IDF vectoriser from: {VEC_PATH}")
-    vectorizer = joblib.load(VEC_PATH)
+    if FEATURE_PIPELINE == "hashing":
+        print(f"\nLoading hashing idf weights from: {HASHING_IDF_PATH}")
+        vectorizer = HashedTfidf.load(HASHING_IDF_PATH, HASHING_CONFIG_PATH)
+        model_path = HASHING_SVM_MODEL_PATH
+    else:
+        print(f"\nLoading existing TF-IDF vectoriser from: {VEC_PATH}")
+        vectorizer = joblib.load(VEC_PATH)
+        model_path = SVM_MODEL_PATH
 
     # Use the same vocabulary to transform train and test data
     X_train_vec = vectorizer.transform(X_train)
@@ -86,8 +102,8 @@ def main():
     print(classification_report(y_test, y_pred))
 
     # 6. Save the trained SVM model as a .pkl file
-    joblib.dump(svm_clf, SVM_MODEL_PATH)
-    print(f"\nSaved SVM model to {SVM_MODEL_PATH}")
+    joblib.dump(svm_clf, model_path)
+    print(f"\nSaved SVM model to {model_path}")
 
 
 if __name__ == "__main__":
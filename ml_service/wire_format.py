@@ -0,0 +1,112 @@
+# wire_format.py
+"""
+Compact binary (MessagePack) format for /predict, shared by app.py and backtest.py.
+
+For big batches, JSON encoding/decoding of "posts" and "predictions" was a measurable cost
+on both sides. JSON stays the default, this is only used when the client asks for it:
+    - request:  Content-Type: application/msgpack
+    - response: Accept: application/msgpack
+
+Request (msgpack map), a plain text column instead of a list of {title, body} dicts:
+    { "model": "lr", "texts": ["TSLA to the moon", ...] }
+    ("posts": [...] and "models": [...] work exactly like the JSON version too)
+
+Response (msgpack map), columns instead of one dict per post:
+    {
+        "model": "lr",
+        "labels": ["negative", "neutral", "positive"],   # small dictionary of label strings
+        "label_ids": <bytes>,                           # uint8 code per post -> index into labels
+        "scores": <bytes>                               # float32 (little endian) per post
+        (cascade only) "deciders": [...], "decided_by_ids": <bytes>   # which model decided each post
+    }
+
+msgpack is an optional dependency (pip install msgpack), without it the service is JSON only.
+"""
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:  # optional, JSON keeps working without it
+    msgpack = None
+
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+MSGPACK_CONTENT_TYPES = (MSGPACK_CONTENT_TYPE, "application/x-msgpack")
+
+
+def msgpack_available():
+    return msgpack is not None
+
+
+def is_msgpack(content_type):
+    return (content_type or "").split(";")[0].strip().lower() in MSGPACK_CONTENT_TYPES
+
+
+def pack(obj):
+    return msgpack.packb(obj, use_bin_type=True)
+
+
+def unpack(raw):
+    return msgpack.unpackb(raw, raw=False)
+
+
+def decode_request(raw):
+    """
+    msgpack body -> same dict shape the JSON /predict body has
+    ("texts" turns into "posts" so the rest of app.py doesn't care about the wire format)
+    """
+    data = unpack(raw)
+    if not isinstance(data, dict):
+        raise ValueError("msgpack body must be a map")
+
+    texts = data.pop("texts", None)
+    if texts is not None and data.get("posts") is None:
+        data["posts"] = [{"title": t, "body": ""} for t in texts] if isinstance(texts, list) else texts
+
+    return data
+
+
+def encode_predictions(predictions):
+    """
+    list of { "label", "score" } -> { "labels", "label_ids", "scores" } columns
+    """
+    labels = sorted({p["label"] for p in predictions})
+    code_of = {label: i for i, label in enumerate(labels)}
+
+    label_ids = np.fromiter((code_of[p["label"]] for p in predictions), dtype=np.uint8, count=len(predictions))
+    scores = np.fromiter((p["score"] for p in predictions), dtype="<f4", count=len(predictions))
+
+    columns = {
+        "labels": labels,
+        "label_ids": label_ids.tobytes(),
+        "scores": scores.tobytes(),
+    }
+
+    # update: cascade predictions also say which model decided them, same dictionary + uint8 codes trick
+    if predictions and "decided_by" in predictions[0]:
+        deciders = sorted({p["decided_by"] for p in predictions})
+        decider_code = {d: i for i, d in enumerate(deciders)}
+        columns["deciders"] = deciders
+        columns["decided_by_ids"] = np.fromiter(
+            (decider_code[p["decided_by"]] for p in predictions), dtype=np.uint8, count=len(predictions)
+        ).tobytes()
+
+    return columns
+
+
+def decode_predictions(columns):
+    """
+    { "labels", "label_ids", "scores" } columns -> list of { "label", "score" } (client side)
+    """
+    labels = columns["labels"]
+    label_ids = np.frombuffer(columns["label_ids"], dtype=np.uint8)
+    scores = np.frombuffer(columns["scores"], dtype="<f4").astype(np.float64)
+
+    predictions = [{"label": labels[i], "score": s} for i, s in zip(label_ids.tolist(), scores.tolist())]
+
+    if "deciders" in columns:
+        deciders = columns["deciders"]
+        for pred, d in zip(predictions, np.frombuffer(columns["decided_by_ids"], dtype=np.uint8).tolist()):
+            pred["decided_by"] = deciders[d]
+
+    return predictions
@@ -0,0 +1,229 @@
+# wsb_cache.py
+"""
+Columnar, day partitioned copy of the WSB CSV for backtest.py (Parquet, via pyarrow).
+
+Every backtest used to re-parse the whole data/wallstreetbets_2022.csv: all columns, all dates,
+pd.to_datetime over every row, even for a one month window.
+This converts the CSV ONCE into:
+
+    data/wsb_parquet/
+        _source.json                 # size + mtime of the CSV it was built from (stale check)
+        date=2022-04-01/part-0.parquet
+        date=2022-04-02/part-0.parquet
+        ...
+
+with only what the backtest needs:
+    row   original CSV row number (so the backtest keeps the exact CSV order)
+    dt    parsed timestamp (rows with an unparseable timestamp are dropped, they never pass the date filter)
+    text  title + " " + body, already joined + stripped
+
+backtest.py then only opens the date=... folders inside START_DATE..END_DATE (partition pruning)
+and filters dt inside them (predicate pushdown), so a one month backtest reads one month of data.
+
+pyarrow is only needed for this cache (pip install pyarrow), backtest.py reads the CSV without it.
+
+Usage (from ml_service/):
+    python wsb_cache.py build                       # data/wallstreetbets_2022.csv -> data/wsb_parquet
+    python wsb_cache.py build --csv other.csv --out data/other_parquet
+    python wsb_cache.py info
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from parallel_ingest import join_text
+
+DEFAULT_CSV_PATH = os.path.join("data", "wallstreetbets_2022.csv")
+DEFAULT_CACHE_DIR = os.path.join("data", "wsb_parquet")
+SOURCE_FILENAME = "_source.json"   # "_" prefix -> pyarrow skips it when discovering the dataset
+
+COLUMNS = ["row", "dt", "text"]
+PARTITIONING = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+
+READ_CHUNK_ROWS = 100_000
+
+
+def source_stamp(csv_path):
+    st = os.stat(csv_path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def read_source(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, SOURCE_FILENAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_fresh(cache_dir, csv_path):
+    """True if cache_dir was built from csv_path as it is on disk right now"""
+    meta = read_source(cache_dir)
+    if meta is None or not os.path.exists(csv_path):
+        return False
+    return meta.get("source") == source_stamp(csv_path)
+
+
+def _record_batches(csv_path, read_csv_kwargs, counts):
+    row = 0
+    for chunk in pd.read_csv(csv_path, chunksize=READ_CHUNK_ROWS, **read_csv_kwargs):
+        if "timestamp" not in chunk.columns:
+            raise ValueError("Expected a 'timestamp' column in the CSV")
+
+        n = len(chunk)
+        title = chunk.get("title", pd.Series("", index=chunk.index)).fillna("")
+        body = chunk.get("body", pd.Series("", index=chunk.index)).fillna("")
+        dt = pd.to_datetime(chunk["timestamp"], errors="coerce")
+
+        df = pd.DataFrame({
+            "row": pd.RangeIndex(row, row + n),
+            "dt": dt.to_numpy(),
+            "text": join_text(title, body).to_numpy(),
+        })
+        df = df[dt.notna().to_numpy()]
+        df["date"] = df["dt"].dt.strftime("%Y-%m-%d")
+
+        counts["rows"] += n
+        counts["kept"] += len(df)
+        row += n
+        yield pa.RecordBatch.from_pandas(df, preserve_index=False)
+
+
+def build(csv_path=DEFAULT_CSV_PATH, cache_dir=DEFAULT_CACHE_DIR, read_csv_kwargs=None):
+    """
+    CSV -> day partitioned Parquet. Written to <cache_dir>.tmp first and swapped in at the end,
+    so a half written cache never gets read.
+    """
+    read_csv_kwargs = read_csv_kwargs or {"dtype": {"title": str, "body": str}}
+    stamp = source_stamp(csv_path)
+
+    tmp_dir = cache_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    counts = {"rows": 0, "kept": 0}
+    batches = _record_batches(csv_path, read_csv_kwargs, counts)
+    first = next(batches, None)
+    if first is None:
+        raise ValueError(f"{csv_path} has no rows")
+
+    def all_batches():
+        yield first
+        yield from batches
+
+    ds.write_dataset(
+        all_batches(),
+        tmp_dir,
+        schema=first.schema,
+        format="parquet",
+        partitioning=PARTITIONING,
+        basename_template="part-{i}.parquet",
+        # one open file per day, big enough that a day is normally one file
+        max_open_files=1024,
+        max_rows_per_group=READ_CHUNK_ROWS,
+    )
+
+    with open(os.path.join(tmp_dir, SOURCE_FILENAME), "w") as f:
+        json.dump({
+            "source": stamp,
+            "csv_path": os.path.abspath(csv_path),
+            "rows": counts["rows"],
+            "rows_with_timestamp": counts["kept"],
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }, f, indent=2)
+
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(tmp_dir, cache_dir)
+    return counts
+
+
+def open_dataset(cache_dir=DEFAULT_CACHE_DIR, files=None):
+    # files: only these parquet files of the cache (e.g. one worker's share of the days)
+    if files is not None:
+        return ds.dataset(files, format="parquet", partitioning=PARTITIONING, partition_base_dir=cache_dir)
+    return ds.dataset(cache_dir, format="parquet", partitioning=PARTITIONING)
+
+
+def window_filter(start_dt, end_dt):
+    start_dt, end_dt = pd.Timestamp(start_dt), pd.Timestamp(end_dt)
+    # the date=... condition prunes whole folders, the dt condition keeps the exact old >= / <= semantics
+    return (
+        (ds.field("date") >= start_dt.strftime("%Y-%m-%d"))
+        & (ds.field("date") <= end_dt.strftime("%Y-%m-%d"))
+        & (ds.field("dt") >= pa.scalar(start_dt.to_pydatetime()))
+        & (ds.field("dt") <= pa.scalar(end_dt.to_pydatetime()))
+    )
+
+
+def window_files(cache_dir, start_dt, end_dt):
+    """the parquet files of the days inside the window (in path = date order), only looks at folder names"""
+    dataset = open_dataset(cache_dir)
+    files = sorted(f.path for f in dataset.get_fragments(filter=window_filter(start_dt, end_dt)))
+    print(f"➡️ ➡️ Reading {len(files)} of {len(dataset.files)} day files from {cache_dir}")
+    return files
+
+
+def iter_window(cache_dir, start_dt, end_dt, files=None, batch_rows=READ_CHUNK_ROWS):
+    """
+    Yields DataFrames (row, dt, text) of the rows with start_dt <= dt <= end_dt,
+    reading only the day partitions in that range (or only `files` of them). Memory ~ one batch at a time.
+    """
+    dataset = open_dataset(cache_dir, files)
+    flt = window_filter(start_dt, end_dt)
+
+    # a day is only a few thousand rows, so batches get glued together up to batch_rows
+    # (the per DataFrame overhead downstream was more than the actual work)
+    pending, n_pending = [], 0
+    for batch in dataset.to_batches(columns=COLUMNS, filter=flt, batch_size=batch_rows):
+        if not batch.num_rows:
+            continue
+        pending.append(batch)
+        n_pending += batch.num_rows
+        if n_pending >= batch_rows:
+            yield pa.Table.from_batches(pending).to_pandas()
+            pending, n_pending = [], 0
+
+    if pending:
+        yield pa.Table.from_batches(pending).to_pandas()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="day partitioned Parquet cache of the WSB CSV")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_build = sub.add_parser("build", help="convert the CSV (one time, re-run when the CSV changes)")
+    p_build.add_argument("--csv", default=DEFAULT_CSV_PATH)
+    p_build.add_argument("--out", default=DEFAULT_CACHE_DIR)
+
+    p_info = sub.add_parser("info", help="show what the cache was built from")
+    p_info.add_argument("--csv", default=DEFAULT_CSV_PATH)
+    p_info.add_argument("--out", default=DEFAULT_CACHE_DIR)
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        t0 = time.perf_counter()
+        counts = build(args.csv, args.out)
+        size_mb = sum(os.path.getsize(f) for f in open_dataset(args.out).files) / 1024 / 1024
+        print(f"✅ ✅ {counts['rows']} rows ({counts['kept']} with a timestamp) -> {args.out} "
+              f"({size_mb:.1f} MB) in {time.perf_counter() - t0:.1f}s")
+
+    elif args.command == "info":
+        meta = read_source(args.out)
+        if meta is None:
+            print(f"❌ ❌ ❌ No cache at {args.out}, run: python wsb_cache.py build")
+            raise SystemExit(1)
+        days = sorted(os.path.basename(os.path.dirname(f)) for f in open_dataset(args.out).files)
+        print(json.dumps(meta, indent=2))
+        print(f"day files: {len(days)} ({days[0]} .. {days[-1]})" if days else "day files: 0")
+        print("✅ ✅ fresh" if is_fresh(args.out, args.csv) else "⚠️ ⚠️ stale, the CSV changed since (re-run build)")
+
+
+if __name__ == "__main__":
+    main()